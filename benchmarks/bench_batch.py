@@ -0,0 +1,44 @@
+"""Batch edit throughput: one process against a worker pool.
+
+Run with: python -m benchmarks.bench_batch [--files 400] [--lines 2000]
+"""
+import argparse
+import os
+import tempfile
+from src.batch import parse_script, run_batch
+
+SCRIPT = """# license header, then rename a word on the third line
+type # Copyright (c) the authors
+key enter
+key esc down down down x a
+type renamed = value
+"""
+
+
+def create_files(directory: str, files: int, lines: int):
+    body = "\n".join(f"line {i} lorem ipsum dolor sit amet" for i in range(lines))
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"file{index:05}.txt")
+        with open(path, "w") as file:
+            file.write(body)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--lines", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    keys = parse_script(SCRIPT)
+    for label, workers in (("1 process", 1), (f"{os.cpu_count()} workers", None)):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = create_files(directory, arguments.files, arguments.lines)
+            report = run_batch(paths, keys, workers=workers)
+        print(f"{label:<12} {report.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Keystrokes per second of the Editor on large documents, per buffer engine.
+
+Run with: python -m benchmarks.bench_buffer [--lines 10000 100000 1000000]
+"""
+import argparse
+import time
+from typing import List
+from src.buffers.list_buffer import ListBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import Cursor, Editor
+from src.interfaces.text_buffer import TextBuffer
+
+
+class CopyingListBuffer(TextBuffer):
+    """The original list-of-str storage, which rebuilt the list on every line edit"""
+
+    def __init__(self, lines=("",)):
+        self.__lines = list(lines)
+
+    def __len__(self):
+        return len(self.__lines)
+
+    def line(self, index):
+        return self.__lines[index]
+
+    def set_line(self, index, text):
+        self.__lines[index] = text
+
+    def insert_lines(self, index, lines: List[str]):
+        self.__lines = self.__lines[:index] + list(lines) + self.__lines[index:]
+
+    def delete_lines(self, start, stop):
+        self.__lines = self.__lines[:start] + self.__lines[stop:]
+
+
+ENGINES = {"legacy": CopyingListBuffer, "list": ListBuffer, "rope": RopeBuffer}
+
+# Typing a short word, breaking the line and joining it back again
+KEYSTROKES = ["a", "b", "c", "d", "\n", "e", "f", "\b", "\b", "\b"]
+
+
+def replay(editor: Editor, keys: int):
+    for i in range(keys):
+        key = KEYSTROKES[i % len(KEYSTROKES)]
+        if key == "\n":
+            editor.add_line()
+        elif key == "\b":
+            editor.delete()
+        else:
+            editor.append(key)
+
+
+def run(engine: str, line_count: int, keys: int) -> float:
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+    editor = Editor(
+        text=lines,
+        cursor=Cursor(line=line_count // 2, char=0),
+        buffer_type=ENGINES[engine],
+    )
+    start = time.perf_counter()
+    replay(editor, keys)
+    return keys / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lines", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--keys", type=int, default=5_000)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    args = parser.parse_args()
+
+    print(f"{'engine':<8}{'lines':>10}{'keys/s':>14}")
+    for line_count in args.lines:
+        for engine in args.engines:
+            rate = run(engine, line_count, args.keys)
+            print(f"{engine:<8}{line_count:>10}{rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Per-key dispatch cost of the typing and command modes: the if/elif chains
+with a regex printable check against the compiled keymap tables.
+
+Run with: python -m benchmarks.bench_dispatch [--keys 1000000]
+"""
+import argparse
+import random
+import re
+import time
+from src.interfaces.keys import Key
+from src.tui.keymap import Keymap
+from src.tui.modes.command_mode import TextUserInterfaceCommandMode
+from src.tui.modes.typing_mode import TextUserInterfaceTypingMode
+
+
+class NullEditor:
+    """Accepts every editor call and does nothing, so only dispatch is timed"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class LegacyTypingMode:
+    """Typing mode dispatch as it was before the keymap"""
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.is_active = True
+
+    def key_action(self, key: int):
+        if key == Key.ESC.value:
+            self.is_active = False
+        if key == Key.LEFT.value:
+            self.editor.cursor_left()
+        elif key == Key.RIGHT.value:
+            self.editor.cursor_right()
+        elif key == Key.UP.value:
+            self.editor.cursor_up()
+        elif key == Key.DOWN.value:
+            self.editor.cursor_down()
+        elif key == Key.BACKSPACE.value:
+            self.editor.delete()
+        elif key == Key.ENTER.value:
+            self.editor.add_line()
+        elif self.__is_printable(character := chr(key)):
+            self.editor.append(character)
+
+    def __is_printable(self, char):
+        printable_characters = r"[^\x00-\x1F\x7F-\x9F]+"
+        return re.match(printable_characters, char) is not None
+
+
+class LegacyCommandMode:
+    """Command mode dispatch as it was before the keymap"""
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.is_active = True
+
+    def key_action(self, key: int):
+        if key == Key.LEFT.value:
+            self.editor.cursor_left()
+        elif key == Key.RIGHT.value:
+            self.editor.cursor_right()
+        elif key == Key.UP.value:
+            self.editor.cursor_up()
+        elif key == Key.DOWN.value:
+            self.editor.cursor_down()
+        elif key == ord("a"):
+            self.is_active = False
+        elif key == ord("s"):
+            self.editor.save()
+        elif key == ord("x"):
+            self.editor.cut()
+        elif key == ord("p"):
+            self.editor.paste()
+        elif key == ord("u"):
+            self.editor.undo()
+        elif key == ord("r"):
+            self.editor.redo()
+
+
+def typing_keys(count: int):
+    special = [
+        Key.LEFT.value,
+        Key.RIGHT.value,
+        Key.UP.value,
+        Key.DOWN.value,
+        Key.BACKSPACE.value,
+        Key.ENTER.value,
+    ]
+    text = [ord(c) for c in "the quick brown fox jumps over the lazy dog"]
+    return [
+        random.choice(special if random.random() < 0.1 else text) for _ in range(count)
+    ]
+
+
+def command_keys(count: int):
+    keys = [
+        Key.LEFT.value,
+        Key.RIGHT.value,
+        Key.UP.value,
+        Key.DOWN.value,
+        ord("s"),
+        ord("x"),
+        ord("p"),
+        ord("u"),
+        ord("r"),
+        ord("q"),
+    ]
+    return [random.choice(keys) for _ in range(count)]
+
+
+def measure(mode, keys) -> float:
+    key_action = mode.key_action
+    start = time.perf_counter()
+    for key in keys:
+        key_action(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    arguments = parser.parse_args()
+
+    random.seed(0)
+    editor = NullEditor()
+    keymap = Keymap()
+    cases = [
+        (
+            "typing",
+            typing_keys(arguments.keys),
+            LegacyTypingMode(editor),
+            TextUserInterfaceTypingMode(editor=editor, keymap=keymap),
+        ),
+        (
+            "command",
+            command_keys(arguments.keys),
+            LegacyCommandMode(editor),
+            TextUserInterfaceCommandMode(editor=editor, keymap=keymap),
+        ),
+    ]
+    print(f"{'mode':<10}{'if/elif ns/key':>16}{'table ns/key':>16}{'speedup':>10}")
+    for name, keys, legacy, compiled in cases:
+        legacy_cost = measure(legacy, keys)
+        compiled_cost = measure(compiled, keys)
+        print(
+            f"{name:<10}{legacy_cost * 1e9:>16.0f}{compiled_cost * 1e9:>16.0f}"
+            f"{legacy_cost / compiled_cost:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
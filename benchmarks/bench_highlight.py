@@ -0,0 +1,106 @@
+"""Cost of keeping syntax highlighting current in a large Python file: the
+first full pass, re-highlighting after a one character edit and after an edit
+that opens a triple-quoted string, against lexing the whole file again, and
+how much the background worker slows typing down while it runs.
+
+Run with: python -m benchmarks.bench_highlight [--lines 100000]
+"""
+import argparse
+import statistics
+import time
+from src.editor import Cursor, Editor
+from src.highlight.highlighter import Highlighter
+from src.highlight.lexers import PythonLexer
+
+SNIPPET = [
+    "@dataclass(frozen=True)",
+    "class Point:",
+    '    """A point in the plane"""',
+    "    x: float = 0.0",
+    "    y: float = 0.0",
+    "",
+    "    def scaled(self, factor: float) -> 'Point':",
+    "        # Both coordinates at once",
+    "        return Point(self.x * factor, self.y * factor)",
+    "",
+]
+
+
+def full_relex(lines) -> float:
+    lexer = PythonLexer()
+    state = lexer.initial_state
+    start = time.perf_counter()
+    for line in lines:
+        _, state = lexer.lex(line, state)
+    return time.perf_counter() - start
+
+
+def edit_cost(editor: Editor, highlighter: Highlighter, edit, repeat: int):
+    timings = []
+    lexed = []
+    for _ in range(repeat):
+        before = highlighter.lexed_lines
+        start = time.perf_counter()
+        edit()
+        highlighter.run_pending()
+        timings.append(time.perf_counter() - start)
+        lexed.append(highlighter.lexed_lines - before)
+        editor.undo()
+        highlighter.run_pending()
+    return statistics.median(timings), statistics.median(lexed)
+
+
+def typing_time(editor: Editor, keys: int) -> float:
+    start = time.perf_counter()
+    for _ in range(keys):
+        editor.append("x")
+    elapsed = time.perf_counter() - start
+    for _ in range(keys):
+        editor.undo()
+    return elapsed / keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    arguments = parser.parse_args()
+
+    lines = (SNIPPET * (arguments.lines // len(SNIPPET) + 1))[: arguments.lines]
+    middle = arguments.lines // 2
+    middle -= middle % len(SNIPPET)
+    editor = Editor(text=lines, cursor=Cursor(line=middle + 4, char=0))
+    highlighter = Highlighter(editor, PythonLexer())
+
+    start = time.perf_counter()
+    highlighter.run_pending()
+    print(f"first pass                {(time.perf_counter() - start) * 1e3:10.1f} ms")
+    print(f"full re-lex               {full_relex(lines) * 1e3:10.1f} ms")
+
+    def type_character():
+        editor.move_to(middle + 4, 4)
+        editor.append("z")
+
+    def open_string():
+        editor.move_to(middle + 5, 0)
+        editor.append('"""')
+
+    edits = (("one character", type_character), ("open '\"\"\"'", open_string))
+    for name, edit in edits:
+        elapsed, lexed = edit_cost(editor, highlighter, edit, arguments.repeat)
+        print(f"re-highlight {name:<12} {elapsed * 1e3:10.3f} ms  {lexed:>8.0f} lines")
+
+    idle = typing_time(editor, 2000)
+    highlighter.start()
+    # Opening a string at the top sends the worker through the whole file
+    editor.move_to(0, 0)
+    editor.append('"""')
+    editor.move_to(middle, 0)
+    busy = typing_time(editor, 2000)
+    highlighter.close()
+    print(f"typing, worker idle       {idle * 1e6:10.1f} us/key")
+    print(f"typing, worker lexing     {busy * 1e6:10.1f} us/key")
+
+
+if __name__ == "__main__":
+    main()
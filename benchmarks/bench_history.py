@@ -0,0 +1,50 @@
+"""Undo history memory over a long keystroke replay.
+
+Run with: python -m benchmarks.bench_history [--keys 1000000] [--cap-mb 4]
+"""
+import argparse
+import time
+import tracemalloc
+from src.editor import Cursor, Editor
+from src.history import History
+
+# Words, line breaks, typos and corrections
+KEYSTROKES = list("lorem ipsum") + ["\n"] + list("dolr") + ["\b", "\b"] + list("or")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--cap-mb", type=float, default=4)
+    parser.add_argument("--report-every", type=int, default=100_000)
+    args = parser.parse_args()
+
+    history = History(max_bytes=int(args.cap_mb * (1 << 20)))
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0), history=history)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+
+    print(
+        f"{'keys':>10}{'entries':>10}{'history MB':>12}{'traced MB':>12}{'keys/s':>10}"
+    )
+    for i in range(1, args.keys + 1):
+        key = KEYSTROKES[i % len(KEYSTROKES)]
+        if key == "\n":
+            editor.add_line()
+        elif key == "\b":
+            editor.delete()
+        else:
+            editor.append(key)
+        if i % args.report_every == 0:
+            traced = tracemalloc.get_traced_memory()[0] - baseline
+            rate = i / (time.perf_counter() - start)
+            print(
+                f"{i:>10}{len(history):>10}{history.size / (1 << 20):>12.2f}"
+                f"{traced / (1 << 20):>12.2f}{rate:>10,.0f}"
+            )
+    print("traced memory includes the document itself, which keeps growing")
+
+
+if __name__ == "__main__":
+    main()
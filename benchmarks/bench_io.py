@@ -0,0 +1,88 @@
+"""Load and save throughput in MB/s, per buffer engine and file format.
+
+Loading opens the file and reads every line, so lazy engines decode it all
+too. Saving follows an edit to one line in the middle, so engines that copy
+untouched bytes get to. The first row of each format is plain text-mode
+Python reading and writing the whole file, for reference.
+
+Run with: python -m benchmarks.bench_io [--megabytes 100]
+"""
+import argparse
+import os
+import tempfile
+import time
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.mapped_buffer import MappedBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import Editor
+
+ENGINES = {"rope": RopeBuffer, "mapped": MappedBuffer, "compact": CompactBuffer}
+LINE = "2024-01-01T00:00:00 INFO request served in 12ms path=/api/v1/items"
+FORMATS = {
+    "utf-8 LF": LINE.encode() + b"\n",
+    "utf-8 CRLF": LINE.encode() + b"\r\n",
+    # Latin-1 text with a byte cp1252 leaves undefined
+    "cp1252": LINE.encode() + b" caf\xe9 \x81\n",
+}
+READ_LINES = 16384
+
+
+def generate(path: str, line: bytes, megabytes: int):
+    block = line * ((1 << 20) // len(line) + 1)
+    with open(path, "wb") as file:
+        while file.tell() < megabytes << 20:
+            file.write(block)
+
+
+def text_mode(path: str):
+    start = time.perf_counter()
+    with open(path, "r", errors="surrogateescape") as file:
+        lines = file.read().split("\n")
+    loaded = time.perf_counter()
+    with open(path, "w", errors="surrogateescape") as file:
+        file.write("\n".join(lines))
+    return loaded - start, time.perf_counter() - loaded
+
+
+def editor_round_trip(path: str, engine):
+    start = time.perf_counter()
+    editor = Editor(buffer_type=engine, journaled=False).from_file(path)
+    buffer = editor.buffer
+    line_count = len(buffer)
+    for first in range(0, line_count, READ_LINES):
+        for _ in buffer.lines(first, first + READ_LINES):
+            pass
+    loaded = time.perf_counter()
+    editor.move_to(line_count // 2, 0)
+    editor.append("edited ")
+    started = time.perf_counter()
+    assert editor.save()
+    saved = time.perf_counter() - started
+    editor.exit()
+    return loaded - start, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=100)
+    arguments = parser.parse_args()
+
+    print(f"{'format':<12}{'engine':<10}{'load MB/s':>11}{'save MB/s':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.txt")
+        for name, line in FORMATS.items():
+            generate(path, line, arguments.megabytes)
+            size = os.path.getsize(path) / (1 << 20)
+            runs = [("text mode", lambda: text_mode(path))]
+            for label, engine in ENGINES.items():
+                run = lambda engine=engine: editor_round_trip(path, engine)
+                runs.append((label, run))
+            for label, run in runs:
+                load, save = run()
+                print(f"{name:<12}{label:<10}{size / load:>11.0f}{size / save:>11.0f}")
+                # Every run starts from the same bytes
+                generate(path, line, arguments.megabytes)
+
+
+if __name__ == "__main__":
+    main()
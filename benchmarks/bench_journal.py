@@ -0,0 +1,92 @@
+"""Cost of the crash journal under sustained typing: keystroke latency with
+and without it, how many commits and syncs the typing took, and how long
+replaying the journal takes when the file is reopened after a crash.
+
+Run with: python -m benchmarks.bench_journal [--lines 100000] [--keys 20000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from benchmarks import traces
+from src.editor import Cursor, Editor
+from src.journal import journal_path
+
+WORD_KEYS = 8
+
+
+def type_keys(editor: Editor, keys: int) -> list:
+    """Type keys characters, breaking the line every 60, and time each one"""
+    latencies = []
+    for key in range(keys):
+        start = time.perf_counter()
+        if key % 60 == 59:
+            editor.add_line()
+        else:
+            editor.append("a")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def percentile(values: list, fraction: float) -> float:
+    return sorted(values)[int(fraction * (len(values) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--keys", type=int, default=20_000)
+    parser.add_argument(
+        "--pause",
+        type=float,
+        default=0.0,
+        help=f"seconds to pause after every {WORD_KEYS} keys, as a typist would",
+    )
+    arguments = parser.parse_args()
+
+    print(
+        f"{'journal':<9}{'us/key':>9}{'p99 us':>9}{'max us':>9}"
+        f"{'commits':>9}{'journal KB':>12}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file.txt")
+        with open(path, "w") as file:
+            file.write("\n".join(traces.document(arguments.lines)))
+
+        for journaled in (False, True):
+            editor = Editor(
+                cursor=Cursor(line=arguments.lines // 2, char=0), journaled=journaled
+            ).from_file(path)
+            latencies = []
+            for start in range(0, arguments.keys, WORD_KEYS):
+                latencies += type_keys(editor, min(WORD_KEYS, arguments.keys - start))
+                if arguments.pause:
+                    time.sleep(arguments.pause)
+            commits, size = 0, 0
+            if journaled:
+                editor.journal.flush()
+                commits = editor.journal.commits
+                size = os.path.getsize(editor.journal.path)
+                # Keep the journal as a crash would
+                shutil.copy(editor.journal.path, path + ".crashed")
+            expected = list(editor.text[0 : len(editor.text)])
+            editor.exit()
+            print(
+                f"{'on' if journaled else 'off':<9}"
+                f"{sum(latencies) / len(latencies) * 1e6:>9.2f}"
+                f"{percentile(latencies, 0.99) * 1e6:>9.2f}"
+                f"{max(latencies) * 1e6:>9.0f}{commits:>9}{size / 1024:>12.1f}"
+            )
+
+        shutil.move(path + ".crashed", journal_path(path))
+        start = time.perf_counter()
+        editor = Editor().from_file(path)
+        elapsed = time.perf_counter() - start
+        assert list(editor.text[0 : len(editor.text)]) == expected
+        editor.exit()
+        print(f"\nrecovered {arguments.keys} keys in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
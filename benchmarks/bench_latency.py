@@ -0,0 +1,88 @@
+"""Cost of the latency instrumentation: keys typed one frame at a time through
+TextUserInterface with and without a LatencyMonitor attached.
+
+Run with: python -m benchmarks.bench_latency [--keys 20000] [--lines 100000]
+"""
+import argparse
+import gc
+import statistics
+import time
+from src.editor import Cursor, Editor
+from src.interfaces.keys import Key
+from src.profiling import STAGES, TOTAL, LatencyMonitor
+from src.tui.headless_window import EndOfInput, HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+
+def typed_keys(count: int):
+    text = "the quick brown fox jumps over the lazy dog"
+    keys = []
+    while len(keys) < count:
+        keys.extend(ord(character) for character in text)
+        keys.append(Key.ENTER.value)
+    return keys[:count]
+
+
+def run(keys, line_count: int, latency: LatencyMonitor | None) -> float:
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+    editor = Editor(text=lines, cursor=Cursor(line=line_count // 2, char=0))
+    window = HeadlessWindow()
+    interface = TextUserInterface(
+        editor=editor,
+        logger=NullLogger(),
+        window=window,
+        max_batch_keys=1,
+        latency=latency,
+    )
+    window.feed(keys)
+    start = time.perf_counter()
+    try:
+        while True:
+            interface.handle_input()
+    except EndOfInput:
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    keys = typed_keys(arguments.keys)
+    cases = (("without monitor", None), ("monitor", False), ("monitor and HUD", True))
+    timings = {label: [] for label, _ in cases}
+    # Interleaved so that machine noise hits every case alike
+    for _ in range(arguments.repeat):
+        for label, hud in cases:
+            latency = None if hud is None else LatencyMonitor(hud=hud)
+            gc.collect()
+            timings[label].append(run(keys, arguments.lines, latency))
+    plain = statistics.median(timings["without monitor"])
+    for label, _ in cases:
+        elapsed = statistics.median(timings[label])
+        print(
+            f"{label:<18}{elapsed / len(keys) * 1e6:8.2f} us/key"
+            f"  ({(elapsed / plain - 1) * 100:+.1f} %)"
+        )
+
+    monitor = LatencyMonitor()
+    start = time.perf_counter_ns()
+    for _ in range(100000):
+        monitor.record(TOTAL, 12345)
+    print(f"record()          {(time.perf_counter_ns() - start) / 100000:8.0f} ns")
+    print()
+    summary = latency.summary()
+    print(f"{'stage':<10}" + "".join(f"{c:>10}" for c in ("p50", "p95", "p99", "max")))
+    for stage in STAGES:
+        row = summary[stage]
+        print(
+            f"{stage:<10}"
+            + "".join(f"{row[c + '_us']:>10.1f}" for c in ("p50", "p95", "p99", "max"))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time to first paint and peak RSS when opening large files, per buffer engine.
+
+Run with: python -m benchmarks.bench_load [--sizes 10 100 1000]
+Each measurement runs in a fresh interpreter so peak RSS is not shared.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.mapped_buffer import MappedBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import Editor
+
+ENGINES = {"rope": RopeBuffer, "mapped": MappedBuffer, "compact": CompactBuffer}
+FIRST_PAINT_LINES = 50
+LINE = b"2024-01-01T00:00:00 INFO request served in 12ms path=/api/v1/items\n"
+
+
+def generate(path: str, megabytes: int):
+    block = LINE * (1 << 20 // len(LINE) + 1)
+    with open(path, "wb") as file:
+        while file.tell() < megabytes << 20:
+            file.write(block)
+
+
+def measure(engine: str, path: str) -> dict:
+    start = time.perf_counter()
+    editor = Editor(buffer_type=ENGINES[engine]).from_file(path)
+    first_screen = editor.text[0:FIRST_PAINT_LINES]
+    first_paint = time.perf_counter() - start
+    assert len(first_screen) == FIRST_PAINT_LINES
+    editor.exit()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"first_paint_s": first_paint, "peak_rss_mb": peak_rss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    parser.add_argument("--child", nargs=2, metavar=("ENGINE", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child)))
+        return
+
+    print(f"{'engine':<8}{'size MB':>10}{'first paint s':>16}{'peak RSS MB':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in args.sizes:
+            path = os.path.join(directory, f"{megabytes}.log")
+            generate(path, megabytes)
+            for engine in args.engines:
+                command = [sys.executable, "-m", "benchmarks.bench_load"]
+                output = subprocess.run(
+                    command + ["--child", engine, path],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{engine:<8}{megabytes:>10}"
+                    f"{result['first_paint_s']:>16.4f}{result['peak_rss_mb']:>14.1f}"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
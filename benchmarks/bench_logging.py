@@ -0,0 +1,76 @@
+"""Per-call cost of debug logging on the thread that logs: the queued
+FileLogger against a plain synchronous logging.FileHandler, with the level
+off, on, sampled and rate limited.
+
+Each call logs a message with two arguments, as a keystroke handler would.
+
+Run with: python -m benchmarks.bench_logging [--calls 200000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from src.logger import FileLogger, Limit
+
+
+def time_calls(log, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        log("key %d took %d ns", i, 1234)
+    return (time.perf_counter() - start) / calls
+
+
+def synchronous(path: str, calls: int) -> float:
+    logger = logging.getLogger("bench_logging.synchronous")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    try:
+        return time_calls(logger.debug, calls)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def queued(path: str, calls: int, **options) -> tuple:
+    logger = FileLogger(path, **options)
+    per_call = time_calls(
+        lambda *args: logger.log_debug(*args, category="keys"), calls
+    )
+    start = time.perf_counter()
+    logger.close()
+    return per_call, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    arguments = parser.parse_args()
+    calls = arguments.calls
+
+    print(f"{'logger':<26}{'us/call':>9}{'drain s':>9}{'log MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sync.log")
+        per_call = synchronous(path, calls)
+        size = os.path.getsize(path) / (1 << 20)
+        label = "synchronous FileHandler"
+        print(f"{label:<26}{per_call * 1e6:>9.2f}{'':>9}{size:>8.1f}")
+
+        runs = [
+            ("queued, level off", {"level": logging.INFO}),
+            ("queued", {}),
+            ("queued, 1 in 100", {"limits": {"keys": Limit(sample_every=100)}}),
+            ("queued, 1000/s", {"limits": {"keys": Limit(per_second=1000)}}),
+        ]
+        for index, (label, options) in enumerate(runs):
+            path = os.path.join(directory, f"queued{index}.log")
+            per_call, drain = queued(path, calls, max_bytes=0, **options)
+            size = os.path.getsize(path) / (1 << 20)
+            print(f"{label:<26}{per_call * 1e6:>9.2f}{drain:>9.2f}{size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Heap memory per line held by each buffer engine for a large log file, once
+loaded and again after editing a share of its lines, with the cost of reading
+and editing lines.
+
+The list engine is a plain list of str, the representation the editor
+started with. Memory is measured with tracemalloc, so file mappings, which
+the kernel can page out at will, are not counted.
+
+Run with: python -m benchmarks.bench_memory [--lines 1000000] [--edited 0.01]
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.list_buffer import ListBuffer
+from src.buffers.mapped_buffer import MappedBuffer
+from src.buffers.rope_buffer import RopeBuffer
+
+ENGINES = {
+    "list": ListBuffer,
+    "rope": RopeBuffer,
+    "mapped": MappedBuffer,
+    "compact": CompactBuffer,
+}
+LINE = "2024-01-01T00:00:00 INFO request {:>8} served in 12ms path=/api/v1/items"
+
+
+def held(function):
+    """Result of function and the heap bytes still allocated after it returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--edited", type=float, default=0.01)
+    parser.add_argument("--reads", type=int, default=100_000)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    arguments = parser.parse_args()
+
+    rng = random.Random(0)
+    edits = rng.sample(range(arguments.lines), int(arguments.lines * arguments.edited))
+    reads = [rng.randrange(arguments.lines) for _ in range(arguments.reads)]
+    line_bytes = len(LINE.format(0)) + 1
+    print(f"{arguments.lines} lines of {line_bytes} bytes")
+    print(
+        f"{'engine':<9}{'B/line':>9}{'edited B/line':>15}"
+        f"{'load s':>9}{'read us':>9}{'edit us':>9}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "big.log")
+        with open(path, "w") as file:
+            file.write("\n".join(LINE.format(i) for i in range(arguments.lines)))
+
+        for name in arguments.engines:
+            engine = ENGINES[name]
+
+            def edit(buffer):
+                for index in edits:
+                    buffer.set_line(index, buffer.line(index) + " edited")
+                return buffer
+
+            # Timings are taken apart from the measurements, which tracemalloc
+            # slows down
+            start = time.perf_counter()
+            buffer = engine.from_file(path)
+            load = time.perf_counter() - start
+            start = time.perf_counter()
+            for index in reads:
+                buffer.line(index)
+            read = (time.perf_counter() - start) / len(reads)
+            start = time.perf_counter()
+            edit(buffer)
+            edit_time = (time.perf_counter() - start) / max(len(edits), 1)
+            buffer.close()
+            del buffer
+
+            buffer, loaded = held(lambda: engine.from_file(path))
+            buffer.close()
+            del buffer
+            buffer, edited = held(lambda: edit(engine.from_file(path)))
+            buffer.close()
+            del buffer
+            print(
+                f"{name:<9}{loaded / arguments.lines:>9.1f}"
+                f"{edited / arguments.lines:>15.1f}"
+                f"{load:>9.2f}{read * 1e6:>9.2f}{edit_time * 1e6:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cost of jumping around a large document: line jumps, page motion and
+offset lookups through the cached table, against stepping with the arrow keys
+and summing line lengths from the top.
+
+Run with: python -m benchmarks.bench_motion [--lines 1000000]
+"""
+import argparse
+import random
+import statistics
+import time
+from src.editor import Cursor, Editor
+
+
+def timed(action, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def naive_offset(editor: Editor, line: int) -> int:
+    return sum(len(text) + 1 for text in editor.text[:line])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    arguments = parser.parse_args()
+
+    random.seed(0)
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(arguments.lines)]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    targets = [random.randrange(arguments.lines) for _ in range(arguments.repeat)]
+
+    start = time.perf_counter()
+    editor.offsets.total()
+    print(f"offset table build        {(time.perf_counter() - start) * 1e3:10.1f} ms")
+
+    def jump():
+        editor.move_to(targets.pop(), 0)
+        targets.insert(0, editor.cursor["line"])
+
+    def jump_percent():
+        editor.move_to_offset(editor.offsets.total() * random.randrange(100) // 100)
+
+    def edit_then_offset():
+        editor.append("x")
+        editor.offsets.offset_of(random.randrange(arguments.lines))
+
+    def page_down():
+        editor.cursor_page_down(50)
+
+    def arrows_1000():
+        for _ in range(1000):
+            editor.cursor_down()
+
+    def naive_lookup():
+        naive_offset(editor, random.randrange(arguments.lines))
+
+    rows = [
+        ("go to line", jump),
+        ("go to percent", jump_percent),
+        ("edit + offset lookup", edit_then_offset),
+        ("page down", page_down),
+        ("1000 x cursor down", arrows_1000),
+        ("naive offset lookup", naive_lookup),
+    ]
+    for label, action in rows:
+        repeat = 5 if action is naive_lookup else arguments.repeat
+        print(f"{label:<26}{timed(action, repeat) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Keystrokes typed at 10k cursors: applied as one batched edit, against
+moving one cursor to each position and typing there.
+
+Keys go through TextUserInterface, so every keystroke is dispatched, applied
+at all the cursors and drawn as one frame. Cursors are on consecutive lines,
+or every SPACING lines apart through a document SPACING times as long.
+
+Run with: python -m benchmarks.bench_multicursor [--cursors 10000] [--keys 20]
+"""
+import argparse
+import time
+from benchmarks import traces
+from src.editor import Cursor, Editor
+from src.interfaces.keys import Key
+from src.tui.headless_window import HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+SPACING = 10
+
+
+def typed(key_count: int):
+    """Characters, then line breaks and backspaces, one key per frame"""
+    keys = [ord("x")] * (key_count // 2)
+    keys += [Key.ENTER.value, Key.BACKSPACE.value] * (key_count // 4)
+    return keys
+
+
+def batched(cursor_count: int, spacing: int, keys):
+    editor = Editor(text=traces.document(cursor_count * spacing), journaled=False)
+    window = HeadlessWindow()
+    interface = TextUserInterface(editor=editor, logger=NullLogger(), window=window)
+    window.feed([Key.ESC.value, ord("a")])
+    interface.handle_input()
+    for line in range(spacing, cursor_count * spacing, spacing):
+        editor.add_cursor(line, 5)
+    start = time.perf_counter()
+    for key in keys:
+        window.feed([key])
+        interface.handle_input()
+    elapsed = time.perf_counter() - start
+    assert len(editor.extra_cursors) == cursor_count - 1
+    return elapsed / len(keys)
+
+
+def one_by_one(cursor_count: int, spacing: int, keys):
+    """The same keys typed at each position in turn, bottom up so the lines
+    above never move"""
+    editor = Editor(text=traces.document(cursor_count * spacing), journaled=False)
+    lines = range((cursor_count - 1) * spacing, -1, -spacing)
+    start = time.perf_counter()
+    for line in lines:
+        editor.move_to(line, 5)
+        for key in keys:
+            if key == Key.ENTER.value:
+                editor.add_line()
+            elif key == Key.BACKSPACE.value:
+                editor.delete()
+            else:
+                editor.append(chr(key))
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cursors", type=int, default=10_000)
+    parser.add_argument("--keys", type=int, default=20)
+    arguments = parser.parse_args()
+    keys = typed(arguments.keys)
+
+    print(f"{arguments.cursors} cursors, {len(keys)} keys")
+    print(f"{'layout':<12}{'batched ms':>12}{'one by one ms':>15}{'speedup':>9}")
+    for label, spacing in (("adjacent", 1), (f"every {SPACING}", SPACING)):
+        fast = batched(arguments.cursors, spacing, keys)
+        slow = one_by_one(arguments.cursors, spacing, keys)
+        print(
+            f"{label:<12}{fast * 1e3:>12.2f}{slow * 1e3:>15.2f}{slow / fast:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Pager costs on a large log: opening it, jumping to the end, to a line
+number and to a percentage, paging, and the memory all that takes, which
+should not grow with the file.
+
+Run with: python -m benchmarks.bench_pager [--lines 1000000 10000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks import traces
+from src.pager import FileStream
+from src.tui.headless_window import HeadlessWindow
+from src.tui.pager import Pager
+
+PAGES = 200
+
+
+def create_log(path: str, line_count: int):
+    with open(path, "w") as file:
+        chunk = 100_000
+        for start in range(0, line_count, chunk):
+            lines = traces.document(min(chunk, line_count - start))
+            file.write("\n".join(lines) + "\n")
+
+
+def timed(viewer: Pager, window: HeadlessWindow, keys: str) -> float:
+    window.feed([ord(key) for key in keys])
+    start = time.perf_counter()
+    viewer.handle_input()
+    return time.perf_counter() - start
+
+
+def run(path: str, line_count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    window = HeadlessWindow()
+    viewer = Pager(FileStream(path), window=window)
+    opened = time.perf_counter() - start
+    end = timed(viewer, window, "G")
+    line = timed(viewer, window, f"{line_count // 2}G")
+    percent = timed(viewer, window, "25%")
+    page = sum(timed(viewer, window, " ") for _ in range(PAGES)) / PAGES
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    viewer.close()
+    return opened, end, line, percent, page, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lines", type=int, nargs="+", default=[1_000_000, 10_000_000]
+    )
+    arguments = parser.parse_args()
+
+    print(
+        f"{'lines':>9}{'MB':>7}{'open ms':>9}{'end ms':>8}{'line ms':>9}"
+        f"{'25% ms':>8}{'page ms':>9}{'peak KB':>9}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for line_count in arguments.lines:
+            path = os.path.join(directory, f"file{line_count}.log")
+            create_log(path, line_count)
+            size = os.path.getsize(path) / (1 << 20)
+            opened, end, line, percent, page, peak = run(path, line_count)
+            print(
+                f"{line_count:>9}{size:>7.0f}{opened * 1e3:>9.2f}{end * 1e3:>8.2f}"
+                f"{line * 1e3:>9.1f}{percent * 1e3:>8.2f}{page * 1e3:>9.2f}"
+                f"{peak / 1024:>9.0f}"
+            )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Paste throughput through TextUserInterface, one key per frame against batched input.
+
+Run with: python -m benchmarks.bench_paste [--chars 200000] [--lines 100000]
+"""
+import argparse
+import time
+from src.tui.headless_window import EndOfInput, HeadlessWindow, NullLogger
+from src.editor import Cursor, Editor
+from src.tui.tui import TextUserInterface
+
+
+def pasted_keys(characters: int):
+    paragraph = "The quick brown fox jumps over the lazy dog. " * 3 + "\n"
+    text = (paragraph * (characters // len(paragraph) + 1))[:characters]
+    return [ord(character) for character in text]
+
+
+def run(max_batch_keys: int, keys, line_count: int):
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+    editor = Editor(text=lines, cursor=Cursor(line=line_count // 2, char=0))
+    window = HeadlessWindow()
+    interface = TextUserInterface(
+        editor=editor,
+        logger=NullLogger(),
+        max_batch_keys=max_batch_keys,
+        window=window,
+    )
+    window.reset_counters()
+    window.feed(keys)
+    start = time.perf_counter()
+    try:
+        while True:
+            interface.handle_input()
+    except EndOfInput:
+        pass
+    return len(keys) / (time.perf_counter() - start), window.refreshes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=200_000)
+    parser.add_argument("--lines", type=int, default=100_000)
+    args = parser.parse_args()
+
+    keys = pasted_keys(args.chars)
+    print(f"{'input':<10}{'chars/s':>14}{'frames':>10}")
+    for name, max_batch_keys in (("per-key", 1), ("batched", 4096)):
+        rate, frames = run(max_batch_keys, keys, args.lines)
+        print(f"{name:<10}{rate:>14,.0f}{frames:>10}")
+
+
+if __name__ == "__main__":
+    main()
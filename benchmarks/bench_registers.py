@@ -0,0 +1,69 @@
+"""Pasting a large register: the old character-run paste through
+Editor.append against splicing the register into the buffer at once, plus the
+memory a large yank holds with and without spilling to a temporary file.
+
+Run with: python -m benchmarks.bench_registers [--lines 100000]
+"""
+import argparse
+import time
+import tracemalloc
+from src import registers
+from src.editor import Cursor, Editor
+
+
+def document(line_count: int):
+    return [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+
+
+def legacy_paste(line_count: int) -> float:
+    editor = Editor(text=document(line_count * 2), cursor=Cursor(line=0, char=0))
+    editor.copy_lines(0, line_count)
+    text = editor.copied
+    start = time.perf_counter()
+    editor.append(text)
+    return time.perf_counter() - start
+
+
+def splice_paste(line_count: int) -> float:
+    editor = Editor(text=document(line_count * 2), cursor=Cursor(line=0, char=0))
+    editor.copy_lines(0, line_count)
+    editor.copied
+    start = time.perf_counter()
+    editor.paste()
+    elapsed = time.perf_counter() - start
+    assert len(editor.text) == line_count * 3
+    return elapsed
+
+
+def yank_memory(line_count: int, spill_size: int) -> int:
+    registers.SPILL_SIZE = spill_size
+    editor = Editor(text=document(line_count), cursor=Cursor(line=0, char=0))
+    tracemalloc.start()
+    editor.copy_lines(0, line_count)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    editor.exit()
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--legacy-lines", type=int, default=10_000)
+    arguments = parser.parse_args()
+
+    for line_count in (arguments.legacy_lines, arguments.lines):
+        legacy = legacy_paste(line_count)
+        splice = splice_paste(line_count)
+        print(f"append paste, {line_count:>7} lines {legacy * 1e3:10.1f} ms")
+        print(f"splice paste, {line_count:>7} lines {splice * 1e3:10.1f} ms")
+
+    spill_size = registers.SPILL_SIZE
+    in_memory = yank_memory(arguments.lines, spill_size=1 << 62)
+    spilled = yank_memory(arguments.lines, spill_size=spill_size)
+    print(f"yank held in memory       {in_memory / 1e6:10.1f} MB")
+    print(f"yank spilled to a file    {spilled / 1e6:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Bytes and curses calls per keystroke, full redraw against the viewport renderer.
+
+Run with: python -m benchmarks.bench_render [--lines 10000 100000 1000000]
+"""
+import argparse
+import time
+from src.tui.headless_window import HeadlessWindow
+from src.editor import Cursor, Editor
+from src.tui.viewport import Viewport
+
+# Typing, breaking and joining lines and moving around
+KEYSTROKES = ["a", "b", "\n", "c", "\b", "\b", "down", "down", "up", "right"]
+
+
+def full_redraw(window, editor: Editor):
+    """The renderer TextUserInterface used before the viewport"""
+    window.clear()
+    window.addstr("\n".join(editor.text), 0)
+    window.move(editor.cursor["line"], editor.cursor["char"])
+    window.refresh()
+
+
+def press(editor: Editor, key: str):
+    if key == "\n":
+        editor.add_line()
+    elif key == "\b":
+        editor.delete()
+    elif key == "down":
+        editor.cursor_down()
+    elif key == "up":
+        editor.cursor_up()
+    elif key == "right":
+        editor.cursor_right()
+    else:
+        editor.append(key)
+
+
+def run(renderer: str, line_count: int, keys: int):
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+    editor = Editor(text=lines, cursor=Cursor(line=line_count // 2, char=0))
+    window = HeadlessWindow()
+    viewport = Viewport()
+    editor.add_listener(viewport.invalidate)
+
+    def render():
+        if renderer == "viewport":
+            viewport.render(window, editor)
+        else:
+            full_redraw(window, editor)
+
+    render()
+    window.reset_counters()
+
+    start = time.perf_counter()
+    for i in range(keys):
+        press(editor, KEYSTROKES[i % len(KEYSTROKES)])
+        render()
+    elapsed = time.perf_counter() - start
+    return window.bytes / keys, window.calls / keys, keys / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lines", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--keys", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'renderer':<10}{'lines':>10}{'bytes/key':>14}{'calls/key':>11}{'keys/s':>10}"
+    )
+    for line_count in args.lines:
+        for renderer in ("full", "viewport"):
+            bytes_per_key, calls_per_key, rate = run(renderer, line_count, args.keys)
+            print(
+                f"{renderer:<10}{line_count:>10}"
+                f"{bytes_per_key:>14,.0f}{calls_per_key:>11.1f}{rate:>10,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
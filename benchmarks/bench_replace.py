@@ -0,0 +1,86 @@
+"""Replace-all throughput: a million matches in one file, and the same
+million spread over a thousand files, in one process against a worker pool.
+
+Every run loads the files, replaces and saves them through Editor.save.
+
+Run with: python -m benchmarks.bench_replace [--matches 1000000] [--files 1000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from src.editor import Editor
+from src.replace import replace_all, replace_in_files
+
+MATCHES_PER_LINE = 10
+LINE = " ".join(["user_id=42"] * MATCHES_PER_LINE)
+
+
+def create_file(path: str, matches: int):
+    with open(path, "w") as file:
+        file.write("\n".join([LINE] * (matches // MATCHES_PER_LINE)))
+
+
+def one_file(directory: str, matches: int, regex: bool):
+    path = os.path.join(directory, "big.txt")
+    create_file(path, matches)
+    start = time.perf_counter()
+    editor = Editor(journaled=False).from_file(path)
+    loaded = time.perf_counter()
+    if regex:
+        count = replace_all(editor, r"user_id=(\d+)", r"account_id=\1", regex=True)
+    else:
+        count = replace_all(editor, "user_id", "account_id")
+    replaced = time.perf_counter()
+    editor.save()
+    editor.exit()
+    saved = time.perf_counter()
+    return count, loaded - start, replaced - loaded, saved - replaced
+
+
+def many_files(directory: str, matches: int, files: int, workers: int | None):
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"file{index:05}.txt")
+        create_file(path, matches // files)
+        paths.append(path)
+    start = time.perf_counter()
+    count = 0
+    results = replace_in_files(paths, "user_id", "account_id", workers=workers)
+    for path, result in results:
+        if isinstance(result, str):
+            raise RuntimeError(f"{path}: {result}")
+        count += result
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    print(f"One file of {arguments.matches // MATCHES_PER_LINE} lines")
+    print(f"{'pattern':<9}{'matches':>10}{'load s':>9}{'replace s':>11}{'save s':>9}")
+    for regex in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            count, load, replaced, save = one_file(
+                directory, arguments.matches, regex
+            )
+        print(
+            f"{'regex' if regex else 'literal':<9}{count:>10}"
+            f"{load:>9.2f}{replaced:>11.2f}{save:>9.2f}"
+        )
+
+    print(f"\n{arguments.files} files")
+    print(f"{'workers':<12}{'matches':>10}{'seconds':>9}{'matches/s':>12}")
+    for label, workers in (("1 process", 1), (f"{os.cpu_count()} workers", None)):
+        with tempfile.TemporaryDirectory() as directory:
+            count, elapsed = many_files(
+                directory, arguments.matches, arguments.files, workers
+            )
+        print(f"{label:<12}{count:>10}{elapsed:>9.2f}{count / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Save latency and peak RSS on large buffers, and key latency during a background save.
+
+Run with: python -m benchmarks.bench_save [--sizes 1000]
+Each measurement runs in a fresh interpreter so peak RSS is not shared.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.bench_load import generate
+from src.buffers.mapped_buffer import MappedBuffer
+from src.editor import Cursor, Editor
+
+MODES = ["legacy", "streaming", "background"]
+
+
+def legacy_save(editor: Editor):
+    """The save Editor used before streaming: one string for the whole document"""
+    content = "\n".join(editor.text)
+    with open(editor.file_path, "w") as file:
+        file.write(content)
+
+
+def measure(mode: str, path: str) -> dict:
+    editor = Editor(cursor=Cursor(line=0, char=0), buffer_type=MappedBuffer)
+    editor.from_file(path)
+    editor.append("x")
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    key_latencies = []
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        legacy_save(editor)
+    elif mode == "streaming":
+        editor.save()
+    else:
+        saver = threading.Thread(target=editor.save)
+        saver.start()
+        while saver.is_alive():
+            key_start = time.perf_counter()
+            editor.cursor_right()
+            key_latencies.append(time.perf_counter() - key_start)
+            time.sleep(0.001)
+        saver.join()
+    elapsed = time.perf_counter() - start
+
+    editor.exit()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "save_s": elapsed,
+        "rss_growth_mb": (peak_rss - rss_before) / 1024,
+        "max_key_ms": max(key_latencies, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--modes", nargs="+", default=MODES)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child)))
+        return
+
+    print(
+        f"{'mode':<12}{'size MB':>9}{'save s':>9}"
+        f"{'RSS growth MB':>15}{'max key ms':>12}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in args.sizes:
+            path = os.path.join(directory, f"{megabytes}.log")
+            for mode in args.modes:
+                generate(path, megabytes)
+                command = [sys.executable, "-m", "benchmarks.bench_save"]
+                output = subprocess.run(
+                    command + ["--child", mode, path],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{mode:<12}{megabytes:>9}{result['save_s']:>9.2f}"
+                    f"{result['rss_growth_mb']:>15.1f}{result['max_key_ms']:>12.2f}"
+                )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
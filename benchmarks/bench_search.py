@@ -0,0 +1,77 @@
+"""Jump-to-next-match latency on a large document, indexed against a naive line scan.
+
+Run with: python -m benchmarks.bench_search [--lines 1000000]
+"""
+import argparse
+import random
+import time
+from src.editor import Cursor, Editor
+from src.search import SearchIndex
+
+
+def naive_find(editor: Editor, query: str, line: int, char: int):
+    """Scan Editor.text line by line from Python, wrapping around the end"""
+    text = editor.text
+    line_count = len(text)
+    for distance in range(line_count + 1):
+        index = (line + distance) % line_count
+        found = text[index].find(query, char if distance == 0 else 0)
+        if found != -1:
+            return index, found, len(query)
+    return None
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--jumps", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(args.lines)]
+    needles = sorted(rng.sample(range(args.lines), args.jumps))
+    for line in needles:
+        lines[line] += " needle"
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    index = SearchIndex(editor)
+
+    _, cold = timed(index.find, "absent", 0, 0)
+    _, warm = timed(index.find, "absent", 0, 0)
+    _, naive = timed(naive_find, editor, "absent", 0, 0)
+    print(
+        f"full scan without a match: naive {naive:.1f} ms,"
+        f" index cold {cold:.1f} ms, index warm {warm:.1f} ms"
+    )
+
+    def naive_next(*arguments):
+        return naive_find(editor, *arguments)
+
+    for name, find in (("naive", naive_next), ("index", index.find)):
+        line, char = 0, 0
+        latencies = []
+        for _ in range(args.jumps):
+            match, elapsed = timed(find, "needle", line, char)
+            latencies.append(elapsed)
+            # Type on the matched line so the index has to follow edits
+            editor.move_to(match[0], 0)
+            editor.append("x")
+            line, char = match[0], len(editor.text[match[0]])
+        latencies.sort()
+        print(
+            f"{name:<6} next match: median {latencies[len(latencies) // 2]:.2f} ms,"
+            f" max {latencies[-1]:.2f} ms"
+        )
+
+    prefixes = ["n", "ne", "nee", "need", "needl", "needle"]
+    _, elapsed = timed(lambda: [index.find(p, 0, 0) for p in prefixes])
+    print(f"search-as-you-type, {len(prefixes)} keystrokes: {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Startup time: the modules imported at launch and what each costs, and
+the wall-clock time from starting the interpreter to the first paint of a
+file and to the editor being ready for keys.
+
+The first paint is the preview drawn straight from the file, and ready is
+once the file is loaded and the interface has drawn it, as main.py does;
+both go to a headless window, so no terminal is needed.
+
+Run with: python -m benchmarks.bench_startup [--lines 1000 1000000] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks import traces
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: prints the wall-clock time of the first paint,
+# then of the interface being ready
+LAUNCH = """
+import sys, time
+from src.buffer_manager import BufferManager
+from src.logger import FileLogger
+from src.tui.headless_window import HeadlessWindow
+from src.tui.tui import TextUserInterface, show_preview
+path, log = sys.argv[1:3]
+window = HeadlessWindow()
+show_preview(path, window)
+print(time.time())
+buffers = BufferManager()
+buffers.open(path)
+logger = FileLogger(log)
+TextUserInterface(buffers.active, logger, window=window, buffers=buffers, wrap=True)
+print(time.time())
+logger.close()
+buffers.close_all()
+"""
+
+
+def import_times(top: int):
+    """Total import time of main.py, and the modules with the longest"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        if not own.strip().isdigit():
+            continue
+        modules.append((int(own), int(cumulative), name.rstrip()))
+    total = sum(own for own, _, _ in modules)
+    return total, len(modules), sorted(modules, key=lambda m: -m[1])[:top]
+
+
+def launch(path: str, log: str):
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", LAUNCH, path, log],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    painted, ready = (float(line) for line in result.stdout.split())
+    return painted - started, ready - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 1_000_000])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    arguments = parser.parse_args()
+
+    total, count, slowest = import_times(arguments.top)
+    print(f"import main: {count} modules, {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+    for own, cumulative, name in slowest:
+        print(f"{cumulative / 1000:>14.1f}{own / 1000:>9.1f}  {name}")
+
+    print(f"\n{'lines':>9}{'first paint ms':>16}{'ready ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        log = os.path.join(directory, "editor.log")
+        for line_count in arguments.lines:
+            path = os.path.join(directory, f"file{line_count}.txt")
+            with open(path, "w") as file:
+                file.write("\n".join(traces.document(line_count)))
+            runs = sorted(launch(path, log) for _ in range(arguments.runs))
+            painted, ready = runs[len(runs) // 2]
+            print(f"{line_count:>9}{painted * 1000:>16.1f}{ready * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
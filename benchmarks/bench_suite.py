@@ -0,0 +1,204 @@
+"""Regression suite: keystroke traces replayed headlessly against Editor and
+against TextUserInterface drawing to a fake window, on documents of several
+sizes. Results are written as JSON, and compared with an earlier results
+file when one is given: any case slower than it by more than the threshold
+is reported and makes the run exit with status 1.
+
+Run with: python -m benchmarks.bench_suite [--sizes 1000,100000,1000000]
+          [--output results.json] [--baseline previous.json] [--threshold 0.25]
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from typing import Dict, List
+from benchmarks import traces
+from src.batch import replay
+from src.editor import Cursor, Editor
+from src.tui.headless_window import EndOfInput, HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+TARGETS = ("editor", "tui")
+RESULTS_VERSION = 1
+
+
+def run_editor(editor: Editor, trace: traces.Trace) -> float:
+    start = time.perf_counter()
+    replay(editor, trace.keys)
+    return time.perf_counter() - start
+
+
+def run_tui(editor: Editor, trace: traces.Trace) -> float:
+    window = HeadlessWindow()
+    interface = TextUserInterface(
+        editor=editor,
+        logger=NullLogger(),
+        window=window,
+        max_batch_keys=len(trace.keys) if trace.burst else 1,
+    )
+    window.feed(trace.keys)
+    start = time.perf_counter()
+    try:
+        while True:
+            interface.handle_input()
+    except EndOfInput:
+        pass
+    elapsed = time.perf_counter() - start
+    interface.close()
+    return elapsed
+
+
+RUNNERS = {"editor": run_editor, "tui": run_tui}
+
+
+def case_id(result: Dict) -> str:
+    return f"{result['target']}/{result['trace']}/{result['lines']}"
+
+
+def measure(
+    line_count: int,
+    target: str,
+    suite: List[traces.Trace],
+    repeat: int,
+    min_time: float,
+) -> List[Dict]:
+    editor = Editor(text=traces.document(line_count), cursor=Cursor(line=0, char=0))
+    results = []
+    for trace in suite:
+        timings = []
+        for _ in range(repeat):
+            # A sample replays the trace for at least min_time so that timer
+            # resolution and scheduling noise stay small next to it
+            gc.collect()
+            elapsed = 0.0
+            runs = 0
+            while runs == 0 or elapsed < min_time:
+                # Every run starts from the same spot, in the middle of the document
+                editor.move_to(line_count // 2, 0)
+                elapsed += RUNNERS[target](editor, trace)
+                runs += 1
+            timings.append(elapsed / runs)
+        # The fastest sample is the one least disturbed by the rest of the machine
+        elapsed = min(timings)
+        results.append(
+            {
+                "target": target,
+                "trace": trace.name,
+                "lines": line_count,
+                "keys": len(trace.keys),
+                "seconds": elapsed,
+                "us_per_key": elapsed / len(trace.keys) * 1e6,
+            }
+        )
+    editor.exit()
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Cases slower than the baseline by more than threshold, as a fraction"""
+    previous = {case_id(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(case_id(result))
+        if before is None:
+            continue
+        ratio = result["us_per_key"] / before["us_per_key"]
+        result["baseline_us_per_key"] = before["us_per_key"]
+        result["ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(case_id(result))
+    return regressions
+
+
+def print_result(result: Dict, regressed: bool):
+    line = (
+        f"{result['target']:<7}{result['trace']:<12}{result['lines']:>9}"
+        f"{result['keys']:>7}{result['us_per_key']:>12.2f}"
+    )
+    if "ratio" in result:
+        line += f"{result['baseline_us_per_key']:>12.2f}{result['ratio']:>8.2f}x"
+        if regressed:
+            line += "  SLOWER"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--keys", type=int, default=2000, help="keys per trace")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per sample"
+    )
+    parser.add_argument("--traces", default=",".join(traces.TRACES))
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument(
+        "--trace",
+        action="append",
+        default=[],
+        metavar="SCRIPT",
+        help="also replay a recorded edit script",
+    )
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="PATH", help="results of an earlier run to compare"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="slowdown over the baseline that counts as a regression (0.25 = 25%%)",
+    )
+    arguments = parser.parse_args()
+
+    sizes = [int(size) for size in arguments.sizes.split(",")]
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as file:
+            baseline = json.load(file)
+
+    print(
+        f"{'target':<7}{'trace':<12}{'lines':>9}{'keys':>7}{'us/key':>12}"
+        + (f"{'baseline':>12}{'ratio':>9}" if baseline else "")
+    )
+    results = []
+    regressions = []
+    for line_count in sizes:
+        suite = [
+            traces.generate(name, line_count, arguments.keys)
+            for name in arguments.traces.split(",")
+        ] + [traces.load(path) for path in arguments.trace]
+        for target in arguments.targets.split(","):
+            measured = measure(
+                line_count, target, suite, arguments.repeat, arguments.min_time
+            )
+            if baseline is not None:
+                regressions += compare(measured, baseline, arguments.threshold)
+            for result in measured:
+                print_result(result, case_id(result) in regressions)
+            results += measured
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(
+                {
+                    "version": RESULTS_VERSION,
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
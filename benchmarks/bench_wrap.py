@@ -0,0 +1,54 @@
+"""Cost of paging through soft-wrapped text, against documents of several
+sizes: it should stay flat, as only the rows on screen are laid out.
+
+Every page down and row down goes through the wrap layout and is rendered
+to a fake window; lines are long enough to wrap over several rows.
+
+Run with: python -m benchmarks.bench_wrap [--lines 1000 100000 1000000]
+"""
+import argparse
+import time
+from src.editor import Cursor, Editor
+from src.tui.headless_window import HeadlessWindow
+from src.tui.viewport import Viewport
+from src.tui.wrap import WrapLayout
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod"
+
+
+def document(line_count: int):
+    # One to four rows per line at 80 columns
+    return [f"{i:>10} " + WORDS * (i % 4 + 1) for i in range(line_count)]
+
+
+def run(line_count: int, moves: int, page: bool):
+    editor = Editor(text=document(line_count), cursor=Cursor(line=0, char=0))
+    window = HeadlessWindow()
+    viewport = Viewport(WrapLayout(window.width))
+    editor.add_listener(viewport.invalidate)
+    viewport.render(window, editor)
+    rows = window.height - 2 if page else 1
+    start = time.perf_counter()
+    for _ in range(moves):
+        viewport.layout.move(editor, rows)
+        viewport.render(window, editor)
+    return (time.perf_counter() - start) / moves, editor.cursor["line"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lines", type=int, nargs="+", default=[1000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--moves", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    print(f"{'lines':>9}{'page down us':>14}{'row down us':>13}{'last line':>11}")
+    for line_count in arguments.lines:
+        page, last_line = run(line_count, arguments.moves, page=True)
+        row, _ = run(line_count, arguments.moves, page=False)
+        print(f"{line_count:>9}{page * 1e6:>14.1f}{row * 1e6:>13.1f}{last_line:>11}")
+
+
+if __name__ == "__main__":
+    main()
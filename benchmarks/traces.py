@@ -0,0 +1,110 @@
+"""Keystroke traces replayed by the benchmark suite.
+
+Each trace is the list of key codes a session would send, generated from a
+fixed seed so that every run replays exactly the same keys. A trace also says
+whether its keys arrive one frame at a time, like typing, or all at once,
+like a paste landing in the terminal. Recorded sessions can be replayed too:
+they are edit scripts in the format read by src.batch.parse_script.
+"""
+import os
+import random
+from typing import Callable, Dict, List, NamedTuple
+from src.batch import parse_script
+from src.interfaces.keys import Key
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet "
+    "return value self editor buffer line cursor render"
+).split()
+
+
+class Trace(NamedTuple):
+    name: str
+    keys: List[int]
+    # Whether the keys arrive together and get drained in one frame
+    burst: bool
+
+
+def document(line_count: int) -> List[str]:
+    return [f"{i:>10} lorem ipsum dolor sit amet" for i in range(line_count)]
+
+
+def _text(rng: random.Random, count: int, newline_every: int) -> List[int]:
+    keys = []
+    while len(keys) < count:
+        word = rng.choice(WORDS)
+        keys.extend(ord(character) for character in word)
+        keys.append(Key.ENTER.value if rng.randrange(newline_every) == 0 else 32)
+    return keys[:count]
+
+
+def typing(line_count: int, count: int, rng: random.Random) -> Trace:
+    """Words typed one frame at a time, with a typo fixed now and then"""
+    keys = []
+    for key in _text(rng, count, newline_every=10):
+        keys.append(key)
+        if rng.randrange(25) == 0:
+            keys.extend((ord("x"), Key.BACKSPACE.value))
+    return Trace("typing", keys[:count], burst=False)
+
+
+def paste(line_count: int, count: int, rng: random.Random) -> Trace:
+    """A block of text pasted into the terminal, arriving as one burst"""
+    return Trace("paste", _text(rng, count, newline_every=6), burst=True)
+
+
+def joins(line_count: int, count: int, rng: random.Random) -> Trace:
+    """Joining each line to the one above and splitting it again, walking down
+    the document"""
+    keys = []
+    while len(keys) < count:
+        keys.extend((Key.BACKSPACE.value, Key.ENTER.value, Key.DOWN.value))
+    return Trace("joins", keys[:count], burst=False)
+
+
+def navigation(line_count: int, count: int, rng: random.Random) -> Trace:
+    """Command mode motion: arrows, pages, words and jumps to lines and
+    percentages"""
+    keys = [Key.ESC.value]
+    simple = (
+        Key.UP.value,
+        Key.DOWN.value,
+        Key.LEFT.value,
+        Key.RIGHT.value,
+        Key.PAGE_UP.value,
+        Key.PAGE_DOWN.value,
+        ord("w"),
+        ord("b"),
+        ord("g"),
+    )
+    while len(keys) < count:
+        choice = rng.randrange(10)
+        if choice == 0:
+            keys.extend(ord(digit) for digit in str(rng.randrange(1, line_count + 1)))
+            keys.append(ord("G"))
+        elif choice == 1:
+            keys.extend(ord(digit) for digit in str(rng.randrange(1, 101)))
+            keys.append(ord("%"))
+        else:
+            keys.append(rng.choice(simple))
+    # Back to typing mode, where the next trace expects to start
+    return Trace("navigation", keys[:count] + [ord("a")], burst=False)
+
+
+TRACES: Dict[str, Callable[[int, int, random.Random], Trace]] = {
+    "typing": typing,
+    "paste": paste,
+    "joins": joins,
+    "navigation": navigation,
+}
+
+
+def generate(name: str, line_count: int, count: int, seed: int = 0) -> Trace:
+    return TRACES[name](line_count, count, random.Random(seed))
+
+
+def load(path: str, burst: bool = False) -> Trace:
+    """Trace recorded as an edit script"""
+    with open(path, "r") as file:
+        keys = parse_script(file.read())
+    return Trace(os.path.splitext(os.path.basename(path))[0], keys, burst)
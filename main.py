@@ -1,26 +1,255 @@
-from sys import argv
-from src.editor import Editor
+import argparse
+import re
+import sys
+import time
+from src.autosave import AutoSaver
+from src.buffer_manager import DEFAULT_BUFFER_BUDGET, BufferManager
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.mapped_buffer import MappedBuffer
+from src.buffers.rope_buffer import RopeBuffer
 from src.logger import FileLogger
-from src.tui.tui import TextUserInterface
+from src.profiling import LatencyMonitor, profiled
+from src.replace import replace_in_files
+from src.tui.keymap import Keymap
 import traceback
 
+STORAGE = {"rope": RopeBuffer, "compact": CompactBuffer, "mapped": MappedBuffer}
 
-def main():
-    if len(argv) == 1:
-        raise Exception("You must specify a file")
-    file_path = argv[1]
-    logger = FileLogger()
-    editor = Editor().from_file(file_path)
-    interface = TextUserInterface(editor=editor, logger=logger)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Terminal text editor")
+    parser.add_argument("files", nargs="+", metavar="file", help="file to edit")
+    parser.add_argument(
+        "--script",
+        metavar="PATH",
+        help="apply the edit script to every file without opening the editor",
+    )
+    parser.add_argument(
+        "--replace",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="replace every OLD with NEW in every file without opening the editor",
+    )
+    parser.add_argument(
+        "--regex",
+        action="store_true",
+        help="read OLD in --replace as a regular expression, and NEW as a "
+        "template that can refer to its groups as \\1",
+    )
+    parser.add_argument(
+        "--pager",
+        action="store_true",
+        help="page through the file read-only, without loading it or writing "
+        "anything, as for large logs",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="with --pager, keep showing data appended to the file, as tail -f",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="worker processes for --script and --replace (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--autosave",
+        type=float,
+        metavar="SECONDS",
+        help="save unsaved changes in the background every SECONDS",
+    )
+    parser.add_argument(
+        "--keymap", metavar="PATH", help="INI file overriding the key bindings"
+    )
+    parser.add_argument(
+        "--latency-hud",
+        action="store_true",
+        help="show keystroke latency percentiles in the status line",
+    )
+    parser.add_argument(
+        "--latency-dump",
+        metavar="PATH",
+        help="write keystroke latency percentiles as JSON to PATH on exit",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="run the session under cProfile and write the stats to PATH",
+    )
+    parser.add_argument(
+        "--buffer-budget",
+        type=float,
+        default=DEFAULT_BUFFER_BUDGET / (1 << 20),
+        metavar="MB",
+        help="memory kept for inactive buffers before evicting them",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE,
+        default="rope",
+        help="how lines are kept in memory: compact stores untouched lines as "
+        "UTF-8 bytes, mapped reads them from the file on demand",
+    )
+    parser.add_argument(
+        "--no-highlight",
+        action="store_true",
+        help="turn off syntax highlighting of Python, JSON, YAML and log files",
+    )
+    parser.add_argument(
+        "--no-wrap",
+        action="store_true",
+        help="cut lines at the window edge instead of wrapping them over rows",
+    )
+    parser.add_argument(
+        "--no-watch",
+        action="store_true",
+        help="do not merge in changes other programs make to the open file",
+    )
+    parser.add_argument(
+        "--max-fps",
+        type=float,
+        help="most screen refreshes per second: keys typed in between are "
+        "drawn together",
+    )
+    arguments = parser.parse_args()
+    if len(arguments.files) > 1 and arguments.autosave:
+        parser.error("--autosave works with a single file")
+    if arguments.script and arguments.replace:
+        parser.error("--script and --replace cannot be used together")
+    if arguments.pager and (len(arguments.files) > 1 or arguments.autosave):
+        parser.error("--pager works with a single file and does not save")
+    if arguments.follow and not arguments.pager:
+        parser.error("--follow works with --pager")
+    return arguments
+
+
+def run_script(arguments) -> int:
+    # Not imported at the top: the editor itself never needs it
+    from src.batch import parse_script, run_batch
+
+    with open(arguments.script, "r") as file:
+        keys = parse_script(file.read())
+    keymap = Keymap.from_file(arguments.keymap) if arguments.keymap else None
+    report = run_batch(arguments.files, keys, keymap, arguments.jobs)
+    for path, error in report.failures:
+        print(f"{path}: {error}")
+    print(report.summary())
+    return 1 if report.failures else 0
+
+
+def run_replace(arguments) -> int:
+    old, new = arguments.replace
+    start = time.perf_counter()
+    files, replaced, failures = 0, 0, 0
+    try:
+        results = replace_in_files(
+            arguments.files, old, new, arguments.regex, arguments.jobs
+        )
+        for path, result in results:
+            if isinstance(result, str):
+                failures += 1
+                print(f"{path}: {result}")
+                continue
+            files += 1
+            replaced += result
+            if result:
+                print(f"{path}: {result} replaced")
+    except re.error as e:
+        print(f"Invalid pattern: {e}")
+        return 2
+    print(
+        f"Replaced {replaced} matches in {files} files ({failures} failed) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return 1 if failures else 0
+
+
+def run_pager(arguments) -> int:
+    # No editor, journal or log: the pager never writes to disk
+    from src.pager import FileStream
+    from src.tui.pager import Pager
+
+    keymap = Keymap.from_file(arguments.keymap) if arguments.keymap else None
+    try:
+        stream = FileStream(arguments.files[0])
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    pager = Pager(stream, keymap=keymap, follow=arguments.follow)
     while True:
         try:
-            interface.handle_input()
+            pager.handle_input()
         except StopIteration:
-            editor.save()
-            break
-        except Exception as e:
-            editor.save()
-            raise e
+            return 0
+
+
+def run_editor(arguments):
+    # Batch runs never import the interface, nor curses with it
+    from src.tui.tui import (
+        DEFAULT_MAX_FPS,
+        TextUserInterface,
+        close_screen,
+        show_preview,
+    )
+
+    logger = FileLogger()
+    buffers = BufferManager(
+        memory_budget=int(arguments.buffer_budget * (1 << 20)),
+        buffer_type=STORAGE[arguments.storage],
+    )
+    if sys.stdout.isatty():
+        # Something to read while a large file loads
+        show_preview(arguments.files[0])
+    try:
+        for path in arguments.files:
+            buffers.open(path)
+    except BaseException:
+        close_screen()
+        raise
+    if arguments.autosave:
+        AutoSaver(buffers.active, arguments.autosave).start()
+    keymap = Keymap.from_file(arguments.keymap) if arguments.keymap else None
+    latency = None
+    if arguments.latency_hud or arguments.latency_dump:
+        latency = LatencyMonitor(hud=arguments.latency_hud)
+    interface = TextUserInterface(
+        editor=buffers.active,
+        logger=logger,
+        max_fps=arguments.max_fps or DEFAULT_MAX_FPS,
+        keymap=keymap,
+        latency=latency,
+        buffers=buffers,
+        highlight=not arguments.no_highlight,
+        wrap=not arguments.no_wrap,
+        watch=not arguments.no_watch,
+    )
+    try:
+        with profiled(arguments.profile):
+            while True:
+                try:
+                    interface.handle_input()
+                except StopIteration:
+                    buffers.close_all()
+                    break
+                except Exception as e:
+                    buffers.close_all()
+                    raise e
+    finally:
+        logger.close()
+        if arguments.latency_dump:
+            latency.dump(arguments.latency_dump)
+
+
+def main():
+    arguments = parse_arguments()
+    if arguments.script:
+        sys.exit(run_script(arguments))
+    if arguments.replace:
+        sys.exit(run_replace(arguments))
+    if arguments.pager:
+        sys.exit(run_pager(arguments))
+    run_editor(arguments)
 
 
 if __name__ == "__main__":
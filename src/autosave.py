@@ -0,0 +1,54 @@
+import threading
+from src.editor import Editor
+
+DEFAULT_AUTOSAVE_INTERVAL = 30.0
+# Saves in a row that may be abandoned to edits before one blocks them
+MAX_ABANDONED_SAVES = 3
+
+
+class AutoSaver:
+    """Background worker that saves the editor whenever it has unsaved changes.
+
+    Saves stream through Editor.save, which only holds the editor lock while
+    copying each chunk, so the input loop keeps running during large saves. A
+    save that races with an edit is abandoned and retried on the next tick;
+    after MAX_ABANDONED_SAVES in a row, so that steady typing cannot put it off
+    forever, the next one holds the lock and edits wait for it to finish."""
+
+    def __init__(self, editor: Editor, interval: float = DEFAULT_AUTOSAVE_INTERVAL):
+        self.__editor = editor
+        self.__interval = interval
+        self.__stopped = threading.Event()
+        self.__abandoned = 0
+        self.__thread = threading.Thread(
+            target=self.__run, name="autosave", daemon=True
+        )
+
+    @property
+    def abandoned_saves(self) -> int:
+        """Saves abandoned in a row since the last one that went through"""
+        return self.__abandoned
+
+    def start(self) -> "AutoSaver":
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __run(self):
+        while not self.__stopped.wait(self.__interval):
+            if self.__editor.is_dirty:
+                self.save()
+
+    def save(self) -> bool:
+        """Save the editor as a tick does, returning whether the save went
+        through"""
+        exclusive = self.__abandoned >= MAX_ABANDONED_SAVES
+        if self.__editor.save(exclusive=exclusive):
+            self.__abandoned = 0
+            return True
+        self.__abandoned += 1
+        return False
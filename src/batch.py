@@ -0,0 +1,164 @@
+from __future__ import annotations
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Tuple
+from src.editor import Editor
+from src.interfaces.mode import Mode
+from src.replace import Replacer
+from src.search import Finder, SearchIndex
+from src.tui.keymap import Keymap, parse_key
+from src.tui.modes.command_mode import TextUserInterfaceCommandMode
+from src.tui.modes.typing_mode import TextUserInterfaceTypingMode
+
+# Files handed to a worker process at a time
+CHUNK_FILES = 8
+
+
+def parse_script(script: str) -> List[int]:
+    """Key codes of an edit script. Every line is a directive:
+
+    type <text>         types the rest of the line verbatim
+    key <name> [...]    presses keys by binding name (esc, enter, ctrl-z, x...)
+    # <comment>
+
+    Replay starts in typing mode, exactly like the interactive editor."""
+    keys = []
+    for number, line in enumerate(script.splitlines(), 1):
+        directive, _, argument = line.partition(" ")
+        if not directive or directive.startswith("#"):
+            continue
+        if directive == "type":
+            keys.extend(ord(character) for character in argument)
+        elif directive == "key":
+            try:
+                keys.extend(parse_key(name) for name in argument.split())
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}") from None
+        else:
+            raise ValueError(f"Line {number}: unknown directive '{directive}'")
+    return keys
+
+
+def replay(editor: Editor, keys: List[int], keymap: Keymap | None = None) -> int:
+    """Apply keys through the same modes the interactive editor uses. Stops at
+    the quit binding. Returns how many keys were applied."""
+    keymap = Keymap() if keymap is None else keymap
+    index = SearchIndex(editor)
+    finder = Finder(editor, index)
+    replacer = Replacer(editor, index)
+    typing_mode = TextUserInterfaceTypingMode(editor=editor, keymap=keymap)
+    command_mode = TextUserInterfaceCommandMode(
+        editor=editor, finder=finder, keymap=keymap, replacer=replacer
+    )
+    mode: Mode = typing_mode
+    applied = 0
+    try:
+        while applied < len(keys):
+            applied += mode.key_actions(keys[applied:])
+            if not mode.is_active:
+                editor.history.seal()
+                mode = typing_mode if mode is command_mode else command_mode
+                mode.activate()
+    except StopIteration:
+        # The quit key itself was applied
+        applied += 1
+    finally:
+        index.close()
+    return applied
+
+
+@dataclass
+class BatchReport:
+    files: int = 0
+    edits: int = 0
+    seconds: float = 0.0
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def edits_per_second(self) -> float:
+        return self.edits / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Edited {self.files} files ({len(self.failures)} failed) in "
+            f"{self.seconds:.2f}s: {self.files_per_second:.1f} files/s, "
+            f"{self.edits_per_second:.0f} edits/s"
+        )
+
+
+def edit_file(path: str, keys: List[int], keymap: Keymap | None = None) -> int:
+    """Replay keys against one file and save it through Editor.save. Returns
+    how many keys were applied."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File '{path}' not found")
+    # Saved as soon as it is edited, so a crash leaves the file untouched and
+    # there is nothing to journal
+    editor = Editor(journaled=False).from_file(path)
+    if editor is None:
+        raise PermissionError(f"Permission denied to access file '{path}'")
+    try:
+        applied = replay(editor, keys, keymap)
+        if editor.is_dirty and not editor.save():
+            raise OSError(f"Could not save '{path}'")
+        return applied
+    finally:
+        editor.exit()
+
+
+def run_batch(
+    paths: Iterable[str],
+    keys: List[int],
+    keymap: Keymap | None = None,
+    workers: int | None = None,
+) -> BatchReport:
+    """Edit every file with the same keys, in parallel worker processes unless
+    workers is 1"""
+    paths = list(paths)
+    report = BatchReport()
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(keys, keymap)
+        for path in paths:
+            _collect(report, path, _edit_file_safely(path))
+    else:
+        # Only batch runs start processes: not imported with the module
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(keys, keymap)
+        ) as executor:
+            results = executor.map(_edit_file_safely, paths, chunksize=CHUNK_FILES)
+            for path, result in zip(paths, results):
+                _collect(report, path, result)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# The script is sent to each worker once instead of with every file
+_worker_keys: List[int] = []
+_worker_keymap: Keymap | None = None
+
+
+def _init_worker(keys: List[int], keymap: Keymap | None):
+    global _worker_keys, _worker_keymap
+    _worker_keys, _worker_keymap = keys, keymap
+
+
+def _edit_file_safely(path: str) -> int | str:
+    try:
+        return edit_file(path, _worker_keys, _worker_keymap)
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+
+def _collect(report: BatchReport, path: str, result: int | str):
+    if isinstance(result, str):
+        report.failures.append((path, result))
+    else:
+        report.files += 1
+        report.edits += result
@@ -0,0 +1,242 @@
+from __future__ import annotations
+import os
+import tempfile
+from typing import List, NamedTuple, Type
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import SAVE_CHUNK_LINES, Cursor, Editor
+from src.file_format import FileFormat
+from src.interfaces.text_buffer import TextBuffer
+
+DEFAULT_BUFFER_BUDGET = 256 << 20
+
+
+class BufferInfo(NamedTuple):
+    path: str
+    is_active: bool
+    is_loaded: bool
+    is_dirty: bool
+
+
+class _Entry:
+    __slots__ = (
+        "path",
+        "editor",
+        "cursor",
+        "spill_path",
+        "file_format",
+        "size",
+        "last_used",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self.editor: Editor | None = None
+        self.cursor = Cursor(line=0, char=0, last_horizontal_ref=0)
+        # Unsaved text of an evicted buffer
+        self.spill_path: str | None = None
+        # Format to save the spilled text in, which is kept as UTF-8
+        self.file_format = FileFormat()
+        self.size = 0
+        self.last_used = 0
+
+
+class BufferManager:
+    """Open files, one Editor each, with only the active one guaranteed to be
+    in memory.
+
+    Inactive buffers are kept loaded while their estimated size fits in the
+    memory budget. Past it, the least recently used ones are evicted: clean
+    ones are simply dropped and read again from disk when switched back to,
+    dirty ones have their text spilled to a temporary file first. Evicting a
+    buffer drops its undo history."""
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_BUFFER_BUDGET,
+        buffer_type: Type[TextBuffer] = RopeBuffer,
+    ):
+        self.__memory_budget = memory_budget
+        self.__buffer_type = buffer_type
+        self.__entries: List[_Entry] = []
+        self.__active = -1
+        self.__clock = 0
+        self.__spill_directory: tempfile.TemporaryDirectory | None = None
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def memory_budget(self) -> int:
+        return self.__memory_budget
+
+    @property
+    def active_index(self) -> int:
+        return self.__active
+
+    @property
+    def active(self) -> Editor:
+        if self.__active < 0:
+            raise LookupError("No open buffers")
+        return self.__entries[self.__active].editor
+
+    def open(self, path: str) -> int:
+        """Add a file without loading it, or find it if it is already open.
+        Returns its index."""
+        path = os.path.abspath(path)
+        for index, entry in enumerate(self.__entries):
+            if entry.path == path:
+                return index
+        self.__entries.append(_Entry(path))
+        if self.__active < 0:
+            self.switch(0)
+        return len(self.__entries) - 1
+
+    def switch(self, index: int) -> Editor:
+        entry = self.__entries[index]
+        if self.__active >= 0 and self.__active != index:
+            self.__deactivate(self.__entries[self.__active])
+        self.__active = index
+        if entry.editor is None:
+            self.__load(entry)
+        self.__clock += 1
+        entry.last_used = self.__clock
+        self.__enforce_budget()
+        return entry.editor
+
+    def next(self) -> Editor:
+        return self.switch((self.__active + 1) % len(self.__entries))
+
+    def previous(self) -> Editor:
+        return self.switch((self.__active - 1) % len(self.__entries))
+
+    def close(self, index: int | None = None) -> bool:
+        """Save and close a buffer, the active one by default. Returns whether
+        any buffers are left open."""
+        index = self.__active if index is None else index
+        was_active = index == self.__active
+        entry = self.__entries.pop(index)
+        self.__save(entry)
+        self.__drop(entry)
+        if not self.__entries:
+            self.__active = -1
+            return False
+        if was_active:
+            self.__active = -1
+            self.switch(min(index, len(self.__entries) - 1))
+        elif index < self.__active:
+            self.__active -= 1
+        return True
+
+    def buffers(self) -> List[BufferInfo]:
+        return [
+            BufferInfo(
+                path=entry.path,
+                is_active=index == self.__active,
+                is_loaded=entry.editor is not None,
+                is_dirty=self.__is_dirty(entry),
+            )
+            for index, entry in enumerate(self.__entries)
+        ]
+
+    def describe(self) -> str:
+        """One line listing, as in '1:a.txt [2:b.txt*] 3:c.txt'"""
+        parts = []
+        for number, info in enumerate(self.buffers(), 1):
+            name = os.path.basename(info.path) + ("*" if info.is_dirty else "")
+            part = f"{number}:{name}"
+            parts.append(f"[{part}]" if info.is_active else part)
+        return " ".join(parts)
+
+    def memory(self) -> int:
+        """Estimated bytes held by the inactive loaded buffers"""
+        return sum(
+            entry.size
+            for index, entry in enumerate(self.__entries)
+            if entry.editor is not None and index != self.__active
+        )
+
+    def save_all(self):
+        for entry in self.__entries:
+            self.__save(entry)
+
+    def close_all(self):
+        self.save_all()
+        for entry in self.__entries:
+            self.__drop(entry)
+        self.__entries.clear()
+        self.__active = -1
+        if self.__spill_directory is not None:
+            self.__spill_directory.cleanup()
+            self.__spill_directory = None
+
+    def __load(self, entry: _Entry):
+        editor = Editor(buffer_type=self.__buffer_type)
+        if entry.spill_path is not None:
+            editor.from_unsaved(entry.path, entry.spill_path, entry.file_format)
+            os.remove(entry.spill_path)
+            entry.spill_path = None
+        else:
+            editor.from_file(entry.path)
+        editor.move_to(entry.cursor["line"], entry.cursor["char"])
+        entry.editor = editor
+
+    def __deactivate(self, entry: _Entry):
+        # Inactive buffers do not change, so their size is measured once here
+        entry.size = entry.editor.buffer.memory_size()
+
+    def __enforce_budget(self):
+        loaded = sorted(
+            (
+                entry
+                for index, entry in enumerate(self.__entries)
+                if entry.editor is not None and index != self.__active
+            ),
+            key=lambda entry: entry.last_used,
+        )
+        used = sum(entry.size for entry in loaded)
+        for entry in loaded:
+            if used <= self.__memory_budget:
+                break
+            used -= entry.size
+            self.__evict(entry)
+
+    def __evict(self, entry: _Entry):
+        editor = entry.editor
+        entry.cursor = Cursor(**editor.cursor)
+        if editor.is_dirty:
+            entry.spill_path = self.__spill(editor)
+            entry.file_format = editor.file_format
+        self.__drop(entry)
+
+    def __spill(self, editor: Editor) -> str:
+        if self.__spill_directory is None:
+            self.__spill_directory = tempfile.TemporaryDirectory(prefix="editor-")
+        descriptor, path = tempfile.mkstemp(
+            suffix=".spill", dir=self.__spill_directory.name
+        )
+        text, spilled = editor.text, FileFormat()
+        with os.fdopen(descriptor, "wb") as file:
+            for start in range(0, len(text), SAVE_CHUNK_LINES):
+                lines = text[start : start + SAVE_CHUNK_LINES]
+                file.write(spilled.encode(("\n" if start else "") + "\n".join(lines)))
+        return path
+
+    def __save(self, entry: _Entry):
+        if entry.editor is None and entry.spill_path is not None:
+            # Spilled text goes back through the editor to get a normal save
+            self.__load(entry)
+            entry.editor.save()
+            self.__drop(entry)
+        elif entry.editor is not None and entry.editor.is_dirty:
+            entry.editor.save()
+
+    def __drop(self, entry: _Entry):
+        if entry.editor is not None:
+            entry.editor.exit()
+            entry.editor = None
+        entry.size = 0
+
+    def __is_dirty(self, entry: _Entry) -> bool:
+        if entry.editor is None:
+            return entry.spill_path is not None
+        return entry.editor.is_dirty
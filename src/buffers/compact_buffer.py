@@ -0,0 +1,277 @@
+from __future__ import annotations
+import sys
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List
+from src.buffers.line_index import LineIndex
+from src.file_format import FileFormat, detect
+from src.interfaces.text_buffer import TextBuffer
+
+READ_CHUNK_LINES = 4096
+# Lines per slice when the text is first loaded
+SLICE_LINES = 4096
+# Runs of inserted lines are merged into lists of at most this many lines
+STRINGS_LINES = 1024
+
+
+class _Slice:
+    """Lines first to first + count of the index, with the ones that were
+    edited since kept as str by their offset in the slice"""
+
+    __slots__ = ("first", "count", "edited")
+
+    def __init__(self, first: int, count: int, edited: Dict[int, str] | None = None):
+        self.first = first
+        self.count = count
+        self.edited = edited or None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def cut(self, start: int, stop: int) -> _Slice:
+        """Lines start to stop of this slice"""
+        edited = None
+        if self.edited:
+            edited = {
+                offset - start: text
+                for offset, text in self.edited.items()
+                if start <= offset < stop
+            }
+        return _Slice(self.first + start, stop - start, edited)
+
+
+class CompactBuffer(TextBuffer):
+    """Lines stored as UTF-8 in one contiguous buffer, or a file mapping, with
+    an array('Q') of line offsets: about 8 bytes per line on top of the text,
+    where a str costs some 50.
+
+    The document is a sequence of segments that are either slices of the
+    original lines, decoded only when read, or lists of str holding inserted
+    lines. Edited lines are kept as str next to the slice they belong to, so
+    only the lines that were changed ever stay in memory as str."""
+
+    def __init__(self, lines: Iterable[str] = ("",), index: LineIndex | None = None):
+        # Text given as str is packed into a buffer owned by this object
+        self.__owns_data = index is None
+        if index is None:
+            index = LineIndex(FileFormat().encode("\n".join(lines)))
+        self.__index = index
+        count = index.line_count()
+        self.__segments: List[_Slice | List[str]] = [
+            _Slice(first, min(SLICE_LINES, count - first))
+            for first in range(0, count, SLICE_LINES)
+        ]
+        self.__counts: List[int] = [len(segment) for segment in self.__segments]
+        self.__ends: List[int] | None = None
+
+    @classmethod
+    def from_file(
+        cls, path: str, file_format: FileFormat | None = None
+    ) -> CompactBuffer:
+        file_format = detect(path) if file_format is None else file_format
+        return cls(index=LineIndex.open(path, file_format))
+
+    def __len__(self) -> int:
+        return self.__line_ends()[-1]
+
+    def line(self, index: int) -> str:
+        if index < 0:
+            raise IndexError(f"Line {index} out of range")
+        position, offset = self.__locate(index)
+        if position >= len(self.__segments):
+            raise IndexError(f"Line {index} out of range")
+        segment = self.__segments[position]
+        if isinstance(segment, list):
+            return segment[offset]
+        if segment.edited and offset in segment.edited:
+            return segment.edited[offset]
+        return self.__index.line(segment.first + offset)
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        position, offset = self.__locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            segment = self.__segments[position]
+            taken = min(remaining, len(segment) - offset)
+            if isinstance(segment, list):
+                yield from islice(segment, offset, offset + taken)
+            else:
+                for chunk in range(offset, offset + taken, READ_CHUNK_LINES):
+                    end = min(chunk + READ_CHUNK_LINES, offset + taken)
+                    yield from self.__slice_lines(segment, chunk, end)
+            remaining -= taken
+            position += 1
+            offset = 0
+
+    def encoded_lines(self, start: int, stop: int, file_format: FileFormat) -> bytes:
+        stop = min(stop, len(self))
+        if start >= stop or self.__index.file_format != file_format:
+            return super().encoded_lines(start, stop, file_format)
+        pieces = []
+        position, offset = self.__locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            segment = self.__segments[position]
+            taken = min(remaining, len(segment) - offset)
+            if isinstance(segment, list):
+                text = "\n".join(islice(segment, offset, offset + taken))
+                pieces.append(file_format.encode(text))
+            else:
+                pieces.extend(
+                    self.__slice_bytes(segment, offset, offset + taken, file_format)
+                )
+            remaining -= taken
+            position += 1
+            offset = 0
+        return file_format.encode("\n").join(pieces)
+
+    def set_line(self, index: int, text: str):
+        position, offset = self.__checked(index)
+        segment = self.__segments[position]
+        if isinstance(segment, list):
+            segment[offset] = text
+        elif segment.edited is None:
+            segment.edited = {offset: text}
+        else:
+            segment.edited[offset] = text
+
+    def insert_lines(self, index: int, lines: List[str]):
+        if not 0 <= index <= len(self):
+            raise IndexError(f"Line {index} out of range")
+        if not lines:
+            return
+        position, offset = self.__locate(index)
+        if position >= len(self.__segments):
+            self.__segments.append(list(lines))
+            self.__counts.append(len(lines))
+            self.__ends = None
+            self.__merge(len(self.__segments) - 2, len(self.__segments))
+            return
+        segment = self.__segments[position]
+        if isinstance(segment, list):
+            segment[offset:offset] = lines
+            self.__counts[position] = len(segment)
+            self.__ends = None
+            return
+        self.__replace(
+            position,
+            [
+                segment.cut(0, offset),
+                list(lines),
+                segment.cut(offset, segment.count),
+            ],
+        )
+
+    def delete_lines(self, start: int, stop: int):
+        if not 0 <= start <= stop <= len(self):
+            raise IndexError(f"Lines {start}:{stop} out of range")
+        remaining = stop - start
+        while remaining:
+            position, offset = self.__locate(start)
+            segment = self.__segments[position]
+            taken = min(remaining, len(segment) - offset)
+            if isinstance(segment, list):
+                del segment[offset : offset + taken]
+                self.__counts[position] = len(segment)
+                self.__ends = None
+                self.__replace(position, [segment])
+            else:
+                self.__replace(
+                    position,
+                    [
+                        segment.cut(0, offset),
+                        segment.cut(offset + taken, segment.count),
+                    ],
+                )
+            remaining -= taken
+
+    def memory_size(self) -> int:
+        size = self.__index.memory_size() + 8 * len(self.__segments)
+        if self.__owns_data:
+            size += self.__index.size
+        for segment in self.__segments:
+            if isinstance(segment, list):
+                size += sum(sys.getsizeof(line) + 8 for line in segment)
+            elif segment.edited:
+                size += sys.getsizeof(segment.edited)
+                size += sum(sys.getsizeof(line) for line in segment.edited.values())
+        return size
+
+    def close(self):
+        self.__index.close()
+
+    def __slice_lines(self, segment: _Slice, start: int, stop: int) -> List[str]:
+        lines = self.__index.lines(segment.first + start, segment.first + stop)
+        if segment.edited:
+            for offset, text in segment.edited.items():
+                if start <= offset < stop:
+                    lines[offset - start] = text
+        return lines
+
+    def __slice_bytes(
+        self, segment: _Slice, start: int, stop: int, file_format: FileFormat
+    ) -> List[bytes]:
+        """Lines start to stop of a slice: the bytes of the index between the
+        edited lines, which alone are encoded"""
+        pieces = []
+        edited = sorted(o for o in segment.edited or () if start <= o < stop)
+        for offset in [*edited, stop]:
+            if offset > start:
+                first = segment.first
+                pieces.append(self.__index.raw(first + start, first + offset))
+            if offset < stop:
+                pieces.append(file_format.encode(segment.edited[offset]))
+            start = offset + 1
+        return pieces
+
+    def __checked(self, index: int):
+        position, offset = self.__locate(index)
+        if index < 0 or position >= len(self.__segments):
+            raise IndexError(f"Line {index} out of range")
+        return position, offset
+
+    def __locate(self, index: int):
+        """Segment holding line index and the line's offset in it. Lines past
+        the end land one past the last segment."""
+        ends = self.__line_ends()
+        position = bisect_right(ends, index)
+        return position, index - (ends[position - 1] if position else 0)
+
+    def __line_ends(self) -> List[int]:
+        if self.__ends is None:
+            self.__ends = list(accumulate(self.__counts))
+        return self.__ends
+
+    def __replace(self, position: int, pieces: List[_Slice | List[str]]):
+        pieces = [piece for piece in pieces if len(piece)]
+        self.__segments[position : position + 1] = pieces
+        self.__counts[position : position + 1] = [len(piece) for piece in pieces]
+        self.__ends = None
+        if not self.__segments:
+            self.__segments.append([])
+            self.__counts.append(0)
+        self.__merge(position - 1, position + len(pieces) + 1)
+
+    def __merge(self, low: int, high: int):
+        """Join neighbouring lists of edited lines between positions low and high"""
+        segments = self.__segments
+        position = max(low, 0)
+        high = min(high, len(segments))
+        while position + 1 < high:
+            current, following = segments[position], segments[position + 1]
+            if (
+                isinstance(current, list)
+                and isinstance(following, list)
+                and len(current) + len(following) <= STRINGS_LINES
+            ):
+                current.extend(following)
+                del segments[position + 1]
+                del self.__counts[position + 1]
+                self.__counts[position] = len(current)
+                self.__ends = None
+                high -= 1
+            else:
+                position += 1
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import mmap
+import os
+import threading
+from array import array
+from itertools import accumulate, islice
+from typing import List
+from src.file_format import FileFormat
+
+SCAN_CHUNK_SIZE = 1 << 20
+
+
+class LineIndex:
+    """Line start offsets over a bytes-like source, built on demand.
+
+    Offsets are discovered chunk by chunk, either when a line past the scanned
+    region is requested or by a background thread, so opening a file costs the
+    same no matter its size. Lines are decoded in the file's format when read,
+    and the bytes of lines can be had as they are, to write them back."""
+
+    def __init__(self, data, file_format: FileFormat = FileFormat()):
+        self.__data = data
+        self.__format = file_format
+        # The byte order mark is not part of the first line
+        self.__starts = array("Q", [len(file_format.bom)])
+        self.__scanned = len(file_format.bom)
+        self.__lock = threading.Lock()
+        self.__file = None
+        self.__indexer: threading.Thread | None = None
+
+    @classmethod
+    def open(cls, path: str, file_format: FileFormat = FileFormat()) -> LineIndex:
+        if not file_format.is_ascii_compatible:
+            # Line breaks cannot be found in the bytes: the text is decoded
+            # once and kept as UTF-8
+            with open(path, "rb") as file:
+                data = file.read()[len(file_format.bom) :]
+            return cls(FileFormat().encode(file_format.decode(data)))
+        file = open(path, "rb")
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            data = b""
+        index = cls(data, file_format)
+        index.__file = file
+        return index
+
+    @property
+    def file_format(self) -> FileFormat:
+        """Format of the indexed bytes"""
+        return self.__format
+
+    @property
+    def is_complete(self) -> bool:
+        return self.__scanned >= len(self.__data)
+
+    @property
+    def size(self) -> int:
+        return len(self.__data)
+
+    def memory_size(self) -> int:
+        """Bytes held by the offsets; the data itself is mapped, not loaded"""
+        return self.__starts.itemsize * len(self.__starts)
+
+    def line_count(self) -> int:
+        while self.__scan_chunk():
+            pass
+        return len(self.__starts)
+
+    def whole_lines(self) -> int:
+        """Count of the lines known to be whole so far, without scanning: a
+        line is only known to be once the next one has started"""
+        if self.is_complete:
+            return len(self.__starts)
+        return len(self.__starts) - 1
+
+    def has_line(self, index: int) -> bool:
+        while index >= len(self.__starts) and self.__scan_chunk():
+            pass
+        return 0 <= index < len(self.__starts)
+
+    def line_span(self, index: int) -> tuple[int, int]:
+        # A line is only known to be whole once the next one has started
+        while index + 1 >= len(self.__starts) and self.__scan_chunk():
+            pass
+        if not 0 <= index < len(self.__starts):
+            raise IndexError(f"Line {index} out of range")
+        if index + 1 < len(self.__starts):
+            start, end = self.__starts[index], self.__starts[index + 1] - 1
+            if self.__format.newline == "\r\n" and self.__data[end - 1 : end] == b"\r":
+                end = max(end - 1, start)
+            return start, end
+        return self.__starts[index], len(self.__data)
+
+    def line_bytes(self, index: int) -> bytes:
+        start, end = self.line_span(index)
+        return self.__data[start:end]
+
+    def line(self, index: int) -> str:
+        return self.__format.decode(self.line_bytes(index))
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        """Decode a whole range of lines at once, clamped to the end of the data"""
+        while stop > len(self.__starts) and self.__scan_chunk():
+            pass
+        stop = min(stop, len(self.__starts))
+        if start >= stop:
+            return []
+        return self.__format.decode_lines(self.raw(start, stop))
+
+    def raw(self, start: int, stop: int) -> bytes:
+        """Bytes of lines start to stop - 1 as they are in the data, with the
+        line breaks between them but not the one after the last"""
+        first, _ = self.line_span(start)
+        _, last = self.line_span(stop - 1)
+        return self.__read(first, last)
+
+    def index_in_background(self):
+        if self.__indexer is None and not self.is_complete:
+            self.__indexer = threading.Thread(
+                target=self.line_count, name="line-indexer", daemon=True
+            )
+            self.__indexer.start()
+
+    def close(self):
+        with self.__lock:
+            if isinstance(self.__data, mmap.mmap):
+                self.__data.close()
+            if self.__file is not None:
+                self.__file.close()
+            self.__data = b""
+            self.__scanned = 0
+
+    def __read(self, start: int, end: int) -> bytes:
+        # Scanning through the descriptor keeps the mapping's pages out of RSS
+        if self.__file is not None:
+            return os.pread(self.__file.fileno(), end - start, start)
+        return self.__data[start:end]
+
+    def __scan_chunk(self) -> bool:
+        with self.__lock:
+            start = self.__scanned
+            if start >= len(self.__data):
+                return False
+            end = min(start + SCAN_CHUNK_SIZE, len(self.__data))
+            lines = self.__read(start, end).split(b"\n")
+            lines.pop()
+            if lines:
+                lengths = [len(line) + 1 for line in lines]
+                offsets = accumulate(lengths, initial=start)
+                self.__starts.extend(islice(offsets, 1, None))
+            self.__scanned = end
+            return True
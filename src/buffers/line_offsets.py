@@ -0,0 +1,175 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Tuple
+from src.interfaces.text_buffer import TextBuffer
+
+BLOCK_LINES = 1024
+
+
+class _Fenwick:
+    """Prefix sums over a list of integers with O(log n) updates and lookups"""
+
+    def __init__(self, values: List[int]):
+        self.__size = len(values)
+        tree = [0] + values
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self.__tree = tree
+
+    def add(self, index: int, delta: int):
+        index += 1
+        while index <= self.__size:
+            self.__tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Sum of the first index values"""
+        total = 0
+        while index > 0:
+            total += self.__tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, value: int) -> Tuple[int, int]:
+        """First index where the running sum goes past value, with the sum of the
+        values before it. Returns the size when value is past the total."""
+        index = 0
+        total = 0
+        step = 1 << self.__size.bit_length()
+        while step:
+            following = index + step
+            if following <= self.__size and total + self.__tree[following] <= value:
+                index = following
+                total += self.__tree[following]
+            step >>= 1
+        return index, total
+
+
+class _Block:
+    __slots__ = ("lengths", "total")
+
+    def __init__(self, lengths: array):
+        # Length of every line plus its line break
+        self.lengths = lengths
+        self.total = sum(lengths)
+
+
+def _lengths(lines) -> array:
+    return array("I", [len(line) + 1 for line in lines])
+
+
+class LineOffsets:
+    """Character offset of every line start, counting line breaks as one.
+
+    Line lengths are cached in blocks of lines, with the line and character
+    counts of the blocks kept in Fenwick trees, so converting between lines and
+    offsets is O(log n) plus a C-speed scan of one block. Edits reported
+    through invalidate() only re-read the lines they inserted; the table is
+    built on first use, which reads the whole document once."""
+
+    def __init__(self, buffer: TextBuffer):
+        self.__buffer = buffer
+        self.__blocks: List[_Block] | None = None
+        self.__lines: _Fenwick | None = None
+        self.__chars: _Fenwick | None = None
+
+    def invalidate(self, start: int, removed: int, inserted: int):
+        blocks = self.__blocks
+        if blocks is None:
+            return
+        position, block_start = self.__locate(start)
+        first = position
+        remaining = removed
+        offset = start - block_start
+        while remaining and position < len(blocks):
+            lengths = blocks[position].lengths
+            taken = min(remaining, len(lengths) - offset)
+            self.__update(position, lengths[:offset] + lengths[offset + taken :])
+            remaining -= taken
+            position += 1
+            offset = 0
+        if inserted:
+            lengths = blocks[first].lengths
+            offset = start - block_start
+            added = _lengths(self.__buffer.lines(start, start + inserted))
+            self.__update(first, lengths[:offset] + added + lengths[offset:])
+        stop = max(position, first + 1)
+        if any(
+            not blocks[index].lengths or len(blocks[index].lengths) > 2 * BLOCK_LINES
+            for index in range(first, stop)
+        ):
+            self.__rebalance(first, stop)
+
+    def offset_of(self, line: int) -> int:
+        """Offset of the first character of line"""
+        self.__ensure_blocks()
+        position, block_start = self.__locate(line)
+        lengths = self.__blocks[position].lengths
+        return self.__chars.prefix(position) + sum(lengths[: line - block_start])
+
+    def line_at(self, offset: int) -> int:
+        """Line holding the character at offset, clamped to the document"""
+        blocks = self.__ensure_blocks()
+        position, chars_before = self.__chars.search(max(offset, 0))
+        if position >= len(blocks):
+            return len(self.__buffer) - 1
+        ends = accumulate(blocks[position].lengths)
+        return self.__lines.prefix(position) + bisect_right(
+            list(ends), offset - chars_before
+        )
+
+    def line_length(self, line: int) -> int:
+        self.__ensure_blocks()
+        position, block_start = self.__locate(line)
+        return self.__blocks[position].lengths[line - block_start] - 1
+
+    def total(self) -> int:
+        """Characters in the document, line breaks included"""
+        blocks = self.__ensure_blocks()
+        return self.__chars.prefix(len(blocks)) - 1
+
+    def __ensure_blocks(self) -> List[_Block]:
+        if self.__blocks is None:
+            line_count = len(self.__buffer)
+            self.__blocks = [
+                _Block(_lengths(self.__buffer.lines(start, start + BLOCK_LINES)))
+                for start in range(0, line_count, BLOCK_LINES)
+            ] or [_Block(array("I"))]
+            self.__rebuild_trees()
+        return self.__blocks
+
+    def __locate(self, line: int) -> Tuple[int, int]:
+        position, block_start = self.__lines.search(line)
+        if position >= len(self.__blocks):
+            # Past the last line: the end of the last block
+            position = len(self.__blocks) - 1
+            block_start -= len(self.__blocks[position].lengths)
+        return position, block_start
+
+    def __update(self, position: int, lengths: array):
+        block = self.__blocks[position]
+        total = sum(lengths)
+        self.__lines.add(position, len(lengths) - len(block.lengths))
+        self.__chars.add(position, total - block.total)
+        block.lengths = lengths
+        block.total = total
+
+    def __rebalance(self, start: int, stop: int):
+        lengths = array("I")
+        for block in self.__blocks[start:stop]:
+            lengths.extend(block.lengths)
+        self.__blocks[start:stop] = [
+            _Block(lengths[offset : offset + BLOCK_LINES])
+            for offset in range(0, len(lengths), BLOCK_LINES)
+        ]
+        if not self.__blocks:
+            self.__blocks.append(_Block(array("I")))
+        self.__rebuild_trees()
+
+    def __rebuild_trees(self):
+        self.__lines = _Fenwick([len(block.lengths) for block in self.__blocks])
+        self.__chars = _Fenwick([block.total for block in self.__blocks])
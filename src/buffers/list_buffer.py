@@ -0,0 +1,36 @@
+from itertools import islice
+from typing import Iterable, Iterator, List
+from src.interfaces.text_buffer import TextBuffer
+
+
+class ListBuffer(TextBuffer):
+    __lines: List[str]
+
+    def __init__(self, lines: Iterable[str] = ("",)):
+        self.__lines = list(lines)
+
+    def __len__(self) -> int:
+        return len(self.__lines)
+
+    def line(self, index: int) -> str:
+        if not 0 <= index < len(self.__lines):
+            raise IndexError(f"Line {index} out of range")
+        return self.__lines[index]
+
+    def set_line(self, index: int, text: str):
+        if not 0 <= index < len(self.__lines):
+            raise IndexError(f"Line {index} out of range")
+        self.__lines[index] = text
+
+    def insert_lines(self, index: int, lines: List[str]):
+        if not 0 <= index <= len(self.__lines):
+            raise IndexError(f"Line {index} out of range")
+        self.__lines[index:index] = lines
+
+    def delete_lines(self, start: int, stop: int):
+        if not 0 <= start <= stop <= len(self.__lines):
+            raise IndexError(f"Lines {start}:{stop} out of range")
+        del self.__lines[start:stop]
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        return islice(self.__lines, start, stop)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List
+from src.buffers.line_index import LineIndex
+from src.buffers.rope_buffer import RopeBuffer
+from src.file_format import FileFormat, detect
+from src.interfaces.text_buffer import TextBuffer
+
+READ_CHUNK_LINES = 4096
+
+
+class MappedBuffer(TextBuffer):
+    """Memory-mapped, read-only-until-touched buffer.
+
+    Lines are decoded from the mapping only when they are read. The first edit
+    swaps in a RopeBuffer over the same mapping, so only the chunks around
+    edited lines are ever turned into str. The rope starts with the lines
+    indexed so far and takes in more as lines past them are asked for, so the
+    first edit never waits for the whole file to be indexed."""
+
+    __index: LineIndex | None
+    __rope: RopeBuffer | None
+
+    def __init__(self, lines: Iterable[str] = ("",), index: LineIndex | None = None):
+        self.__index = index
+        self.__rope = RopeBuffer(lines) if index is None else None
+        # Lines of the index taken into the rope so far
+        self.__taken = 0
+
+    @classmethod
+    def from_file(
+        cls, path: str, file_format: FileFormat | None = None
+    ) -> MappedBuffer:
+        file_format = detect(path) if file_format is None else file_format
+        index = LineIndex.open(path, file_format)
+        index.index_in_background()
+        return cls(index=index)
+
+    @property
+    def is_touched(self) -> bool:
+        return self.__rope is not None
+
+    def __len__(self) -> int:
+        if self.__rope is not None:
+            return len(self.__reach(None))
+        return self.__index.line_count()
+
+    def line(self, index: int) -> str:
+        if self.__rope is not None:
+            return self.__reach(index).line(index)
+        if index < 0:
+            raise IndexError(f"Line {index} out of range")
+        return self.__index.line(index)
+
+    def has_line(self, index: int) -> bool:
+        if self.__rope is not None:
+            return self.__reach(index).has_line(index)
+        return self.__index.has_line(index)
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        if self.__rope is not None:
+            return self.__reach(None if stop is None else stop - 1).lines(start, stop)
+        return self.__untouched_lines(start, stop)
+
+    def set_line(self, index: int, text: str):
+        self.__touch(index).set_line(index, text)
+
+    def insert_lines(self, index: int, lines: List[str]):
+        self.__touch(index).insert_lines(index, lines)
+
+    def delete_lines(self, start: int, stop: int):
+        self.__touch(stop).delete_lines(start, stop)
+
+    def encoded_lines(self, start: int, stop: int, file_format: FileFormat) -> bytes:
+        if self.__rope is not None:
+            rope = self.__reach(stop - 1)
+            return rope.encoded_lines(start, stop, file_format)
+        stop = min(stop, len(self))
+        if start >= stop or self.__index.file_format != file_format:
+            return super().encoded_lines(start, stop, file_format)
+        return self.__index.raw(start, stop)
+
+    def memory_size(self) -> int:
+        if self.__rope is not None:
+            return self.__rope.memory_size()
+        return self.__index.memory_size()
+
+    def close(self):
+        if self.__index is not None:
+            self.__index.close()
+
+    def __untouched_lines(self, start: int, stop: int | None) -> Iterator[str]:
+        index = start
+        while stop is None or index < stop:
+            end = index + READ_CHUNK_LINES
+            lines = self.__index.lines(index, end if stop is None else min(stop, end))
+            if not lines:
+                return
+            yield from lines
+            index += len(lines)
+
+    def __touch(self, index: int) -> RopeBuffer:
+        if self.__rope is None:
+            self.__rope = RopeBuffer(())
+        return self.__reach(index)
+
+    def __reach(self, index: int | None) -> RopeBuffer:
+        """The rope, holding line index if there is one, or every line when
+        index is None"""
+        rope, source = self.__rope, self.__index
+        while index is None or len(rope) <= index:
+            if index is None:
+                total = source.line_count()
+            else:
+                # Index line the rope's line index is, once it is taken in
+                source.has_line(self.__taken + index - len(rope) + 1)
+                total = source.whole_lines()
+            if total <= self.__taken:
+                break
+            rope.extend_from_source(source, self.__taken, total - self.__taken)
+            self.__taken = total
+        return rope
@@ -0,0 +1,296 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List
+from src.file_format import FileFormat
+from src.interfaces.text_buffer import TextBuffer
+
+LEAF_CAPACITY = 512
+BRANCH_CAPACITY = 32
+
+
+class _Leaf:
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    @property
+    def size(self) -> int:
+        return len(self.lines)
+
+
+class _SourceLines:
+    """Leaf contents read straight from a line source until first modified"""
+
+    __slots__ = ("source", "start", "count", "materialized")
+
+    def __init__(self, source, start: int, count: int):
+        self.source = source
+        self.start = start
+        self.count = count
+        self.materialized: List[str] | None = None
+
+    def __len__(self) -> int:
+        if self.materialized is not None:
+            return len(self.materialized)
+        return self.count
+
+    def __getitem__(self, key):
+        if self.materialized is not None:
+            return self.materialized[key]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.count)
+            if step == 1:
+                return self.source.lines(self.start + start, self.start + stop)
+            return [self.source.line(self.start + i) for i in range(start, stop, step)]
+        if key < 0:
+            key += self.count
+        if not 0 <= key < self.count:
+            raise IndexError(f"Line {key} out of range")
+        return self.source.line(self.start + key)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __setitem__(self, key, value):
+        self.__materialize()[key] = value
+
+    def __delitem__(self, key):
+        del self.__materialize()[key]
+
+    def extend(self, lines: Iterable[str]):
+        self.__materialize().extend(lines)
+
+    def __materialize(self) -> List[str]:
+        if self.materialized is None:
+            self.materialized = self[:]
+            self.source = None
+        return self.materialized
+
+
+class _Branch:
+    __slots__ = ("children", "size")
+
+    def __init__(self, children: list):
+        self.children = children
+        self.size = sum(child.size for child in children)
+
+
+class RopeBuffer(TextBuffer):
+    """Balanced tree of line chunks: edits touch one leaf plus its ancestors
+    instead of copying the whole document"""
+
+    def __init__(self, lines: Iterable[str] = ("",)):
+        self.__root = _build(_split_leaf(list(lines)))
+        self.__last_leaf = None
+        self.__last_leaf_start = 0
+
+    @classmethod
+    def from_source(cls, source, line_count: int) -> RopeBuffer:
+        """Rope over a source exposing line(index) and lines(start, stop) that
+        only decodes the leaves that are read or touched. A source that also
+        has a file_format and raw(start, stop), as LineIndex does, has the
+        bytes of the leaves never touched copied when they are encoded."""
+        buffer = cls(())
+        buffer.extend_from_source(source, 0, line_count)
+        return buffer
+
+    def extend_from_source(self, source, start: int, count: int):
+        """Append count lines of source from line start, read as from_source
+        reads them. Costs a rebuild of the tree, so is meant for large runs."""
+        step = LEAF_CAPACITY // 2
+        leaves = [
+            _Leaf(_SourceLines(source, first, min(step, start + count - first)))
+            for first in range(start, start + count, step)
+        ]
+        if leaves:
+            self.__last_leaf = None
+            kept = [leaf for leaf in _leaves(self.__root) if leaf.size]
+            self.__root = _build(kept + leaves)
+
+    def __len__(self) -> int:
+        return self.__root.size
+
+    def line(self, index: int) -> str:
+        leaf, offset = self.__locate(index)
+        return leaf.lines[offset]
+
+    def set_line(self, index: int, text: str):
+        leaf, offset = self.__locate(index)
+        leaf.lines[offset] = text
+
+    def insert_lines(self, index: int, lines: List[str]):
+        if not 0 <= index <= self.__root.size:
+            raise IndexError(f"Line {index} out of range")
+        lines = list(lines)
+        if lines:
+            self.__last_leaf = None
+            self.__root = _build(_insert(self.__root, index, lines))
+
+    def delete_lines(self, start: int, stop: int):
+        if not 0 <= start <= stop <= self.__root.size:
+            raise IndexError(f"Lines {start}:{stop} out of range")
+        if start == stop:
+            return
+        self.__last_leaf = None
+        _delete(self.__root, start, stop)
+        root = self.__root
+        while isinstance(root, _Branch) and len(root.children) <= 1:
+            root = root.children[0] if root.children else _Leaf([])
+        self.__root = root
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        stop = self.__root.size if stop is None else min(stop, self.__root.size)
+        if start >= stop:
+            return iter(())
+        return _iterate(self.__root, start, stop)
+
+    def encoded_lines(self, start: int, stop: int, file_format: FileFormat) -> bytes:
+        stop = min(stop, self.__root.size)
+        if start >= stop:
+            return b""
+        pieces = []
+        for lines, first, last in _leaf_ranges(self.__root, start, stop):
+            if (
+                isinstance(lines, _SourceLines)
+                and lines.materialized is None
+                and getattr(lines.source, "file_format", None) == file_format
+            ):
+                offset = lines.start
+                pieces.append(lines.source.raw(offset + first, offset + last))
+            else:
+                pieces.append(file_format.encode("\n".join(lines[first:last])))
+        return file_format.encode("\n").join(pieces)
+
+    def __locate(self, index: int):
+        if not 0 <= index < self.__root.size:
+            raise IndexError(f"Line {index} out of range")
+        # Consecutive keystrokes nearly always hit the same leaf
+        leaf, leaf_start = self.__last_leaf, self.__last_leaf_start
+        if leaf is not None and 0 <= index - leaf_start < len(leaf.lines):
+            return leaf, index - leaf_start
+        node = self.__root
+        offset = index
+        while isinstance(node, _Branch):
+            for child in node.children:
+                if offset < child.size:
+                    node = child
+                    break
+                offset -= child.size
+        self.__last_leaf, self.__last_leaf_start = node, index - offset
+        return node, offset
+
+
+def _split_leaf(lines: List[str]) -> list:
+    if len(lines) <= LEAF_CAPACITY:
+        return [_Leaf(lines)]
+    step = LEAF_CAPACITY // 2
+    return [_Leaf(lines[i : i + step]) for i in range(0, len(lines), step)]
+
+
+def _split_branch(children: list) -> list:
+    if len(children) <= BRANCH_CAPACITY:
+        return [_Branch(children)]
+    step = BRANCH_CAPACITY // 2
+    return [_Branch(children[i : i + step]) for i in range(0, len(children), step)]
+
+
+def _build(nodes: list):
+    while len(nodes) > 1:
+        nodes = [
+            _Branch(nodes[i : i + BRANCH_CAPACITY])
+            for i in range(0, len(nodes), BRANCH_CAPACITY)
+        ]
+    return nodes[0]
+
+
+def _insert(node, index: int, lines: List[str]) -> list:
+    if isinstance(node, _Leaf):
+        node.lines[index:index] = lines
+        if len(node.lines) <= LEAF_CAPACITY:
+            return [node]
+        return _split_leaf(node.lines)
+
+    children = node.children
+    position = len(children) - 1
+    for i, child in enumerate(children):
+        if index <= child.size:
+            position = i
+            break
+        index -= child.size
+    children[position : position + 1] = _insert(children[position], index, lines)
+    node.size += len(lines)
+    if len(children) <= BRANCH_CAPACITY:
+        return [node]
+    return _split_branch(children)
+
+
+def _delete(node, start: int, stop: int):
+    if isinstance(node, _Leaf):
+        del node.lines[start:stop]
+        return
+
+    kept = []
+    offset = 0
+    for child in node.children:
+        child_start, offset = offset, offset + child.size
+        if offset <= start or child_start >= stop:
+            kept.append(child)
+        elif start > child_start or offset > stop:
+            _delete(child, max(start - child_start, 0), min(stop, offset) - child_start)
+            if child.size:
+                kept.append(child)
+    node.children = _compact(kept)
+    node.size -= stop - start
+
+
+def _compact(children: list) -> list:
+    if not children or not isinstance(children[0], _Leaf):
+        return children
+    compacted = [children[0]]
+    for child in children[1:]:
+        previous = compacted[-1]
+        if len(previous.lines) + len(child.lines) <= LEAF_CAPACITY // 2:
+            previous.lines.extend(child.lines)
+        else:
+            compacted.append(child)
+    return compacted
+
+
+def _leaf_ranges(node, start: int, stop: int):
+    """Lines of every leaf from line start to stop, and the part of them in
+    that range"""
+    if isinstance(node, _Leaf):
+        yield node.lines, start, stop
+        return
+    offset = 0
+    for child in node.children:
+        end = offset + child.size
+        if end > start and offset < stop:
+            yield from _leaf_ranges(
+                child, max(start - offset, 0), min(stop, end) - offset
+            )
+        if end >= stop:
+            break
+        offset = end
+
+
+def _leaves(node) -> Iterator[_Leaf]:
+    if isinstance(node, _Leaf):
+        yield node
+        return
+    for child in node.children:
+        yield from _leaves(child)
+
+
+def _iterate(node, start: int, stop: int) -> Iterator[str]:
+    if isinstance(node, _Leaf):
+        yield from node.lines[start:stop]
+        return
+    offset = 0
+    for child in node.children:
+        end = offset + child.size
+        if end > start and offset < stop:
+            yield from _iterate(child, max(start - offset, 0), min(stop, end) - offset)
+        if end >= stop:
+            break
+        offset = end
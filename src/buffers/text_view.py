@@ -0,0 +1,37 @@
+from collections.abc import Sequence
+from src.interfaces.text_buffer import TextBuffer
+
+
+class TextView(Sequence):
+    """Read-only, list-like view over the lines of a TextBuffer"""
+
+    def __init__(self, buffer: TextBuffer):
+        self.__buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.__buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = index.start or 0
+            if index.step in (None, 1) and 0 <= start <= (index.stop or -1):
+                # Bounded slices must not need the length: it may not be known yet
+                return list(self.__buffer.lines(start, index.stop))
+            start, stop, step = index.indices(len(self.__buffer))
+            if step == 1:
+                return list(self.__buffer.lines(start, stop))
+            return [self.__buffer.line(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self.__buffer)
+        return self.__buffer.line(index)
+
+    def __iter__(self):
+        return iter(self.__buffer.lines())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (TextView, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"TextView({list(self)!r})"
@@ -1,9 +1,26 @@
 from __future__ import annotations
 import os
-from typing import List, TypedDict
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterator, List, Tuple, Type, TypedDict
 from dataclasses import dataclass
+from functools import wraps
+from src.file_format import FileFormat, detect
+from src.history import DELETE, INSERT, CursorSnapshot, History, Operation
+from src.journal import FileStamp, Journal, file_stamp, journal_path
+from src.multicursor import Position, plan_edit
+from src.buffers.line_offsets import LineOffsets
+from src.buffers.rope_buffer import RopeBuffer
+from src.buffers.text_view import TextView
+from src.registers import Registers
+from src.interfaces.text_buffer import TextBuffer
 
-MAX_LINE_LENGTH = 400
+SAVE_CHUNK_LINES = 16384
+# First character of every word
+WORD_START = re.compile(r"(?<!\w)\w")
 
 
 class Cursor(TypedDict):
@@ -12,115 +29,513 @@ class Cursor(TypedDict):
     last_horizontal_ref: int = 0
 
 
+def _recorded(method):
+    """Group every buffer change made by an Editor method into one undo entry"""
+
+    @wraps(method)
+    def wrapper(editor: Editor, *args, **kwargs):
+        with editor.lock:
+            editor.history.begin(editor.cursor_snapshot())
+            started = time.perf_counter_ns()
+            try:
+                return method(editor, *args, **kwargs)
+            finally:
+                editor.history.commit(editor.cursor_snapshot())
+                if not editor.history.is_grouping:
+                    # Nested edit commands are counted once, by the outermost
+                    editor.mutation_ns += time.perf_counter_ns() - started
+
+    return wrapper
+
+
+def _timed(method):
+    """Add the time spent in an Editor method to Editor.mutation_ns"""
+
+    @wraps(method)
+    def wrapper(editor: Editor, *args, **kwargs):
+        started = time.perf_counter_ns()
+        try:
+            return method(editor, *args, **kwargs)
+        finally:
+            editor.mutation_ns += time.perf_counter_ns() - started
+
+    return wrapper
+
+
+class _ConcurrentEdit(Exception):
+    pass
+
+
 @dataclass
 class Editor:
-    __text: List[str]
+    __buffer: TextBuffer
+    __buffer_type: Type[TextBuffer]
     __cursor: Cursor
-    __max_line_length: int
+    # Cursors typed at along with the cursor, sorted
+    __extra_cursors: List[Position]
+    __max_line_length: int | None
     __file_path: str
-    __copied: str | None
+    # How the file stores the text, to write it back the same way
+    __file_format: FileFormat
+    __registers: Registers
+    __listeners: List[Callable[[int, int, int], None]]
+    __history: History
+    __lock: threading.RLock
+    __version: int
+    __saved_version: int
+    __offsets: LineOffsets | None
+    __journaled: bool
+    __journal: Journal | None
+    __disk_stamp: FileStamp | None
+    # Nanoseconds spent applying edit commands, for latency instrumentation
+    mutation_ns: int
 
     def __init__(
         self,
         text: List[str] = [""],
         cursor: Cursor = {"line": 0, "char": 0, "last_horizontal_ref": 0},
-        max_line_length=MAX_LINE_LENGTH,
+        max_line_length: int | None = None,
         file_path="",
+        buffer_type: Type[TextBuffer] = RopeBuffer,
+        history: History | None = None,
+        journaled: bool = True,
     ):
-        self.__text = text
-        self.__cursor = cursor
+        self.__buffer_type = buffer_type
+        self.__buffer = buffer_type(text)
+        self.__cursor = Cursor(**cursor)
         if "last_horizontal_ref" not in cursor:
             self.__cursor["last_horizontal_ref"] = cursor["char"]
+        self.__extra_cursors = []
         self.__max_line_length = max_line_length
         self.__file_path = file_path
+        self.__file_format = FileFormat()
+        self.__registers = Registers()
+        self.__listeners = []
+        self.__history = History() if history is None else history
+        self.__lock = threading.RLock()
+        self.__version = 0
+        self.__saved_version = 0
+        self.__offsets = None
+        self.__journaled = journaled
+        self.__journal = None
+        self.__disk_stamp = None
+        self.mutation_ns = 0
 
     def __del__(self):
         self.exit()
 
     @property
-    def text(self) -> List[str]:
-        return self.__text
+    def text(self) -> TextView:
+        return TextView(self.__buffer)
+
+    @property
+    def buffer(self) -> TextBuffer:
+        return self.__buffer
 
     @property
     def cursor(self) -> Cursor:
         return self.__cursor
 
     @property
-    def max_line_length(self) -> Cursor:
+    def extra_cursors(self) -> List[Position]:
+        """Positions of the cursors other than cursor, sorted"""
+        return self.__extra_cursors
+
+    @property
+    def max_line_length(self) -> int | None:
+        """Length at which typing breaks the line, or None to never break it"""
         return self.__max_line_length
 
+    @property
+    def history(self) -> History:
+        return self.__history
+
     @property
     def file_path(self) -> str:
         return self.__file_path
 
     @property
-    def copied(self) -> str:
-        return self.__copied
+    def file_format(self) -> FileFormat:
+        return self.__file_format
+
+    @property
+    def copied(self) -> str | None:
+        register = self.__registers.get()
+        return None if register is None else register.text()
+
+    @property
+    def registers(self) -> Registers:
+        return self.__registers
+
+    @property
+    def offsets(self) -> LineOffsets:
+        """Line start offsets, built on first use and kept up to date by edits"""
+        if self.__offsets is None:
+            self.__offsets = LineOffsets(self.__buffer)
+        return self.__offsets
+
+    @property
+    def journal(self) -> Journal | None:
+        """Crash journal of the edits made since the file was last saved"""
+        return self.__journal
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Held while the text changes, so other threads can read it consistently"""
+        return self.__lock
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.__version != self.__saved_version
+
+    @property
+    def version(self) -> int:
+        """Count of changes made to the text, which grows with every edit"""
+        return self.__version
+
+    @property
+    def saved_version(self) -> int:
+        return self.__saved_version
+
+    @property
+    def disk_stamp(self) -> FileStamp | None:
+        """Stamp the file had when it was last loaded or saved"""
+        return self.__disk_stamp
+
+    def add_listener(self, listener: Callable[[int, int, int], None]):
+        """Call listener(start, removed, inserted) whenever lines change"""
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, int, int], None]):
+        self.__listeners.remove(listener)
 
     def from_file(self, path: str) -> Editor:
         self.__file_path = path
         try:
-            tmp_file = path + ".tmp"
-            with open(path, "r") as file:
-                self.__text = file.read().split("\n")
-            with open(tmp_file, "x+") as file:
-                return self
+            # Stamped before reading, so a change made while loading shows
+            self.__disk_stamp = self.__stamp(path)
+            self.__file_format = detect(path)
+            self.__buffer = self.__buffer_type.from_file(path, self.__file_format)
         except FileNotFoundError:
-            open(path, "x")
-            with open(path + ".tmp", "x+") as file:
-                self.__text = file.read().split("\n")
-                return self
+            open(path, "x").close()
+            self.__disk_stamp = self.__stamp(path)
+            self.__file_format = FileFormat()
+            self.__buffer = self.__buffer_type([""])
         except PermissionError:
             print(f"Error: Permission denied to access file '{path}'.")
-        except Exception as e:
-            raise e
+            return
+        self.__offsets = None
+        self.__saved_version = self.__version
+        if self.__journaled:
+            self.__open_journal(path)
+        return self
+
+    def from_unsaved(
+        self, path: str, source: str, file_format: FileFormat = FileFormat()
+    ) -> Editor:
+        """Load text kept in another file as UTF-8, such as a spilled buffer, as
+        unsaved changes to path, which is to be saved in file_format. The
+        journal of path is kept on with, not replayed onto, the text."""
+        self.__file_path = path
+        self.__disk_stamp = self.__stamp(path)
+        self.__file_format = file_format
+        self.__buffer = self.__buffer_type.from_file(source, FileFormat())
+        self.__offsets = None
+        self.__saved_version = self.__version - 1
+        if self.__journaled:
+            self.__reopen_journal(path)
+        return self
+
+    def merge_external(
+        self,
+        runs: List[Tuple[int, int, List[str]]],
+        stamp: FileStamp,
+        disk_lines: List[str],
+    ):
+        """Take in changes another program made to the file, which now has
+        stamp and disk_lines: runs of lines to replace as in replace_lines.
+        Text with no unsaved edits stays clean; otherwise the unsaved edits
+        left are journaled again against the new contents."""
+        with self.__lock:
+            clean = not self.is_dirty
+            if runs:
+                self.replace_lines(runs)
+            self.__disk_stamp = stamp
+            if clean:
+                self.__saved_version = self.__version
+            if self.__journal is not None:
+                self.__journal.reset(stamp)
+                if not clean:
+                    self.__journal.append((DELETE, 0, 0, "\n".join(disk_lines)))
+                    text = "\n".join(self.__buffer.lines())
+                    self.__journal.append((INSERT, 0, 0, text))
 
-    def save(self):
+    def save(self, exclusive: bool = False) -> bool:
+        """Stream the text to a temporary file and atomically rename it over the
+        original. Returns False if the text was edited from another thread while
+        saving, in which case the original file is left untouched. An exclusive
+        save holds the editor lock throughout, so edits wait for it instead."""
         try:
-            with open(self.__file_path, "w") as file:
-                file.write("\n".join(self.text))
+            if exclusive:
+                with self.__lock:
+                    return self.__save_atomically()
+            return self.__save_atomically()
+        except _ConcurrentEdit:
+            return False
         except FileNotFoundError:
             print(f"Error: File '{self.__file_path}' not found.")
         except PermissionError:
             print(f"Error: Permission denied to access file '{self.__file_path}'.")
         except Exception as e:
             raise e
+        return False
 
-    def cut(self):
-        self.__copied = self.__get_current_line_text()
+    @_recorded
+    def cut(self, register: str | None = None):
+        self.clear_cursors()
+        self.__registers.store([self.__get_current_line_text()], register)
         self.__remove_line()
 
-    def paste(self):
-        self.append(self.copied)
+    def copy_lines(self, start: int, stop: int, register: str | None = None):
+        """Copy lines start to stop - 1, each with its line break"""
+        start, stop = self.__clamp_lines(start, stop)
+        self.__registers.store(self.__line_chunks(start, stop), register)
+
+    @_recorded
+    def cut_lines(self, start: int, stop: int, register: str | None = None):
+        self.clear_cursors()
+        self.copy_lines(start, stop, register)
+        start, stop = self.__clamp_lines(start, stop)
+        text = self.__registers.get(register).text()
+        if self.__buffer.has_line(stop):
+            self.__delete_text(start, 0, text)
+        elif start > 0:
+            # No line break after the last line: take the one before them
+            previous_line_length = len(self.__get_line_text_at(start - 1))
+            self.__delete_text(start - 1, previous_line_length, "\n" + text[:-1])
+        else:
+            self.__delete_text(0, 0, text[:-1])
+        self.__move_cursor(min(start, len(self.__buffer) - 1), 0, True)
+
+    def copy_range(
+        self,
+        start: Tuple[int, int],
+        end: Tuple[int, int],
+        register: str | None = None,
+    ):
+        """Copy the text between two line:char positions, in either order"""
+        start, end = sorted((self.__clamp(*start), self.__clamp(*end)))
+        self.__registers.store(self.__range_chunks(start, end), register)
+
+    @_recorded
+    def cut_range(
+        self,
+        start: Tuple[int, int],
+        end: Tuple[int, int],
+        register: str | None = None,
+    ):
+        self.clear_cursors()
+        self.copy_range(start, end, register)
+        start = min(self.__clamp(*start), self.__clamp(*end))
+        self.__delete_text(*start, self.__registers.get(register).text())
+        self.__move_cursor(*start, True)
+
+    @_recorded
+    def replace_lines(self, runs: List[Tuple[int, int, List[str]]]):
+        """Replace each run of lines start to stop - 1 with new lines, splicing
+        every run into the buffer at once and making one undo step of them all.
+
+        Runs are sorted, do not overlap and are numbered as the lines were
+        before any of them is applied. A run can be empty, to insert lines,
+        or have no new lines, to delete them. New lines may hold line breaks.
+        Cursors other than the cursor are dropped, as by any edit that is not
+        made at all of them."""
+        self.clear_cursors()
+        line, char = self.cursor["line"], self.cursor["char"]
+        for start, stop, lines in reversed(runs):
+            self.__replace_line_range(start, stop, lines)
+        self.__move_cursor(*self.__clamp(line, char), True)
+
+    @_recorded
+    def paste(self, register: str | None = None):
+        """Insert a register at the cursor, splicing all its lines into the
+        buffer at once"""
+        self.clear_cursors()
+        stored = self.__registers.get(register)
+        if stored is None or not stored.size:
+            return
+        text = stored.text()
+        line, char = self.cursor["line"], self.cursor["char"]
+        self.__insert_text(line, char, text)
+        last_break = text.rfind("\n")
+        if last_break < 0:
+            self.__move_cursor(line, char + len(text), True)
+        else:
+            end_line = line + text.count("\n")
+            self.__move_cursor(end_line, len(text) - last_break - 1, True)
+
+    @_timed
+    def undo(self):
+        with self.__lock:
+            entry = self.__history.undo()
+            if entry is None:
+                return
+            self.clear_cursors()
+            for kind, line, char, text in reversed(entry.operations):
+                if kind == INSERT:
+                    self.__delete_text(line, char, text, record=False)
+                else:
+                    self.__insert_text(line, char, text, record=False)
+            self.__restore_cursor(entry.cursor_before)
+
+    @_timed
+    def redo(self):
+        with self.__lock:
+            entry = self.__history.redo()
+            if entry is None:
+                return
+            self.clear_cursors()
+            for kind, line, char, text in entry.operations:
+                if kind == INSERT:
+                    self.__insert_text(line, char, text, record=False)
+                else:
+                    self.__delete_text(line, char, text, record=False)
+            self.__restore_cursor(entry.cursor_after)
+
+    def cursor_snapshot(self) -> CursorSnapshot:
+        return (
+            self.cursor["line"],
+            self.cursor["char"],
+            self.cursor["last_horizontal_ref"],
+        )
 
     def exit(self):
-        if self.__file_path:
-            os.remove(self.__file_path + ".tmp")
+        self.__buffer.close()
+        self.__registers.close()
+        if self.__journal is not None:
+            # Unsaved edits stay journaled, to be replayed when the file is
+            # opened again
+            self.__journal.close(remove=not self.is_dirty)
+            self.__journal = None
+
+    def add_cursor(self, line: int, char: int):
+        """Type at line:char too, from the next edit on"""
+        position = self.__clamp(line, char)
+        if position == (self.cursor["line"], self.cursor["char"]):
+            return
+        index = bisect_left(self.__extra_cursors, position)
+        if self.__extra_cursors[index : index + 1] != [position]:
+            self.__extra_cursors.insert(index, position)
 
+    def add_cursors_below(self, count: int = 1):
+        """Add a cursor on each of the count lines below the lowest cursor, in
+        the column of the cursor or at the end of shorter lines"""
+        last = self.__extra_cursors[-1][0] if self.__extra_cursors else -1
+        first = max(self.cursor["line"], last) + 1
+        column = self.cursor["char"]
+        for line in range(first, min(first + count, len(self.__buffer))):
+            length = len(self.__get_line_text_at(line))
+            self.__extra_cursors.append((line, min(column, length)))
+
+    def clear_cursors(self):
+        """Go back to typing at the cursor alone"""
+        self.__extra_cursors = []
+
+    @_recorded
     def append(self, characters):
-        if len(self.__get_current_line_text()) >= self.max_line_length:
-            self.add_line()
-        self.__set_current_line_text(
-            self.__get_current_line_text()[0 : self.cursor["char"]]
-            + characters
-            + self.__get_current_line_text()[self.cursor["char"] :]
-        )
-        self.cursor_right()
+        if not characters:
+            return
+        if self.__extra_cursors:
+            # The line length limit is for the cursor alone
+            self.__edit_at_cursors(characters)
+            return
+        if self.max_line_length is None:
+            self.__insert_text(self.cursor["line"], self.cursor["char"], characters)
+            self.__move_cursor(
+                self.cursor["line"], self.cursor["char"] + len(characters), True
+            )
+            return
+        # Whole runs of characters are inserted at once, breaking the line
+        # wherever typing them one by one would have
+        while characters:
+            if len(self.__get_current_line_text()) >= self.max_line_length:
+                self.add_line()
+            room = max(self.max_line_length - len(self.__get_current_line_text()), 1)
+            piece, characters = characters[:room], characters[room:]
+            self.__insert_text(self.cursor["line"], self.cursor["char"], piece)
+            self.__move_cursor(
+                self.cursor["line"], self.cursor["char"] + len(piece), True
+            )
 
+    @_recorded
     def delete(self):
-        if len(self.__get_current_line_text()) > 0:
-            self.__set_current_line_text(
-                self.__get_current_line_text()[0 : self.cursor["char"] - 1]
-                + self.__get_current_line_text()[self.cursor["char"] :]
+        if self.__extra_cursors:
+            self.__edit_at_cursors(None)
+        elif self.cursor["char"] > 0:
+            line = self.__get_current_line_text()
+            self.__delete_text(
+                self.cursor["line"],
+                self.cursor["char"] - 1,
+                line[self.cursor["char"] - 1 : self.cursor["char"]],
             )
             self.cursor_left()
-        else:
-            if self.cursor["line"] > 0:
-                self.__remove_line()
+        elif self.cursor["line"] > 0:
+            self.__join_with_previous_line()
+
+    def move_to(self, line: int, char: int):
+        self.__move_cursor(*self.__clamp(line, char), True)
+
+    def cursor_offset(self) -> int:
+        """Characters before the cursor, counting line breaks as one"""
+        return self.offsets.offset_of(self.cursor["line"]) + self.cursor["char"]
+
+    def move_to_offset(self, offset: int):
+        line = self.offsets.line_at(offset)
+        self.move_to(line, offset - self.offsets.offset_of(line))
+
+    def cursor_start_of_file(self):
+        self.__move_cursor(0, 0, True)
+
+    def cursor_end_of_file(self):
+        line = len(self.__buffer) - 1
+        self.__move_cursor(line, len(self.__get_line_text_at(line)), True)
+
+    def cursor_page_up(self, rows: int):
+        self.__move_vertically(max(self.cursor["line"] - rows, 0))
+
+    def cursor_page_down(self, rows: int):
+        line = self.cursor["line"] + rows
+        if not self.__buffer.has_line(line):
+            line = len(self.__buffer) - 1
+        self.__move_vertically(line)
+
+    def cursor_word_right(self):
+        """Start of the next word, on this line or a following one"""
+        line, char = self.cursor["line"], self.cursor["char"] + 1
+        while self.__buffer.has_line(line):
+            match = WORD_START.search(self.__get_line_text_at(line), char)
+            if match is not None:
+                return self.__move_cursor(line, match.start(), True)
+            line, char = line + 1, 0
+        self.cursor_end_of_file()
+
+    def cursor_word_left(self):
+        """Start of the previous word, on this line or a preceding one"""
+        line, char = self.cursor["line"], self.cursor["char"]
+        while line >= 0:
+            text = self.__get_line_text_at(line)
+            end = len(text) if char is None else char
+            start = None
+            for match in WORD_START.finditer(text, 0, end):
+                start = match.start()
+            if start is not None:
+                return self.__move_cursor(line, start, True)
+            line, char = line - 1, None
+        self.cursor_start_of_file()
 
     def cursor_right(self):
         is_cursor_at_end = self.cursor["char"] >= len(self.__get_current_line_text())
-        are_more_lines = self.cursor["line"] < len(self.text) - 1
+        are_more_lines = self.__buffer.has_line(self.cursor["line"] + 1)
         if is_cursor_at_end:
             if are_more_lines:
                 self.__move_cursor(self.cursor["line"] + 1, 0, True)
@@ -134,7 +549,7 @@ class Editor:
             if not is_first_line:
                 self.__move_cursor(
                     self.cursor["line"] - 1,
-                    len(self.text[self.cursor["line"] - 1]),
+                    len(self.__get_line_text_at(self.cursor["line"] - 1)),
                     True,
                 )
         else:
@@ -159,7 +574,7 @@ class Editor:
                 )
 
     def cursor_down(self):
-        is_not_last_line = self.cursor["line"] < len(self.text) - 1
+        is_not_last_line = self.__buffer.has_line(self.cursor["line"] + 1)
 
         if is_not_last_line:
             is_next_line_longest_than_last_ref = (
@@ -177,38 +592,299 @@ class Editor:
                     False,
                 )
 
+    @_recorded
     def add_line(self):
-        lines_before = self.text[0 : self.cursor["line"] + 1]
-        lines_after = self.text[self.cursor["line"] + 1 :]
-        characters_after_cursor = self.text[self.cursor["line"]][self.cursor["char"] :]
-        if len(characters_after_cursor) > 0:
-            characters_before_cursor = lines_before[-1][: -len(characters_after_cursor)]
-            lines_before[-1] = characters_before_cursor
-        new_line = [characters_after_cursor]
-        self.__text = lines_before + new_line + lines_after
+        if self.__extra_cursors:
+            self.__edit_at_cursors("\n")
+            return
+        self.__insert_text(self.cursor["line"], self.cursor["char"], "\n")
         self.__move_cursor(self.cursor["line"] + 1, 0, True)
 
+    def __edit_at_cursors(self, text: str | None):
+        """Insert text at every cursor, or delete the character before each
+        when text is None, splicing the buffer once for each run of nearby
+        lines and moving all the cursors in one pass"""
+        extra = self.__extra_cursors
+        cursor = (self.cursor["line"], self.cursor["char"])
+        index = bisect_left(extra, cursor)
+        after = index + 1 if extra[index : index + 1] == [cursor] else index
+        cursors = extra[:index] + [cursor] + extra[after:]
+        runs, moved = plan_edit(self.__buffer.lines, cursors, text)
+        for start, stop, new_lines in reversed(runs):
+            self.__replace_line_range(start, stop, new_lines)
+        cursor = moved[index]
+        self.__move_cursor(*cursor, True)
+        # Cursors that met, deleting up to the same place, become one
+        self.__extra_cursors = [
+            position
+            for previous, position in zip([None, *moved], moved)
+            if position != previous and position != cursor
+        ]
+
+    def __move_vertically(self, line: int):
+        length = len(self.__get_line_text_at(line))
+        self.__move_cursor(line, min(self.cursor["last_horizontal_ref"], length))
+
     def __move_cursor(self, line: int, char: int, update_ref=False):
         self.cursor["line"] = line
         self.cursor["char"] = char
         if update_ref:
             self.cursor["last_horizontal_ref"] = char
 
-    def __remove_line(self):
-        lines_before = self.text[0 : self.cursor["line"]]
-        lines_after = self.text[self.cursor["line"] + 1 :]
-        previous_line_index = self.cursor["line"] - 1
+    def __save_atomically(self) -> bool:
+        if not self.__file_path:
+            raise FileNotFoundError(self.__file_path)
+        path = os.path.abspath(self.__file_path)
+        directory, name = os.path.split(path)
+        descriptor, temporary_path = tempfile.mkstemp(
+            prefix=f".{name}.", suffix=".save", dir=directory
+        )
+        try:
+            with self.__lock:
+                version = self.__version
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in self.__text_chunks(version):
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(path):
+                os.chmod(temporary_path, os.stat(path).st_mode)
+            with self.__lock:
+                if self.__version != version:
+                    raise _ConcurrentEdit
+                os.replace(temporary_path, path)
+                self.__saved_version = version
+                self.__disk_stamp = file_stamp(path)
+                if self.__journal is not None:
+                    self.__journal.reset(self.__disk_stamp)
+            self.__fsync_directory(directory)
+            return True
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def __text_chunks(self, version: int) -> Iterator[bytes]:
+        # The lock is only held while copying each chunk out of the buffer, so
+        # edits from the input loop can interleave with a background save
+        file_format = self.__file_format
+        newline = file_format.encode("\n")
+        yield file_format.bom
+        line = 0
+        while True:
+            with self.__lock:
+                if self.__version != version:
+                    raise _ConcurrentEdit
+                stop = min(line + SAVE_CHUNK_LINES, len(self.__buffer))
+                if line >= stop:
+                    return
+                chunk = self.__buffer.encoded_lines(line, stop, file_format)
+            if line:
+                yield newline
+            yield chunk
+            line = stop
+
+    def __open_journal(self, path: str):
+        """Replay the edits journaled before a crash, if any, and journal the
+        ones to come"""
+        if self.__journal is not None:
+            self.__journal.close()
+            self.__journal = None
+        stamp = self.__disk_stamp
+        if stamp is None:
+            # Editing goes on without a journal rather than not at all
+            return
+        path = journal_path(path)
+        recovered = []
+        for operation in Journal.recover(path, stamp):
+            try:
+                self.__apply(operation)
+            except IndexError:
+                # The rest do not fit the text: the journal is damaged
+                break
+            recovered.append(operation)
+        try:
+            self.__journal = Journal(path, stamp, recovered).start()
+        except OSError:
+            pass
 
-        self.__text = lines_before + lines_after
+    def __reopen_journal(self, path: str):
+        """Journal the edits to come after the ones that made the unsaved text
+        out of the file: those journaled before, or else the whole text"""
+        stamp = self.__disk_stamp
+        if stamp is None:
+            return
+        operations = Journal.recover(journal_path(path), stamp)
+        if not operations:
+            try:
+                with open(path, "rb") as file:
+                    data = file.read().removeprefix(self.__file_format.bom)
+            except OSError:
+                return
+            text = "\n".join(self.__buffer.lines())
+            operations = [
+                (DELETE, 0, 0, self.__file_format.decode(data)),
+                (INSERT, 0, 0, text),
+            ]
+        try:
+            self.__journal = Journal(journal_path(path), stamp, operations).start()
+        except OSError:
+            pass
+
+    def __stamp(self, path: str) -> FileStamp | None:
+        try:
+            return file_stamp(path)
+        except OSError:
+            return None
+
+    def __replace_line_range(self, start: int, stop: int, lines: List[str]):
+        old = "\n".join(self.__buffer.lines(start, stop))
+        new = "\n".join(lines)
+        if start < stop and lines:
+            self.__delete_text(start, 0, old)
+            self.__insert_text(start, 0, new)
+        elif start < stop:
+            # The line break that goes with the lines is the one after them,
+            # or the one before them at the end of the text
+            if self.__buffer.has_line(stop):
+                self.__delete_text(start, 0, old + "\n")
+            elif start > 0:
+                previous = len(self.__get_line_text_at(start - 1))
+                self.__delete_text(start - 1, previous, "\n" + old)
+            else:
+                self.__delete_text(0, 0, old)
+        elif lines:
+            if self.__buffer.has_line(start):
+                self.__insert_text(start, 0, new + "\n")
+            else:
+                previous = len(self.__get_line_text_at(start - 1))
+                self.__insert_text(start - 1, previous, "\n" + new)
+
+    def __apply(self, operation: Operation):
+        kind, line, char, text = operation
+        if not self.__buffer.has_line(line) or char > len(
+            self.__get_line_text_at(line)
+        ):
+            raise IndexError(f"Position {line}:{char} out of range")
+        if kind == INSERT:
+            self.__insert_text(line, char, text, record=False)
+        else:
+            self.__delete_text(line, char, text, record=False)
+
+    def __fsync_directory(self, directory: str):
+        try:
+            descriptor = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def __clamp_lines(self, start: int, stop: int) -> Tuple[int, int]:
+        """Lines start to stop - 1 within the text, at least one of them"""
+        start, _ = self.__clamp(start, 0)
+        return start, max(min(stop, len(self.__buffer)), start + 1)
+
+    def __clamp(self, line: int, char: int) -> Tuple[int, int]:
+        line = max(line, 0)
+        if not self.__buffer.has_line(line):
+            line = len(self.__buffer) - 1
+        return line, min(max(char, 0), len(self.__get_line_text_at(line)))
+
+    def __line_chunks(self, start: int, stop: int) -> Iterator[str]:
+        for chunk_start in range(start, stop, SAVE_CHUNK_LINES):
+            chunk_stop = min(chunk_start + SAVE_CHUNK_LINES, stop)
+            lines = self.__buffer.lines(chunk_start, chunk_stop)
+            yield "".join(line + "\n" for line in lines)
+
+    def __range_chunks(
+        self, start: Tuple[int, int], end: Tuple[int, int]
+    ) -> Iterator[str]:
+        (start_line, start_char), (end_line, end_char) = start, end
+        if start_line == end_line:
+            yield self.__get_line_text_at(start_line)[start_char:end_char]
+            return
+        yield self.__get_line_text_at(start_line)[start_char:] + "\n"
+        yield from self.__line_chunks(start_line + 1, end_line)
+        yield self.__get_line_text_at(end_line)[:end_char]
+
+    def __restore_cursor(self, snapshot: CursorSnapshot):
+        line, char, last_horizontal_ref = snapshot
+        self.__move_cursor(line, char)
+        self.cursor["last_horizontal_ref"] = last_horizontal_ref
+
+    def __remove_line(self):
+        line = self.cursor["line"]
+        text = self.__get_current_line_text()
+        if line > 0:
+            previous_line_length = len(self.__get_line_text_at(line - 1))
+            self.__delete_text(line - 1, previous_line_length, "\n" + text)
+        elif self.__buffer.has_line(1):
+            self.__delete_text(0, 0, text + "\n")
+        else:
+            self.__delete_text(0, 0, text)
+        previous_line_index = max(line - 1, 0)
         self.__move_cursor(
-            previous_line_index, len(self.text[previous_line_index]), True
+            previous_line_index, len(self.__get_line_text_at(previous_line_index)), True
         )
 
+    def __join_with_previous_line(self):
+        previous_line_index = self.cursor["line"] - 1
+        previous_line_length = len(self.__get_line_text_at(previous_line_index))
+        self.__delete_text(previous_line_index, previous_line_length, "\n")
+        self.__move_cursor(previous_line_index, previous_line_length, True)
+
+    def __insert_text(self, line: int, char: int, text: str, record=True):
+        current = self.__get_line_text_at(line)
+        before, after = current[:char], current[char:]
+        pieces = text.split("\n")
+        if len(pieces) == 1:
+            self.__set_line(line, before + text + after)
+        else:
+            self.__set_line(line, before + pieces[0])
+            self.__insert_lines(line + 1, pieces[1:-1] + [pieces[-1] + after])
+        if self.__journal is not None:
+            self.__journal.append((INSERT, line, char, text))
+        if record:
+            self.__history.record((INSERT, line, char, text))
+
+    def __delete_text(self, line: int, char: int, text: str, record=True):
+        pieces = text.split("\n")
+        end_line = line + len(pieces) - 1
+        end_char = (char if len(pieces) == 1 else 0) + len(pieces[-1])
+        current = self.__get_line_text_at(line)
+        if end_line == line:
+            self.__set_line(line, current[:char] + current[end_char:])
+        else:
+            last = self.__get_line_text_at(end_line)
+            self.__set_line(line, current[:char] + last[end_char:])
+            self.__delete_lines(line + 1, end_line + 1)
+        if self.__journal is not None:
+            self.__journal.append((DELETE, line, char, text))
+        if record:
+            self.__history.record((DELETE, line, char, text))
+
     def __get_current_line_text(self):
         return self.__get_line_text_at(self.cursor["line"])
 
     def __get_line_text_at(self, i: int):
-        return self.text[i]
+        return self.__buffer.line(i)
+
+    def __set_line(self, i: int, text: str):
+        self.__buffer.set_line(i, text)
+        self.__notify(i, 1, 1)
+
+    def __insert_lines(self, i: int, lines: List[str]):
+        self.__buffer.insert_lines(i, lines)
+        self.__notify(i, 0, len(lines))
+
+    def __delete_lines(self, start: int, stop: int):
+        self.__buffer.delete_lines(start, stop)
+        self.__notify(start, stop - start, 0)
 
-    def __set_current_line_text(self, text: str):
-        self.text[self.cursor["line"]] = text
+    def __notify(self, start: int, removed: int, inserted: int):
+        self.__version += 1
+        if self.__offsets is not None:
+            self.__offsets.invalidate(start, removed, inserted)
+        for listener in self.__listeners:
+            listener(start, removed, inserted)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import codecs
+from dataclasses import dataclass
+from typing import List
+
+# Bytes read from the start of a file to tell its encoding and line breaks
+SNIFF_BYTES = 1 << 16
+# Encoding of files that are not UTF-8: every byte is a character in it, or
+# escaped like any other byte that does not decode
+FALLBACK_ENCODING = "cp1252"
+# Bytes that do not decode are kept as lone surrogates, and written back as
+# the same bytes
+ERRORS = "surrogateescape"
+
+# Longest first: the UTF-32 LE mark starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+
+@dataclass(frozen=True)
+class FileFormat:
+    """How text is stored in a file: its encoding, the line break between
+    lines and the byte order mark it starts with, if any.
+
+    Lines in the editor never hold the line break. Text is decoded and
+    encoded with ERRORS, so a file that is not valid in its encoding comes
+    back byte for byte when saved."""
+
+    encoding: str = "utf-8"
+    newline: str = "\n"
+    bom: bytes = b""
+
+    @property
+    def is_ascii_compatible(self) -> bool:
+        """Whether a b"\\n" in the bytes is always a line break, so lines can
+        be found without decoding"""
+        return not self.encoding.startswith(("utf-16", "utf-32"))
+
+    def decode(self, data: bytes) -> str:
+        """Text of data, which holds no byte order mark, with "\\n" line breaks"""
+        text = data.decode(self.encoding, ERRORS)
+        if self.newline != "\n":
+            text = text.replace(self.newline, "\n")
+        return text
+
+    def decode_lines(self, data: bytes) -> List[str]:
+        return self.decode(data).split("\n")
+
+    def encode(self, text: str) -> bytes:
+        """Bytes of text with "\\n" line breaks, without the byte order mark"""
+        if self.newline != "\n":
+            text = text.replace("\n", self.newline)
+        return text.encode(self.encoding, ERRORS)
+
+
+def sniff(prefix: bytes) -> FileFormat:
+    """Format of a file that starts with prefix. A file with no byte order
+    mark is UTF-8 unless prefix has bytes that do not decode and no multibyte
+    characters that do; its lines break on "\\r\\n" if all of prefix's do."""
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            text = prefix[len(bom) :].decode(encoding, "ignore")
+            return FileFormat(encoding, _newline(text, "\r\n", "\n"), bom)
+    encoding = "utf-8" if _is_utf8(prefix) else FALLBACK_ENCODING
+    return FileFormat(encoding, _newline(prefix, b"\r\n", b"\n"))
+
+
+def detect(path: str) -> FileFormat:
+    """Format of the file at path, from its first SNIFF_BYTES"""
+    with open(path, "rb") as file:
+        return sniff(file.read(SNIFF_BYTES))
+
+
+def _is_utf8(prefix: bytes) -> bool:
+    try:
+        prefix.decode("utf-8")
+        return True
+    except UnicodeDecodeError as error:
+        # A character cut in two by the end of the sample is fine
+        if error.reason == "unexpected end of data" and error.end == len(prefix):
+            return True
+    # Valid multibyte characters make the odd bad byte damage, not another
+    # encoding
+    return not prefix.decode("utf-8", "ignore").isascii()
+
+
+def _newline(sample, crlf, lf) -> str:
+    breaks = sample.count(lf)
+    return "\r\n" if breaks and sample.count(crlf) == breaks else "\n"
@@ -0,0 +1,200 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+from typing import Hashable, List, Tuple
+from src.editor import Editor
+from src.interfaces.lexer import Lexer, Token
+
+# Lines lexed per step of the worker. The editor lock is only held to copy the
+# lines out and to store their tokens, never while lexing.
+CHUNK_LINES = 256
+# Documents longer than this are left plain rather than lexed from the top
+MAX_HIGHLIGHT_LINES = 2_000_000
+
+_UNKNOWN = object()
+
+
+class Highlighter:
+    """Tokens of every line of an editor, kept up to date by a worker thread.
+
+    Each line caches its tokens and the lexer state at its end. An edit drops
+    the cache of the lines it touched and queues them; the worker re-lexes
+    from the first queued line, starting from the state the previous line
+    ended in, and stops as soon as a line past the edit ends in the same state
+    as before, since everything below would come out unchanged. A one
+    character edit therefore re-lexes one line unless it opens or closes
+    something that spans lines, like a triple-quoted string.
+
+    Edits are reported on the input thread while the editor lock is held, and
+    the worker takes the same lock to store results, discarding a chunk when
+    an edit above its end came in while it was being lexed."""
+
+    def __init__(self, editor: Editor, lexer: Lexer, chunk_lines: int = CHUNK_LINES):
+        self.__editor = editor
+        self.__lexer = lexer
+        self.__chunk_lines = chunk_lines
+        with editor.lock:
+            line_count = len(editor.buffer)
+            self.__tokens: List[List[Token] | None] = [None] * line_count
+            self.__states: List[Hashable] = [_UNKNOWN] * line_count
+            # Sorted, disjoint [start, stop) ranges of lines to lex again
+            self.__pending: List[List[int]] = [[0, line_count]] if line_count else []
+            # First line edited since the worker copied its current chunk
+            self.__edited_from = sys.maxsize
+        self.__updated: List[Tuple[int, int]] = []
+        self.__lexed_lines = 0
+        self.__wake = threading.Event()
+        self.__idle = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__run, name="highlight", daemon=True
+        )
+        editor.add_listener(self.invalidate)
+
+    @property
+    def is_busy(self) -> bool:
+        return bool(self.__pending)
+
+    @property
+    def has_updates(self) -> bool:
+        return bool(self.__updated)
+
+    @property
+    def lexed_lines(self) -> int:
+        """Lines lexed since the start, to measure how much an edit costs"""
+        return self.__lexed_lines
+
+    def start(self) -> "Highlighter":
+        self.__wake.set()
+        self.__thread.start()
+        return self
+
+    def close(self):
+        """Stop the worker and stop following the editor's edits"""
+        if self.__stopped.is_set():
+            return
+        self.__editor.remove_listener(self.invalidate)
+        self.__stopped.set()
+        self.__wake.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def wait_until_idle(self, timeout: float | None = None) -> bool:
+        return self.__idle.wait(timeout)
+
+    def tokens(self, line: int) -> List[Token] | None:
+        """Tokens of line, or None while it is waiting to be lexed"""
+        tokens = self.__tokens
+        return tokens[line] if 0 <= line < len(tokens) else None
+
+    def take_updates(self) -> List[Tuple[int, int]]:
+        """[start, stop) ranges of lines whose tokens changed since the last
+        call, to be repainted"""
+        with self.__editor.lock:
+            updated, self.__updated = self.__updated, []
+        return updated
+
+    def invalidate(self, start: int, removed: int, inserted: int):
+        states = self.__states
+        self.__tokens[start : start + removed] = [None] * inserted
+        if inserted:
+            # The last inserted line inherits the state the text below used to
+            # start from: ending in it again means the edit did not reach past
+            if removed:
+                carried = states[start + removed - 1]
+            elif start:
+                carried = states[start - 1]
+            else:
+                carried = self.__lexer.initial_state
+            states[start : start + removed] = [_UNKNOWN] * (inserted - 1) + [carried]
+        else:
+            del states[start : start + removed]
+        line_count = len(self.__tokens)
+        delta = inserted - removed
+
+        def shifted(line: int) -> int:
+            if line <= start:
+                return line
+            return max(line + delta, start + inserted)
+
+        ranges = [[shifted(low), shifted(high)] for low, high in self.__pending]
+        # The line after a deletion follows different text, so it is queued too
+        ranges.append([start, min(start + max(inserted, 1), line_count)])
+        ranges.sort()
+        pending = []
+        for low, high in ranges:
+            if low >= high:
+                continue
+            if pending and low <= pending[-1][1]:
+                pending[-1][1] = max(pending[-1][1], high)
+            else:
+                pending.append([low, high])
+        self.__pending = pending
+        self.__edited_from = min(self.__edited_from, start)
+        self.__idle.clear()
+        self.__wake.set()
+
+    def run_pending(self):
+        """Lex everything queued on the calling thread"""
+        while self.__step():
+            pass
+        self.__idle.set()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            self.__wake.wait()
+            self.__wake.clear()
+            while not self.__stopped.is_set() and self.__step():
+                # Let the input thread in between chunks
+                time.sleep(0)
+            with self.__editor.lock:
+                if not self.__pending:
+                    self.__idle.set()
+
+    def __step(self) -> bool:
+        """Lex one chunk from the first queued line. Returns whether there is
+        work left."""
+        editor = self.__editor
+        with editor.lock:
+            if not self.__pending:
+                return False
+            self.__edited_from = sys.maxsize
+            start = self.__pending[0][0]
+            state = (
+                self.__lexer.initial_state if start == 0 else self.__states[start - 1]
+            )
+            stop = min(start + self.__chunk_lines, len(self.__tokens))
+            lines = list(editor.buffer.lines(start, stop))
+            previous_states = self.__states[start:stop]
+            queued_stop = self.__pending[0][1]
+
+        lex = self.__lexer.lex
+        results = []
+        converged = False
+        for line, previous in zip(lines, previous_states):
+            tokens, state = lex(line, state)
+            results.append((tokens, state))
+            if start + len(results) >= queued_stop and previous == state:
+                converged = True
+                break
+        self.__lexed_lines += len(results)
+
+        with editor.lock:
+            if self.__edited_from < stop:
+                # The chunk or a line above it changed while it was being lexed
+                return True
+            pending = self.__pending
+            line = start + len(results)
+            self.__tokens[start:line] = [tokens for tokens, _ in results]
+            self.__states[start:line] = [state for _, state in results]
+            self.__updated.append((start, line))
+            if line >= len(self.__tokens) or (converged and line >= pending[0][1]):
+                pending.pop(0)
+            else:
+                # Edits further down may have extended the queued range meanwhile
+                pending[0][0] = line
+                pending[0][1] = max(pending[0][1], line + 1)
+                if len(pending) > 1 and pending[1][0] <= pending[0][1]:
+                    pending[0][1] = max(pending[0][1], pending.pop(1)[1])
+            return bool(pending)
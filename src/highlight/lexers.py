@@ -0,0 +1,176 @@
+from __future__ import annotations
+import keyword
+import os
+import re
+from typing import Dict, List, Tuple, Type
+from src.interfaces.lexer import (
+    COMMENT,
+    CONSTANT,
+    DECORATOR,
+    ERROR,
+    INFO,
+    KEY,
+    KEYWORD,
+    NUMBER,
+    STRING,
+    TIMESTAMP,
+    WARNING,
+    Lexer,
+    Token,
+)
+
+_NUMBER = r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?j?)\b"
+
+
+class PythonLexer(Lexer):
+    """State: the quotes of a triple-quoted string still open, or None"""
+
+    TOKEN = re.compile(
+        r"(?P<comment>#.*)"
+        r"|(?P<triple>[rRbBuUfF]{0,2}(?:\"\"\"|'''))"
+        r"|(?P<string>[rRbBuUfF]{0,2}"
+        r"(?:\"(?:[^\"\\]|\\.)*\"?|'(?:[^'\\]|\\.)*'?))"
+        r"|(?P<decorator>^\s*@[\w.]+)"
+        rf"|(?P<number>{_NUMBER})"
+        r"|(?P<name>\b[A-Za-z_]\w*)"
+    )
+    KEYWORDS = frozenset(keyword.kwlist) - {"True", "False", "None"}
+    CONSTANTS = frozenset(("True", "False", "None"))
+
+    def lex(self, line: str, state) -> Tuple[List[Token], str | None]:
+        tokens = []
+        position = 0
+        if state is not None:
+            close = line.find(state)
+            if close < 0:
+                return [(0, len(line), STRING)] if line else [], state
+            position = close + 3
+            tokens.append((0, position, STRING))
+        while match := self.TOKEN.search(line, position):
+            kind = match.lastgroup
+            start, end = match.span()
+            if kind == "triple":
+                quotes = line[end - 3 : end]
+                close = line.find(quotes, end)
+                if close < 0:
+                    tokens.append((start, len(line), STRING))
+                    return tokens, quotes
+                end = close + 3
+                tokens.append((start, end, STRING))
+            elif kind == "name":
+                word = match.group()
+                if word in self.KEYWORDS:
+                    tokens.append((start, end, KEYWORD))
+                elif word in self.CONSTANTS:
+                    tokens.append((start, end, CONSTANT))
+            elif kind == "decorator":
+                tokens.append((end - len(match.group().lstrip()), end, DECORATOR))
+            else:
+                tokens.append((start, end, _KINDS[kind]))
+            position = end
+        return tokens, None
+
+
+class JsonLexer(Lexer):
+    """JSON strings cannot span lines, so there is no state"""
+
+    TOKEN = re.compile(
+        r"(?P<key>\"(?:[^\"\\]|\\.)*\"(?=\s*:))"
+        r"|(?P<string>\"(?:[^\"\\]|\\.)*\"?)"
+        r"|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"
+        r"|(?P<constant>\b(?:true|false|null)\b)"
+    )
+
+    def lex(self, line: str, state) -> Tuple[List[Token], None]:
+        return [
+            (match.start(), match.end(), _KINDS[match.lastgroup])
+            for match in self.TOKEN.finditer(line)
+        ], None
+
+
+class YamlLexer(Lexer):
+    """State: the indentation of the key that opened a block scalar (| or >),
+    whose lines are the more indented ones following it, or None"""
+
+    KEY_PATTERN = re.compile(
+        r"^(\s*(?:-\s+)*)((?:\"[^\"]*\"|'[^']*'|[^\s#'\"][^#]*?)\s*:)(?=\s|$)"
+    )
+    TOKEN = re.compile(
+        r"(?P<comment>(?:^|(?<=\s))#.*)"
+        r"|(?P<string>\"(?:[^\"\\]|\\.)*\"?|'(?:[^']|'')*'?)"
+        r"|(?P<block>[|>][+-]?\d*(?=\s*(?:#.*)?$))"
+        r"|(?P<decorator>[&*][\w-]+|!!?[\w-]*|^(?:---|\.\.\.)(?=\s|$))"
+        r"|(?P<constant>\b(?:true|false|yes|no|on|off|null|True|False|Null|~)\b)"
+        rf"|(?P<number>-?{_NUMBER})"
+    )
+
+    def lex(self, line: str, state) -> Tuple[List[Token], int | None]:
+        stripped = line.lstrip(" ")
+        indent = len(line) - len(stripped)
+        if state is not None:
+            if not stripped or indent > state:
+                return [(0, len(line), STRING)] if stripped else [], state
+            state = None
+        tokens = []
+        position = 0
+        key = self.KEY_PATTERN.match(line)
+        if key is not None:
+            tokens.append((key.start(2), key.end(2) - 1, KEY))
+            position = key.end(2)
+        for match in self.TOKEN.finditer(line, position):
+            kind = match.lastgroup
+            if kind == "block":
+                tokens.append((match.start(), match.end(), DECORATOR))
+                state = indent
+            else:
+                tokens.append((match.start(), match.end(), _KINDS[kind]))
+        return tokens, state
+
+
+class LogLexer(Lexer):
+    """Timestamps, severity words and quoted values, one line at a time"""
+
+    TOKEN = re.compile(
+        r"(?P<timestamp>\b\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}"
+        r"(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)"
+        r"|(?P<error>\b(?:ERROR|FATAL|CRITICAL|SEVERE|Traceback)\b)"
+        r"|(?P<warning>\b(?:WARN|WARNING)\b)"
+        r"|(?P<info>\b(?:INFO|NOTICE)\b)"
+        r"|(?P<comment>\b(?:DEBUG|TRACE)\b)"
+        r"|(?P<string>\"(?:[^\"\\]|\\.)*\"|'[^']*')"
+    )
+
+    def lex(self, line: str, state) -> Tuple[List[Token], None]:
+        return [
+            (match.start(), match.end(), _KINDS[match.lastgroup])
+            for match in self.TOKEN.finditer(line)
+        ], None
+
+
+_KINDS = {
+    "comment": COMMENT,
+    "string": STRING,
+    "number": NUMBER,
+    "key": KEY,
+    "constant": CONSTANT,
+    "decorator": DECORATOR,
+    "timestamp": TIMESTAMP,
+    "error": ERROR,
+    "warning": WARNING,
+    "info": INFO,
+}
+
+LEXERS: Dict[str, Type[Lexer]] = {
+    ".py": PythonLexer,
+    ".pyi": PythonLexer,
+    ".json": JsonLexer,
+    ".yaml": YamlLexer,
+    ".yml": YamlLexer,
+    ".log": LogLexer,
+}
+
+
+def lexer_for(path: str) -> Lexer | None:
+    """Lexer picked from the file extension, None for plain text"""
+    lexer = LEXERS.get(os.path.splitext(path)[1].lower())
+    return None if lexer is None else lexer()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import sys
+from collections import deque
+from typing import Deque, List, Tuple
+
+INSERT = 0
+DELETE = 1
+DEFAULT_MAX_HISTORY_BYTES = 16 << 20
+COALESCE_LIMIT = 256
+ENTRY_OVERHEAD = 200
+OPERATION_OVERHEAD = 100
+
+# (INSERT or DELETE, line, char, text): text was inserted or deleted at line:char
+Operation = Tuple[int, int, int, str]
+# (line, char, last_horizontal_ref)
+CursorSnapshot = Tuple[int, int, int]
+
+
+class HistoryEntry:
+    __slots__ = ("operations", "cursor_before", "cursor_after", "size")
+
+    def __init__(
+        self,
+        operations: List[Operation],
+        cursor_before: CursorSnapshot,
+        cursor_after: CursorSnapshot,
+    ):
+        self.operations = operations
+        self.cursor_before = cursor_before
+        self.cursor_after = cursor_after
+        self.size = ENTRY_OVERHEAD + sum(
+            OPERATION_OVERHEAD + sys.getsizeof(operation[3]) for operation in operations
+        )
+
+
+class History:
+    """Undo/redo stacks of span edits.
+
+    Editor mutations are grouped between begin() and commit(); each group
+    becomes one entry, and runs of typed or backspaced characters on the same
+    line are coalesced into a single entry. Once the recorded entries exceed
+    max_bytes, the oldest ones are dropped."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_HISTORY_BYTES):
+        self.__max_bytes = max_bytes
+        self.__undo: Deque[HistoryEntry] = deque()
+        self.__redo: List[HistoryEntry] = []
+        self.__size = 0
+        self.__depth = 0
+        self.__pending: List[Operation] = []
+        self.__cursor_before: CursorSnapshot = (0, 0, 0)
+        self.__sealed = True
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    def __len__(self) -> int:
+        return len(self.__undo)
+
+    @property
+    def is_grouping(self) -> bool:
+        """Whether begin() was called without its matching commit() yet"""
+        return self.__depth > 0
+
+    def begin(self, cursor: CursorSnapshot):
+        if self.__depth == 0:
+            self.__cursor_before = cursor
+        self.__depth += 1
+
+    def record(self, operation: Operation):
+        self.__pending.append(operation)
+
+    def commit(self, cursor: CursorSnapshot):
+        self.__depth -= 1
+        if self.__depth > 0 or not self.__pending:
+            return
+        operations, self.__pending = self.__pending, []
+        self.__size -= sum(entry.size for entry in self.__redo)
+        self.__redo.clear()
+        if not self.__coalesce(operations, cursor):
+            entry = HistoryEntry(operations, self.__cursor_before, cursor)
+            self.__undo.append(entry)
+            self.__size += entry.size
+        self.__sealed = False
+        self.__evict()
+
+    def seal(self):
+        """Stop the next edit from being coalesced into the last entry"""
+        self.__sealed = True
+
+    def undo(self) -> HistoryEntry | None:
+        if not self.__undo:
+            return None
+        entry = self.__undo.pop()
+        self.__redo.append(entry)
+        self.__sealed = True
+        return entry
+
+    def redo(self) -> HistoryEntry | None:
+        if not self.__redo:
+            return None
+        entry = self.__redo.pop()
+        self.__undo.append(entry)
+        self.__sealed = True
+        return entry
+
+    def __coalesce(self, operations: List[Operation], cursor: CursorSnapshot) -> bool:
+        if self.__sealed or not self.__undo or len(operations) != 1:
+            return False
+        last = self.__undo[-1]
+        if len(last.operations) != 1:
+            return False
+        kind, line, char, text = operations[0]
+        last_kind, last_line, last_char, last_text = last.operations[0]
+        if (
+            kind != last_kind
+            or line != last_line
+            or "\n" in text
+            or "\n" in last_text
+            or len(text) + len(last_text) > COALESCE_LIMIT
+        ):
+            return False
+        if kind == INSERT and char == last_char + len(last_text):
+            merged = (INSERT, line, last_char, last_text + text)
+        elif kind == DELETE and char + len(text) == last_char:
+            merged = (DELETE, line, char, text + last_text)
+        else:
+            return False
+        self.__size -= last.size
+        last.operations = [merged]
+        last.cursor_after = cursor
+        last.size = HistoryEntry([merged], cursor, cursor).size
+        self.__size += last.size
+        return True
+
+    def __evict(self):
+        while self.__size > self.__max_bytes and self.__undo:
+            self.__size -= self.__undo.popleft().size
@@ -1,13 +1,20 @@
 from enum import Enum
-import curses
 
+NO_KEY = -1
 
+
+# Codes curses.getch returns for special keys. They are fixed by curses.h, so
+# they are spelled out here rather than read from the curses module, which
+# runs that do not open a window never have to import.
 class Key(Enum):
+    TAB = 9
     ENTER = 10
     ESC = 27
     SAVE = 186
-    LEFT = curses.KEY_LEFT
-    RIGHT = curses.KEY_RIGHT
-    UP = curses.KEY_UP
-    DOWN = curses.KEY_DOWN
-    BACKSPACE = curses.KEY_BACKSPACE
+    LEFT = 260
+    RIGHT = 261
+    UP = 259
+    DOWN = 258
+    BACKSPACE = 263
+    PAGE_UP = 339
+    PAGE_DOWN = 338
@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from typing import Hashable, List, Tuple
+
+KEYWORD = "keyword"
+STRING = "string"
+COMMENT = "comment"
+NUMBER = "number"
+CONSTANT = "constant"
+KEY = "key"
+DECORATOR = "decorator"
+TIMESTAMP = "timestamp"
+ERROR = "error"
+WARNING = "warning"
+INFO = "info"
+KINDS = (
+    KEYWORD,
+    STRING,
+    COMMENT,
+    NUMBER,
+    CONSTANT,
+    KEY,
+    DECORATOR,
+    TIMESTAMP,
+    ERROR,
+    WARNING,
+    INFO,
+)
+
+# (start, end, kind) within one line
+Token = Tuple[int, int, str]
+
+
+class Lexer(ABC):
+    """Splits one line at a time into tokens.
+
+    Whatever a line leaves open for the next one (a triple-quoted string, a
+    block scalar) is carried in a hashable state, so a line can be lexed
+    again on its own given the state the previous line ended in."""
+
+    initial_state: Hashable = None
+
+    @abstractmethod
+    def lex(self, line: str, state: Hashable) -> Tuple[List[Token], Hashable]:
+        """Tokens of line and the state at its end"""
+        pass
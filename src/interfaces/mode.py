@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 from src.editor import Editor
 
+# Rows moved by page up/down when the mode does not know the window height
+DEFAULT_PAGE_ROWS = 20
+
+
+def default_page_rows() -> int:
+    return DEFAULT_PAGE_ROWS
+
 
 class Mode(ABC):
     editor: Editor
@@ -10,3 +18,23 @@ class Mode(ABC):
     @abstractmethod
     def key_action(self, key: int):
         pass
+
+    def activate(self):
+        # Modes are frozen dataclasses that get reused across switches
+        object.__setattr__(self, "is_active", True)
+
+    def deactivate(self):
+        object.__setattr__(self, "is_active", False)
+
+    def message(self) -> str | None:
+        """Text the last keys asked to show in the status line"""
+        return None
+
+    def key_actions(self, keys: List[int]) -> int:
+        """Apply a batch of keys, stopping after one that deactivates the mode.
+        Returns how many keys were consumed."""
+        for count, key in enumerate(keys, 1):
+            self.key_action(key)
+            if not self.is_active:
+                return count
+        return len(keys)
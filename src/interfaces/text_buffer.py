@@ -0,0 +1,57 @@
+from __future__ import annotations
+import sys
+from abc import ABC, abstractmethod
+from typing import Iterator, List
+from src.file_format import FileFormat, detect
+
+
+class TextBuffer(ABC):
+    @classmethod
+    def from_file(cls, path: str, file_format: FileFormat | None = None) -> TextBuffer:
+        """Buffer holding the file at path, read in file_format, or the format
+        detected from its start"""
+        file_format = detect(path) if file_format is None else file_format
+        with open(path, "rb") as file:
+            data = file.read().removeprefix(file_format.bom)
+        return cls(file_format.decode_lines(data))
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def line(self, index: int) -> str:
+        pass
+
+    @abstractmethod
+    def set_line(self, index: int, text: str):
+        pass
+
+    @abstractmethod
+    def insert_lines(self, index: int, lines: List[str]):
+        pass
+
+    @abstractmethod
+    def delete_lines(self, start: int, stop: int):
+        pass
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        for index in range(start, stop):
+            yield self.line(index)
+
+    def encoded_lines(self, start: int, stop: int, file_format: FileFormat) -> bytes:
+        """Lines start to stop - 1 as file_format stores them, with the line
+        breaks between them but not the one after the last. Buffers that still
+        hold lines as they were read copy their bytes rather than encode them."""
+        return file_format.encode("\n".join(self.lines(start, stop)))
+
+    def has_line(self, index: int) -> bool:
+        return 0 <= index < len(self)
+
+    def memory_size(self) -> int:
+        """Estimate of the bytes held by the buffer: every line plus a pointer"""
+        return sum(sys.getsizeof(line) + 8 for line in self.lines())
+
+    def close(self):
+        pass
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import os
+import struct
+import threading
+import zlib
+from typing import List, Tuple
+from src.history import Operation
+
+# Appended to the name of the edited file, hidden, to name its journal
+JOURNAL_SUFFIX = ".swp"
+# Seconds the writer waits for more edits before committing a group of them
+COMMIT_INTERVAL = 0.05
+MAGIC = b"EDJ1"
+# Magic, then the size and modification time of the file the edits apply to
+_HEADER = struct.Struct("<4sQQ")
+# Kind, line, char and byte length of the text, followed by the text and a CRC
+_RECORD = struct.Struct("<BIII")
+_CRC = struct.Struct("<I")
+
+# (size, mtime_ns) of a file, to tell whether it changed since it was stamped
+FileStamp = Tuple[int, int]
+
+
+def file_stamp(path: str) -> FileStamp:
+    status = os.stat(path)
+    return status.st_size, status.st_mtime_ns
+
+
+def journal_path(path: str) -> str:
+    """Path of the journal kept for the file at path, hidden next to it"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}{JOURNAL_SUFFIX}")
+
+
+def encode(operation: Operation) -> bytes:
+    kind, line, char, text = operation
+    payload = text.encode("utf-8", "surrogatepass")
+    record = _RECORD.pack(kind, line, char, len(payload)) + payload
+    return record + _CRC.pack(zlib.crc32(record))
+
+
+def decode(data: bytes) -> List[Operation]:
+    """Operations in a run of records, up to the first one that is cut short or
+    damaged, as the last commit before a crash may be"""
+    operations = []
+    position = 0
+    while position + _RECORD.size <= len(data):
+        kind, line, char, size = _RECORD.unpack_from(data, position)
+        end = position + _RECORD.size + size
+        if end + _CRC.size > len(data):
+            break
+        (crc,) = _CRC.unpack_from(data, end)
+        if crc != zlib.crc32(data[position:end]):
+            break
+        text = data[position + _RECORD.size : end].decode("utf-8", "surrogatepass")
+        operations.append((kind, line, char, text))
+        position = end + _CRC.size
+    return operations
+
+
+class Journal:
+    """Append-only log of the edits made to a file since it was last saved,
+    kept next to it so they can be replayed onto it after a crash.
+
+    Appending an operation only queues it: a background writer gathers what
+    was queued over COMMIT_INTERVAL and commits it with one write and one
+    fsync, so typing never waits on the disk and a burst of keys costs a
+    single sync. At most the edits of the last interval are lost in a crash.
+
+    The journal starts with a stamp of the file it applies to. Saving the file
+    resets it to an empty journal stamped with the new file, and a journal
+    whose stamp no longer matches its file is stale and not replayed."""
+
+    def __init__(
+        self,
+        path: str,
+        stamp: FileStamp,
+        operations: List[Operation] = (),
+        commit_interval: float = COMMIT_INTERVAL,
+    ):
+        self.__path = path
+        self.__commit_interval = commit_interval
+        self.__condition = threading.Condition()
+        self.__pending: List[Operation] = []
+        self.__reset: FileStamp | None = None
+        self.__appended = 0
+        self.__committed = 0
+        self.__commits = 0
+        self.__closing = False
+        self.__error: OSError | None = None
+        self.__hurry = threading.Event()
+        self.__file = self.__create(stamp, operations)
+        self.__thread = threading.Thread(
+            target=self.__run, name="journal", daemon=True
+        )
+
+    @staticmethod
+    def recover(path: str, stamp: FileStamp) -> List[Operation]:
+        """Operations journaled at path for a file that still has stamp"""
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        if len(data) < _HEADER.size:
+            return []
+        magic, size, mtime = _HEADER.unpack_from(data)
+        if magic != MAGIC or (size, mtime) != stamp:
+            return []
+        return decode(data[_HEADER.size :])
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def commits(self) -> int:
+        return self.__commits
+
+    @property
+    def error(self) -> OSError | None:
+        """Error that stopped the writer, after which nothing more is journaled"""
+        return self.__error
+
+    def start(self) -> Journal:
+        self.__thread.start()
+        return self
+
+    def append(self, operation: Operation):
+        with self.__condition:
+            if self.__error is not None:
+                return
+            self.__pending.append(operation)
+            self.__appended += 1
+            if len(self.__pending) == 1:
+                self.__condition.notify_all()
+
+    def reset(self, stamp: FileStamp):
+        """Drop every edit journaled so far: the file was saved and now has stamp"""
+        with self.__condition:
+            self.__pending.clear()
+            self.__reset = stamp
+            self.__appended += 1
+            self.__condition.notify_all()
+
+    def flush(self):
+        """Wait until everything appended so far is on disk"""
+        with self.__condition:
+            target = self.__appended
+            self.__hurry.set()
+            while self.__committed < target and self.__thread.is_alive():
+                self.__condition.wait()
+
+    def close(self, remove: bool = True):
+        """Commit what is left and stop the writer, removing the journal unless
+        remove is False"""
+        with self.__condition:
+            if self.__closing:
+                return
+            self.__closing = True
+            self.__hurry.set()
+            self.__condition.notify_all()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        self.__file.close()
+        if remove and os.path.exists(self.__path):
+            os.remove(self.__path)
+
+    def __create(self, stamp: FileStamp, operations: List[Operation]):
+        try:
+            with open(self.__path, "rb") as file:
+                magic = file.read(len(MAGIC))
+        except FileNotFoundError:
+            magic = MAGIC
+        if magic != MAGIC:
+            # Some other file has the journal's name: it is left alone
+            raise FileExistsError(f"'{self.__path}' is not a journal")
+        # Operations recovered from an earlier journal are written out before
+        # replacing it, so they are never only in memory
+        temporary_path = self.__path + ".new"
+        with open(temporary_path, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, *stamp))
+            file.write(b"".join(encode(operation) for operation in operations))
+            if operations:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temporary_path, self.__path)
+        return open(self.__path, "ab")
+
+    def __has_work(self) -> bool:
+        return bool(self.__pending) or self.__reset is not None
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__has_work() and not self.__closing:
+                    self.__condition.wait()
+                if not self.__has_work():
+                    self.__committed = self.__appended
+                    self.__condition.notify_all()
+                    return
+            # Let the rest of a burst of edits join this commit
+            self.__hurry.wait(self.__commit_interval)
+            with self.__condition:
+                if not self.__closing:
+                    self.__hurry.clear()
+                operations, self.__pending = self.__pending, []
+                reset, self.__reset = self.__reset, None
+                target = self.__appended
+            try:
+                self.__commit(reset, operations)
+            except OSError as error:
+                with self.__condition:
+                    self.__error = error
+                    self.__pending.clear()
+                    self.__committed = self.__appended
+                    self.__condition.notify_all()
+                return
+            with self.__condition:
+                self.__committed = target
+                self.__commits += 1
+                self.__condition.notify_all()
+
+    def __commit(self, reset: FileStamp | None, operations: List[Operation]):
+        data = b"".join(encode(operation) for operation in operations)
+        if reset is not None:
+            self.__file.truncate(0)
+            self.__file.seek(0)
+            data = _HEADER.pack(MAGIC, *reset) + data
+        self.__file.write(data)
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
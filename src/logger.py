@@ -1,14 +1,242 @@
+from __future__ import annotations
 import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
 
 DEFAULT_LOGGING_FILE = "editor.log"
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+# The log is moved aside to editor.log.1 once it grows past this many bytes,
+# keeping this many older logs
+DEFAULT_MAX_BYTES = 10 << 20
+DEFAULT_BACKUP_COUNT = 3
+# Seconds the writer lets records pile up before writing them in one go
+FLUSH_INTERVAL = 0.1
+# Records formatted and written in one write at most
+MAX_BATCH_RECORDS = 4096
+
+_STOP = None
+
+# What FileLogger.log_debug queues: (time, level, message, args). Building a
+# LogRecord costs several times as much, so the writer does it.
+Entry = Tuple[float, int, str, tuple]
+
+
+@dataclass(frozen=True)
+class Limit:
+    """How much of a category of messages to log: one in every sample_every,
+    and of those no more than per_second on average, in bursts of up to
+    burst. Messages over the limit are dropped and counted."""
+
+    sample_every: int = 1
+    per_second: float | None = None
+    burst: int = 10
+
+
+class _Gate:
+    """Sampling and rate limiting state of a category. Counts are kept
+    without a lock: a race between threads can only let a message more or
+    fewer through."""
+
+    def __init__(self, limit: Limit):
+        self.__limit = limit
+        self.__seen = 0
+        self.__tokens = float(limit.burst)
+        self.__refilled = time.monotonic()
+        self.dropped = 0
+
+    def admit(self) -> bool:
+        limit = self.__limit
+        self.__seen += 1
+        if self.__seen % limit.sample_every:
+            self.dropped += 1
+            return False
+        if limit.per_second is not None:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__tokens + (now - self.__refilled) * limit.per_second,
+                limit.burst,
+            )
+            self.__refilled = now
+            if self.__tokens < 1:
+                self.dropped += 1
+                return False
+            self.__tokens -= 1
+        return True
+
+
+class _QueueHandler(logging.Handler):
+    """Queues records logged through the logging module as they are. Unlike
+    logging.handlers.QueueHandler it leaves formatting to the writer thread,
+    and it spares startup the import of logging.handlers, with its sockets
+    and pickling."""
+
+    def __init__(self, records: queue.SimpleQueue):
+        super().__init__()
+        self.__records = records
+
+    def emit(self, record: logging.LogRecord):
+        self.__records.put(record)
+
+
+class _BatchWriter:
+    """Background worker that takes records and entries off the queue,
+    formats them and appends them to the log a batch at a time, rotating it
+    by size"""
+
+    def __init__(
+        self,
+        records: queue.SimpleQueue,
+        name: str,
+        path: str,
+        formatter: logging.Formatter,
+        max_bytes: int,
+        backup_count: int,
+    ):
+        self.__records = records
+        self.__name = name
+        self.__path = path
+        self.__formatter = formatter
+        self.__max_bytes = max_bytes
+        self.__backup_count = backup_count
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="log", daemon=True)
+
+    def start(self) -> _BatchWriter:
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stopped.set()
+        self.__records.put(_STOP)
+        if self.__thread.is_alive():
+            self.__thread.join()
+        self.__file.close()
+
+    def __run(self):
+        while True:
+            records = [self.__records.get()]
+            if records[0] is not _STOP:
+                self.__stopped.wait(FLUSH_INTERVAL)
+            while len(records) < MAX_BATCH_RECORDS:
+                try:
+                    records.append(self.__records.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = _STOP in records
+            self.__write([record for record in records if record is not _STOP])
+            if stopping:
+                return
+
+    def __write(self, records: List[logging.LogRecord | Entry]):
+        if not records:
+            return
+        lines = []
+        for record in records:
+            if isinstance(record, tuple):
+                record = self.__record(*record)
+            try:
+                lines.append(self.__formatter.format(record))
+            except Exception as e:
+                # A bad message must not take the writer down with it
+                lines.append(f"Unformattable {record.msg!r} {record.args!r}: {e!r}")
+        lines.append("")
+        try:
+            self.__file.write("\n".join(lines))
+            self.__file.flush()
+            if self.__max_bytes and self.__file.tell() >= self.__max_bytes:
+                self.__rotate()
+        except OSError:
+            # Nowhere to report it from here: the log is best effort
+            pass
+
+    def __record(
+        self, created: float, level: int, message: str, args: tuple
+    ) -> logging.LogRecord:
+        record = logging.LogRecord(self.__name, level, "", 0, message, args, None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        return record
+
+    def __rotate(self):
+        self.__file.close()
+        for index in range(self.__backup_count - 1, 0, -1):
+            source = f"{self.__path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.__path}.{index + 1}")
+        if self.__backup_count:
+            os.replace(self.__path, f"{self.__path}.1")
+        else:
+            os.remove(self.__path)
+        self.__file = open(self.__path, "a", encoding="utf-8")
 
 
 class FileLogger:
+    """Debug log that costs the thread logging as little as possible.
+
+    A call only checks the level and the category's limits, then queues the
+    message with its arguments, unformatted. A background thread formats the
+    queued messages and appends them to the file in batches, moving the file
+    aside once it grows past max_bytes. Records logged through the logger
+    property go through the same queue. Call close to write what is left."""
+
     __logger: logging.Logger
 
-    def __init__(self) -> None:
-        self.__logger = logging.getLogger("file_logger")
-        logging.basicConfig(filename=DEFAULT_LOGGING_FILE, level=logging.DEBUG)
+    def __init__(
+        self,
+        path: str = DEFAULT_LOGGING_FILE,
+        level: int = logging.DEBUG,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        limits: Dict[str, Limit] | None = None,
+    ) -> None:
+        name = f"file_logger.{path}"
+        self.__logger = logging.getLogger(name)
+        self.__logger.setLevel(level)
+        # Only ever written by the writer, not by handlers up the tree
+        self.__logger.propagate = False
+        self.__records = records = queue.SimpleQueue()
+        self.__handler = _QueueHandler(records)
+        self.__logger.addHandler(self.__handler)
+        self.__gates = {
+            category: _Gate(limit) for category, limit in (limits or {}).items()
+        }
+        self.__writer = _BatchWriter(
+            records,
+            name,
+            path,
+            logging.Formatter(DEFAULT_FORMAT),
+            max_bytes,
+            backup_count,
+        ).start()
+
+    @property
+    def logger(self) -> logging.Logger:
+        """Standard logger writing to the same file"""
+        return self.__logger
+
+    @property
+    def dropped(self) -> Dict[str, int]:
+        """Messages dropped by each category's limits"""
+        return {category: gate.dropped for category, gate in self.__gates.items()}
+
+    def log_debug(self, message: str, *args, category: str | None = None):
+        """Log message % args, formatted later on the writer thread, unless
+        the category is over its limits. The arguments must not be changed
+        after the call."""
+        if not self.__logger.isEnabledFor(logging.DEBUG):
+            return
+        if category is not None:
+            gate = self.__gates.get(category)
+            if gate is not None and not gate.admit():
+                return
+        self.__records.put((time.time(), logging.DEBUG, message, args))
 
-    def log_debug(self, message: str):
-        self.__logger.debug(message)
+    def close(self):
+        """Write every message logged so far and stop the writer"""
+        self.__logger.removeHandler(self.__handler)
+        self.__writer.stop()
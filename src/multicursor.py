@@ -0,0 +1,100 @@
+from __future__ import annotations
+from itertools import accumulate
+from typing import Callable, Iterable, List, Tuple
+
+# Cursors fewer than this many lines apart are edited as one run of lines,
+# with the lines between them spliced back unchanged
+MERGE_GAP = 32
+
+# (line, char)
+Position = Tuple[int, int]
+# (start, stop, new lines), as taken by Editor.replace_lines
+Run = Tuple[int, int, List[str]]
+
+
+def plan_edit(
+    lines: Callable[[int, int], Iterable[str]],
+    cursors: List[Position],
+    text: str | None,
+) -> Tuple[List[Run], List[Position]]:
+    """Runs of lines that insert text at every cursor, or delete the
+    character before every cursor when text is None, and where each cursor
+    ends up: one position for each of the sorted, distinct cursors given.
+
+    lines(start, stop) reads the text as it is. Nearby cursors share a run,
+    whose lines are joined, edited at all its cursors in one pass and split
+    again; how far each cursor moves is counted in the same pass, so the cost
+    does not grow with the number of cursors times the number of edits."""
+    runs: List[Run] = []
+    moved: List[Position] = []
+    shift = 0
+    for start, stop, group in _groups(cursors, text is None):
+        old = list(lines(start, stop))
+        new, offsets = _edit(old, _offsets(old, start, group), text)
+        new_lines = new.split("\n")
+        if new_lines != old:
+            runs.append((start, stop, new_lines))
+        moved.extend(_positions(new, offsets, start + shift))
+        shift += len(new_lines) - (stop - start)
+    return runs, moved
+
+
+def _groups(
+    cursors: List[Position], reach_back: bool
+) -> List[Tuple[int, int, List[Position]]]:
+    """Cursors gathered into runs of lines, start to stop - 1. Deleting can
+    join a line with the one before it, which the run then takes in."""
+    groups = []
+    for cursor in cursors:
+        line = cursor[0]
+        start = line - 1 if reach_back and line > 0 else line
+        if groups and start <= groups[-1][1] + MERGE_GAP:
+            groups[-1][1] = line + 1
+            groups[-1][2].append(cursor)
+        else:
+            groups.append([start, line + 1, [cursor]])
+    return [(start, stop, group) for start, stop, group in groups]
+
+
+def _offsets(old: List[str], start: int, group: List[Position]) -> List[int]:
+    """Offset of every cursor into the joined lines"""
+    # Characters before each line but the line breaks, summed at C speed
+    before = [0, *accumulate(map(len, old))]
+    return [
+        before[line - start] + line - start + min(char, len(old[line - start]))
+        for line, char in group
+    ]
+
+
+def _edit(old: List[str], offsets: List[int], text: str | None):
+    """The joined lines edited at every offset, and the offsets after it"""
+    joined = "\n".join(old)
+    pieces, moved = [], []
+    previous = 0
+    if text is None:
+        for offset in offsets:
+            if offset > previous:
+                pieces.append(joined[previous : offset - 1])
+                previous = offset
+            # Every cursor up to this one took a character away
+            moved.append(offset - len(pieces))
+        pieces.append(joined[previous:])
+        return "".join(pieces), moved
+    for count, offset in enumerate(offsets, 1):
+        pieces.append(joined[previous:offset])
+        previous = offset
+        moved.append(offset + count * len(text))
+    pieces.append(joined[previous:])
+    return text.join(pieces), moved
+
+
+def _positions(joined: str, offsets: List[int], first: int) -> List[Position]:
+    """Line and character of each offset into the joined lines, numbering
+    them from first"""
+    positions = []
+    line, previous = first, 0
+    for offset in offsets:
+        line += joined.count("\n", previous, offset)
+        previous = offset
+        positions.append((line, offset - joined.rfind("\n", 0, offset) - 1))
+    return positions
@@ -0,0 +1,245 @@
+from __future__ import annotations
+import os
+from array import array
+from bisect import bisect_right
+from typing import List, Tuple
+from src.file_format import SNIFF_BYTES, FileFormat, sniff
+
+# Bytes read from the file at a time
+READ_CHUNK_SIZE = 1 << 16
+# Bytes read at a time when counting lines through the file
+SCAN_CHUNK_SIZE = 1 << 20
+# A line is remembered every this many bytes at first; once there are
+# MAX_CHECKPOINTS of them every other one is dropped and the spacing doubled,
+# so the index stays the same size however big the file grows
+CHECKPOINT_SPACING = 1 << 20
+MAX_CHECKPOINTS = 4096
+# Bytes of a line that are decoded and shown: the rest is skipped
+MAX_LINE_BYTES = 1 << 16
+
+
+class FileStream:
+    """Read-only window onto a file that can be any size and still growing.
+
+    Nothing is loaded up front: lines are read from the file on demand by
+    byte offset, a chunk at a time. Going to a line by number counts lines
+    through the file once, remembering where a line starts every so often,
+    never every line, so memory stays bounded. refresh picks up data
+    appended since, and starts over when the file is truncated or replaced,
+    as when a log is rotated. Lines are decoded in the file's format, told
+    from its start when not given; a "\r" before a line break is left out."""
+
+    def __init__(self, path: str, file_format: FileFormat | None = None):
+        self.__path = path
+        self.__file = open(path, "rb")
+        self.__size = os.fstat(self.__file.fileno()).st_size
+        if file_format is None:
+            file_format = sniff(self.__read(0, SNIFF_BYTES))
+        if not file_format.is_ascii_compatible:
+            # Lines are found by the b"\n" that ends them
+            self.__file.close()
+            raise OSError(f"Cannot page '{path}': it is {file_format.encoding}")
+        self.__format = file_format
+        self.__generation = 0
+        self.__reset_index()
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        """Size of the file when it was opened or last refreshed"""
+        return self.__size
+
+    @property
+    def generation(self) -> int:
+        """Count of the times the file was truncated or replaced, after which
+        earlier offsets mean nothing"""
+        return self.__generation
+
+    def memory_size(self) -> int:
+        """Bytes held by the line index"""
+        return self.__offsets.itemsize * len(self.__offsets) * 2
+
+    def close(self):
+        self.__file.close()
+
+    def refresh(self) -> bool:
+        """Catch up with changes to the file. Returns whether it changed."""
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            # Moved away and not created again yet: keep showing the old one
+            return False
+        if stat.st_ino != os.fstat(self.__file.fileno()).st_ino:
+            self.__file.close()
+            self.__file = open(self.__path, "rb")
+            self.__size = os.fstat(self.__file.fileno()).st_size
+            self.__generation += 1
+            self.__reset_index()
+            return True
+        if stat.st_size == self.__size:
+            return False
+        if stat.st_size < self.__size:
+            self.__generation += 1
+            self.__reset_index()
+        self.__size = stat.st_size
+        return True
+
+    def line_start(self, position: int) -> int:
+        """Offset of the start of the line position is on"""
+        end = min(max(position, 0), self.__size)
+        while end > 0:
+            start = max(0, end - READ_CHUNK_SIZE)
+            found = self.__read(start, end - start).rfind(b"\n")
+            if found >= 0:
+                return start + found + 1
+            end = start
+        return 0
+
+    def next_line_start(self, offset: int) -> int | None:
+        """Offset of the line after the one starting at offset, or None if it
+        is the last"""
+        end = self.__line_end(offset)
+        return end + 1 if end + 1 < self.__size else None
+
+    def previous_line_start(self, offset: int) -> int | None:
+        """Offset of the line before the one starting at offset, or None if it
+        is the first"""
+        return self.line_start(offset - 1) if offset > 0 else None
+
+    def tail_start(self, count: int) -> int:
+        """Offset of the first of the last count lines"""
+        # A line break at the very end closes the last line, not a new one
+        end = self.__size - 1 if self.__ends_with_break() else self.__size
+        start = self.line_start(end)
+        for _ in range(count - 1):
+            if start == 0:
+                break
+            start = self.line_start(start - 1)
+        return start
+
+    def lines(self, offset: int, count: int) -> List[Tuple[int, str]]:
+        """Up to count lines from the one starting at offset, as their offsets
+        and text, cut at MAX_LINE_BYTES"""
+        result = []
+        base, chunk = offset, self.__read(offset, READ_CHUNK_SIZE)
+        while len(result) < count and offset < self.__size:
+            found = chunk.find(b"\n", offset - base)
+            if found >= 0:
+                end = base + found
+            elif base + len(chunk) >= self.__size:
+                end = self.__size
+            elif offset > base:
+                # The line goes on past the chunk: read on from its start
+                base, chunk = offset, self.__read(offset, READ_CHUNK_SIZE)
+                continue
+            else:
+                end = self.__line_end(offset)
+            if end - base <= len(chunk):
+                data = chunk[offset - base : min(end, offset + MAX_LINE_BYTES) - base]
+            else:
+                data = self.__read(offset, min(end - offset, MAX_LINE_BYTES))
+            if end < self.__size and offset + len(data) == end:
+                # The "\r" of a CRLF line break is not part of the line
+                data = data.removesuffix(b"\r")
+            if offset == 0:
+                data = data.removeprefix(self.__format.bom)
+            text = data.decode(self.__format.encoding, errors="replace")
+            result.append((offset, text))
+            offset = end + 1
+        return result
+
+    def line_offset(self, index: int) -> int | None:
+        """Offset of the start of line index, or None past the last line.
+        Counts lines through the file up to it, if they have not been yet."""
+        if index < 0:
+            return None
+        self.__scan(lambda: self.__lines[-1] >= index)
+        checkpoint = bisect_right(self.__lines, index) - 1
+        offset, line = self.__offsets[checkpoint], self.__lines[checkpoint]
+        while line < index:
+            chunk = self.__read(offset, SCAN_CHUNK_SIZE)
+            if not chunk:
+                return None
+            breaks = chunk.count(b"\n")
+            if line + breaks < index:
+                line += breaks
+                offset += len(chunk)
+                continue
+            # Bisect for the line break ending the line before index: a few
+            # counts through the chunk beat a find per line
+            low, high = 0, len(chunk) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if chunk.count(b"\n", 0, middle + 1) < index - line:
+                    low = middle + 1
+                else:
+                    high = middle
+            offset, line = offset + low + 1, index
+        if offset > self.__size or (offset == self.__size and index > 0):
+            return None
+        return offset
+
+    def line_number(self, offset: int) -> int | None:
+        """Index of the line starting at offset, if lines have been counted
+        that far; it is not worth reading the whole file for"""
+        if offset > self.__scanned:
+            return None
+        checkpoint = bisect_right(self.__offsets, offset) - 1
+        start = self.__offsets[checkpoint]
+        counted = self.__read(start, offset - start).count(b"\n")
+        return self.__lines[checkpoint] + counted
+
+    def __reset_index(self):
+        # Line self.__lines[i] starts at self.__offsets[i]
+        self.__offsets = array("Q", [0])
+        self.__lines = array("Q", [0])
+        self.__spacing = CHECKPOINT_SPACING
+        self.__scanned = 0
+        self.__scanned_lines = 0
+
+    def __scan(self, done):
+        """Count lines through the file, a chunk at a time, until done()"""
+        while not done() and self.__scanned < self.__size:
+            start = self.__scanned
+            chunk = self.__read(start, SCAN_CHUNK_SIZE)
+            if not chunk:
+                break
+            next_checkpoint = self.__offsets[-1] + self.__spacing
+            if start + len(chunk) > next_checkpoint:
+                found = chunk.find(b"\n", max(next_checkpoint - start, 0))
+                if found >= 0:
+                    line = self.__scanned_lines + chunk.count(b"\n", 0, found) + 1
+                    self.__add_checkpoint(start + found + 1, line)
+            self.__scanned_lines += chunk.count(b"\n")
+            self.__scanned = start + len(chunk)
+
+    def __add_checkpoint(self, offset: int, line: int):
+        self.__offsets.append(offset)
+        self.__lines.append(line)
+        if len(self.__offsets) > MAX_CHECKPOINTS:
+            self.__offsets = self.__offsets[::2]
+            self.__lines = self.__lines[::2]
+            self.__spacing *= 2
+
+    def __line_end(self, offset: int) -> int:
+        """Offset of the line break ending the line at offset, or the end of
+        the file"""
+        position = offset
+        while position < self.__size:
+            chunk = self.__read(position, READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            found = chunk.find(b"\n")
+            if found >= 0:
+                return position + found
+            position += len(chunk)
+        return self.__size
+
+    def __ends_with_break(self) -> bool:
+        return self.__size > 0 and self.__read(self.__size - 1, 1) == b"\n"
+
+    def __read(self, offset: int, size: int) -> bytes:
+        return os.pread(self.__file.fileno(), size, offset)
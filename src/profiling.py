@@ -0,0 +1,179 @@
+from __future__ import annotations
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+DECODE = "decode"
+DISPATCH = "dispatch"
+MUTATION = "mutation"
+RENDER = "render"
+TOTAL = "total"
+STAGES = (DECODE, DISPATCH, MUTATION, RENDER, TOTAL)
+
+# Every power of two is split into this many buckets, so a bucket is at most
+# 25% wider than its lower bound
+SUB_BUCKETS = 4
+BUCKETS = 64 * SUB_BUCKETS
+# Once this many samples pile up, the rolling counts are halved
+ROLLING_SAMPLES = 1024
+# The HUD text is rebuilt at most this often, in seconds
+HUD_INTERVAL = 0.25
+HUD_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket(nanoseconds: int) -> int:
+    if nanoseconds < SUB_BUCKETS:
+        return nanoseconds if nanoseconds > 0 else 0
+    shift = nanoseconds.bit_length() - 3
+    bucket = (shift + 1) * SUB_BUCKETS + ((nanoseconds >> shift) & 3)
+    return bucket if bucket < BUCKETS else BUCKETS - 1
+
+
+def _bucket_limit(bucket: int) -> int:
+    """Largest duration that falls in the bucket"""
+    if bucket < SUB_BUCKETS:
+        return bucket
+    shift = bucket // SUB_BUCKETS - 1
+    return ((SUB_BUCKETS + 1 + bucket % SUB_BUCKETS) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in nanoseconds.
+
+    Recording is a couple of integer operations and list increments. Besides
+    the counts for the whole session it keeps rolling counts that are halved
+    every ROLLING_SAMPLES samples, so recent percentiles follow the current
+    workload instead of being diluted by everything before it."""
+
+    def __init__(self):
+        self.__counts = [0] * BUCKETS
+        self.__rolling = [0] * BUCKETS
+        self.__rolling_count = 0
+        self.__count = 0
+        self.__sum = 0
+        self.__max = 0
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def mean(self) -> float:
+        return self.__sum / self.__count if self.__count else 0.0
+
+    @property
+    def max(self) -> int:
+        return self.__max
+
+    def record(self, nanoseconds: int):
+        bucket = _bucket(nanoseconds)
+        self.__counts[bucket] += 1
+        self.__rolling[bucket] += 1
+        self.__count += 1
+        self.__sum += nanoseconds
+        if nanoseconds > self.__max:
+            self.__max = nanoseconds
+        self.__rolling_count += 1
+        if self.__rolling_count >= ROLLING_SAMPLES:
+            self.__rolling = [count >> 1 for count in self.__rolling]
+            self.__rolling_count = sum(self.__rolling)
+
+    def percentile(self, fraction: float, rolling=False) -> int:
+        """Upper bound of the bucket holding the given fraction of the samples"""
+        return self.percentiles((fraction,), rolling)[0]
+
+    def percentiles(self, fractions: Sequence[float], rolling=False) -> List[int]:
+        """Several ascending percentiles in one pass over the buckets"""
+        counts = self.__rolling if rolling else self.__counts
+        total = sum(counts)
+        if not total:
+            return [0] * len(fractions)
+        results = []
+        seen = 0
+        bucket = -1
+        for fraction in fractions:
+            while seen < fraction * total and bucket < BUCKETS - 1:
+                bucket += 1
+                seen += counts[bucket]
+            results.append(min(_bucket_limit(max(bucket, 0)), self.__max))
+        return results
+
+
+def _microseconds(nanoseconds: float) -> str:
+    return f"{nanoseconds / 1000:.{0 if nanoseconds >= 10_000 else 1}f}"
+
+
+class LatencyMonitor:
+    """Per-stage latency of every input batch, from the moment its first key
+    arrives until the screen is refreshed"""
+
+    def __init__(self, hud=False):
+        self.__histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram() for stage in STAGES
+        }
+        self.__hud = hud
+        self.__hud_text = ""
+        self.__hud_built = 0.0
+
+    @property
+    def shows_hud(self) -> bool:
+        return self.__hud
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        return self.__histograms[stage]
+
+    def record(self, stage: str, nanoseconds: int):
+        self.__histograms[stage].record(nanoseconds)
+
+    def hud(self) -> str:
+        """Rolling p50/p95/p99 of each stage in microseconds, refreshed every
+        HUD_INTERVAL seconds so drawing it costs next to nothing per frame"""
+        now = time.monotonic()
+        if self.__hud_text and now - self.__hud_built < HUD_INTERVAL:
+            return self.__hud_text
+        parts: List[str] = ["us p50/95/99"]
+        for stage in STAGES:
+            percentiles = self.__histograms[stage].percentiles(
+                HUD_PERCENTILES, rolling=True
+            )
+            parts.append(f"{stage[:3]} {'/'.join(map(_microseconds, percentiles))}")
+        self.__hud_text = "  ".join(parts)
+        self.__hud_built = now
+        return self.__hud_text
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for stage, histogram in self.__histograms.items():
+            p50, p95, p99 = histogram.percentiles(HUD_PERCENTILES)
+            summary[stage] = {
+                "count": histogram.count,
+                "mean_us": histogram.mean / 1000,
+                "p50_us": p50 / 1000,
+                "p95_us": p95 / 1000,
+                "p99_us": p99 / 1000,
+                "max_us": histogram.max / 1000,
+            }
+        return summary
+
+    def dump(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+            file.write("\n")
+
+
+@contextmanager
+def profiled(path: str | None) -> Iterator[None]:
+    """Run the block under cProfile and write the stats to path, for
+    python -m pstats or snakeviz. Does nothing when path is None."""
+    if path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import io
+import string
+import tempfile
+from typing import Dict, Iterable, Iterator, List
+
+UNNAMED = '"'
+NAMES = frozenset(string.ascii_lowercase) | {UNNAMED}
+# Registers holding more characters than this move to a temporary file
+SPILL_SIZE = 1 << 20
+READ_CHUNK_SIZE = 1 << 20
+
+
+class Register:
+    """Text cut or copied from the editor.
+
+    The text is collected from chunks so that copying a large range never needs
+    the whole range as one string; once it grows past spill_size it is written
+    to an anonymous temporary file instead of being kept in memory."""
+
+    def __init__(self, chunks: Iterable[str] = (), spill_size: int | None = None):
+        spill_size = SPILL_SIZE if spill_size is None else spill_size
+        self.__chunks: List[str] = []
+        self.__file: io.TextIOWrapper | None = None
+        self.__size = 0
+        for chunk in chunks:
+            self.__size += len(chunk)
+            if self.__file is not None:
+                self.__file.write(chunk)
+                continue
+            self.__chunks.append(chunk)
+            if self.__size > spill_size:
+                self.__spill()
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def is_spilled(self) -> bool:
+        return self.__file is not None
+
+    def text(self) -> str:
+        if self.__file is None:
+            if len(self.__chunks) > 1:
+                self.__chunks = ["".join(self.__chunks)]
+            return self.__chunks[0] if self.__chunks else ""
+        return "".join(self.chunks())
+
+    def chunks(self) -> Iterator[str]:
+        if self.__file is None:
+            yield from self.__chunks
+            return
+        self.__file.seek(0)
+        while chunk := self.__file.read(READ_CHUNK_SIZE):
+            yield chunk
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__chunks = []
+        self.__size = 0
+
+    def __spill(self):
+        # Line endings and undecodable characters must come back unchanged
+        self.__file = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", errors="surrogatepass", newline=""
+        )
+        self.__file.writelines(self.__chunks)
+        self.__chunks = []
+
+
+class Registers:
+    """Named registers a-z plus the unnamed one, which always refers to the
+    register written last"""
+
+    def __init__(self, spill_size: int | None = None):
+        self.__spill_size = spill_size
+        self.__registers: Dict[str, Register] = {}
+        self.__last = UNNAMED
+
+    def store(self, chunks: Iterable[str], name: str | None = None) -> Register:
+        name = UNNAMED if name is None else name
+        if name not in NAMES:
+            raise ValueError(f"Unknown register '{name}'")
+        register = Register(chunks, self.__spill_size)
+        replaced = self.__registers.get(name)
+        if replaced is not None:
+            replaced.close()
+        self.__registers[name] = register
+        self.__last = name
+        return register
+
+    def get(self, name: str | None = None) -> Register | None:
+        return self.__registers.get(self.__last if name in (None, UNNAMED) else name)
+
+    def names(self) -> List[str]:
+        return sorted(self.__registers)
+
+    def close(self):
+        for register in self.__registers.values():
+            register.close()
+        self.__registers.clear()
@@ -0,0 +1,314 @@
+from __future__ import annotations
+import os
+import re
+from typing import Iterable, Iterator, List, Tuple
+from src.editor import Editor
+from src.search import Match, SearchIndex
+
+# Lines read from the buffer and scanned at once
+SCAN_LINES = 4096
+# Changed lines fewer than this many lines apart are rebuilt as one run, with
+# the unchanged lines between them
+MERGE_GAP = 32
+# Files handed to a worker process at a time
+CHUNK_FILES = 8
+
+
+def compile_pattern(query: str, regex: bool = False) -> re.Pattern:
+    """Pattern matching query, literally unless regex. Raises re.error."""
+    return re.compile(query if regex else re.escape(query), re.MULTILINE)
+
+
+def expand(match: re.Match, replacement: str, regex: bool) -> str:
+    """Text replacing match: the replacement itself, or with regex its \\1 and
+    \\g<name> group references filled in"""
+    return match.expand(replacement) if regex else replacement
+
+
+def replace_all(
+    editor: Editor,
+    query: str,
+    replacement: str,
+    regex: bool = False,
+    start: Tuple[int, int] = (0, 0),
+) -> int:
+    """Replace every match at or after start, to the end of the document.
+    Returns how many were replaced.
+
+    Matches never span lines, as in sed. The whole document is scanned
+    before any of it changes, and the changed lines are then spliced into
+    the buffer in a few runs by Editor.replace_lines, as one undo step."""
+    pattern = compile_pattern(query, regex)
+    # Literal replacements must not have their backslashes read as escapes
+    template = replacement if regex else replacement.replace("\\", "\\\\")
+    runs: List[Tuple[int, int, List[str]]] = []
+    count = 0
+    with editor.lock:
+        buffer = editor.buffer
+        first_line, first_char = start
+        chunk_start = first_line
+        while True:
+            lines = list(buffer.lines(chunk_start, chunk_start + SCAN_LINES))
+            if not lines:
+                break
+            # One scan of the whole chunk rules most chunks out: a match that
+            # only exists across a line break sends it to the line by line pass
+            if pattern.search("\n".join(lines)) is not None:
+                changed = []
+                for offset, text in enumerate(lines):
+                    if chunk_start + offset == first_line and first_char:
+                        new, replaced = _substitute_from(
+                            pattern, replacement, regex, text, first_char
+                        )
+                    else:
+                        new, replaced = pattern.subn(template, text)
+                    if replaced:
+                        changed.append(offset)
+                        lines[offset] = new
+                        count += replaced
+                runs += _runs(chunk_start, lines, changed)
+            chunk_start += len(lines)
+        if runs:
+            editor.replace_lines(runs)
+    return count
+
+
+def _substitute_from(
+    pattern: re.Pattern, replacement: str, regex: bool, text: str, position: int
+) -> Tuple[str, int]:
+    pieces = [text[:position]]
+    count = 0
+    for match in pattern.finditer(text, position):
+        pieces.append(text[position : match.start()])
+        pieces.append(expand(match, replacement, regex))
+        position = match.end()
+        count += 1
+    pieces.append(text[position:])
+    return "".join(pieces), count
+
+
+def _runs(
+    chunk_start: int, lines: List[str], changed: List[int]
+) -> List[Tuple[int, int, List[str]]]:
+    """Runs of changed lines in a chunk, joined over short gaps"""
+    runs = []
+    run_start = run_stop = None
+    for offset in changed:
+        if run_start is not None and offset - run_stop < MERGE_GAP:
+            run_stop = offset + 1
+            continue
+        if run_start is not None:
+            runs.append((run_start, run_stop))
+        run_start, run_stop = offset, offset + 1
+    if run_start is not None:
+        runs.append((run_start, run_stop))
+    return [
+        (chunk_start + start, chunk_start + stop, lines[start:stop])
+        for start, stop in runs
+    ]
+
+
+class Replacer:
+    """Replace-with-confirmation state driven by the command mode.
+
+    Started on the last search, it first prompts for the replacement text,
+    then walks the matches from the cursor to the end of the document: each
+    one is replaced or skipped on request, or it and every later one are
+    replaced at once. Every replacement is its own undo step, except the ones
+    made at once, which are a single one. As with replace_all, matches never
+    span lines: those the search finds across a line break are passed over."""
+
+    def __init__(self, editor: Editor, index: SearchIndex | None = None):
+        self.__editor = editor
+        self.__owns_index = index is None
+        self.__index = SearchIndex(editor) if index is None else index
+        self.__query = ""
+        self.__regex = False
+        self.__pattern: re.Pattern | None = None
+        self.__replacement = ""
+        self.__prompting = False
+        self.__match: Match | None = None
+        self.__replaced = 0
+        self.__summary: str | None = None
+
+    @property
+    def is_prompting(self) -> bool:
+        """Typing the replacement text"""
+        return self.__prompting
+
+    @property
+    def is_confirming(self) -> bool:
+        """Stopped on a match, waiting to be told what to do with it"""
+        return self.__match is not None
+
+    @property
+    def is_active(self) -> bool:
+        return self.is_prompting or self.is_confirming
+
+    @property
+    def summary(self) -> str | None:
+        """Outcome of the last replace, once it is over"""
+        return self.__summary
+
+    @property
+    def prompt(self) -> str:
+        if self.__prompting:
+            return f"Replace {self.__query} with: {self.__replacement}"
+        return (
+            f"Replace {self.__query} with {self.__replacement}? "
+            "(y)es (n)o (a)ll (q)uit"
+        )
+
+    def close(self):
+        if self.__owns_index:
+            self.__index.close()
+
+    def start(self, query: str, regex: bool = False):
+        self.__summary = None
+        if not query:
+            self.__summary = "Search for something to replace first"
+            return
+        try:
+            self.__pattern = compile_pattern(query, regex)
+        except re.error:
+            self.__summary = "Invalid pattern"
+            return
+        self.__query = query
+        self.__regex = regex
+        self.__replacement = ""
+        self.__replaced = 0
+        self.__prompting = True
+
+    def type(self, characters: str):
+        self.__replacement += characters
+
+    def backspace(self):
+        self.__replacement = self.__replacement[:-1]
+
+    def confirm(self):
+        """Take the replacement typed so far and go to the first match"""
+        self.__prompting = False
+        editor = self.__editor
+        self.__find(editor.cursor["line"], editor.cursor["char"])
+
+    def replace(self):
+        line, char, _ = self.__match
+        text = self.__editor.buffer.line(line)
+        match = self.__pattern.match(text, char)
+        if match is None:
+            # The line changed since the match was found
+            self.__find(line, char)
+            return
+        length = match.end() - char
+        new = expand(match, self.__replacement, self.__regex)
+        self.__editor.replace_lines(
+            [(line, line + 1, [text[:char] + new + text[char + length :]])]
+        )
+        self.__replaced += 1
+        breaks = new.count("\n")
+        if breaks:
+            line, char = line + breaks, len(new) - new.rfind("\n") - 1
+        else:
+            char += len(new)
+        # An empty match must not be found again at the same spot
+        self.__find(line, char + (1 if length == 0 else 0))
+
+    def skip(self):
+        line, char, length = self.__match
+        self.__find(line, char + max(length, 1))
+
+    def replace_rest(self):
+        line, char, _ = self.__match
+        self.__replaced += replace_all(
+            self.__editor, self.__query, self.__replacement, self.__regex, (line, char)
+        )
+        self.__finish()
+
+    def cancel(self):
+        self.__prompting = False
+        self.__finish()
+
+    def __find(self, line: int, char: int):
+        while True:
+            match = self.__index.find(self.__query, line, char, regex=self.__regex)
+            if match is None or match[:2] < (line, char):
+                # Past the end of the document: searching wrapped around
+                self.__finish()
+                return
+            line, char, length = match
+            # The search sees lines joined by line breaks; only what matches
+            # within the line itself is replaced
+            found = self.__pattern.match(self.__editor.buffer.line(line), char)
+            if found is not None:
+                break
+            char += max(length, 1)
+        self.__match = (line, char, found.end() - char)
+        self.__editor.move_to(line, char)
+
+    def __finish(self):
+        self.__match = None
+        self.__summary = f"{self.__replaced} replaced"
+
+
+def replace_file(path: str, query: str, replacement: str, regex: bool = False) -> int:
+    """Replace every match in a file, saving it through Editor.save if any
+    was found. Returns how many were replaced."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File '{path}' not found")
+    # Saved as soon as it is changed, like a batch edit: nothing to journal
+    editor = Editor(journaled=False).from_file(path)
+    if editor is None:
+        raise PermissionError(f"Permission denied to access file '{path}'")
+    try:
+        count = replace_all(editor, query, replacement, regex)
+        if count and not editor.save():
+            raise OSError(f"Could not save '{path}'")
+        return count
+    finally:
+        editor.exit()
+
+
+def replace_in_files(
+    paths: Iterable[str],
+    query: str,
+    replacement: str,
+    regex: bool = False,
+    workers: int | None = None,
+) -> Iterator[Tuple[str, int | str]]:
+    """Replace every match in every file, in parallel worker processes unless
+    workers is 1. Yields each path with how many matches were replaced in it,
+    or the error that stopped it, in order as the files are done."""
+    # A bad pattern is reported once, here, rather than by every file
+    compile_pattern(query, regex)
+    paths = list(paths)
+    if workers == 1:
+        _init_worker(query, replacement, regex)
+        for path in paths:
+            yield path, _replace_file_safely(path)
+        return
+    # Imported here, as the editor imports this module for Replacer
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(query, replacement, regex),
+    ) as executor:
+        results = executor.map(_replace_file_safely, paths, chunksize=CHUNK_FILES)
+        yield from zip(paths, results)
+
+
+# The pattern is sent to each worker once instead of with every file
+_worker_replace: Tuple[str, str, bool] = ("", "", False)
+
+
+def _init_worker(query: str, replacement: str, regex: bool):
+    global _worker_replace
+    _worker_replace = (query, replacement, regex)
+
+
+def _replace_file_safely(path: str) -> int | str:
+    try:
+        return replace_file(path, *_worker_replace)
+    except Exception as e:
+        return str(e) or type(e).__name__
@@ -0,0 +1,270 @@
+from __future__ import annotations
+import re
+from typing import List, Tuple
+from src.editor import Editor
+
+BLOCK_LINES = 1024
+
+# (line, char, length)
+Match = Tuple[int, int, int]
+
+
+class _Block:
+    __slots__ = ("count", "text")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.text: str | None = None
+
+
+class SearchIndex:
+    """Document split into blocks of lines whose joined text is cached.
+
+    Searching runs str.find or a compiled regex over whole blocks instead of
+    looping over lines in Python. Edits reported by the editor only drop the
+    cache of the blocks they touch, so repeated queries never rescan
+    unchanged text from the buffer."""
+
+    def __init__(self, editor: Editor):
+        self.__editor = editor
+        self.__blocks: List[_Block] | None = None
+        self.__last_block = (0, 0)
+        editor.add_listener(self.invalidate)
+
+    def close(self):
+        """Stop following the editor's edits"""
+        self.__editor.remove_listener(self.invalidate)
+
+    def invalidate(self, start: int, removed: int, inserted: int):
+        blocks = self.__blocks
+        if blocks is None:
+            return
+        position, block_start = self.__locate(start)
+        self.__last_block = (position, block_start)
+        block = blocks[position]
+        block.text = None
+        remaining = removed
+        taken = min(remaining, block.count - (start - block_start))
+        block.count -= taken
+        remaining -= taken
+        following = position + 1
+        while remaining and following < len(blocks):
+            taken = min(remaining, blocks[following].count)
+            blocks[following].count -= taken
+            blocks[following].text = None
+            remaining -= taken
+            following += 1
+        block.count += inserted
+        if block.count > 2 * BLOCK_LINES or any(
+            blocks[i].count == 0 for i in range(position, following)
+        ):
+            self.__rebalance(position, following)
+
+    def find(
+        self, query: str, line: int, char: int, backward=False, regex=False
+    ) -> Match | None:
+        """First match at or after line:char, or the last one before it when
+        searching backward, wrapping around the end of the document"""
+        if not query:
+            return None
+        try:
+            pattern = re.compile(query if regex else re.escape(query), re.MULTILINE)
+        except re.error:
+            return None
+        blocks = self.__ensure_blocks()
+        position, block_start = self.__locate(line)
+        offset = self.__offset_of(position, block_start, line, char)
+        text = self.__text(position, block_start)
+        found = self.__search(pattern, text, offset, backward)
+        if found is not None:
+            return self.__to_match(block_start, text, *found)
+
+        starts = self.__block_starts()
+        step = -1 if backward else 1
+        for distance in range(1, len(blocks)):
+            index = (position + step * distance) % len(blocks)
+            other_text = self.__text(index, starts[index])
+            found = self.__search(pattern, other_text, None, backward)
+            if found is not None:
+                return self.__to_match(starts[index], other_text, *found)
+
+        # Wrapped all the way round, back to the other side of line:char
+        found = self.__search(pattern, text, offset, backward, wrapped=True)
+        if found is not None:
+            return self.__to_match(block_start, text, *found)
+        return None
+
+    def __search(
+        self, pattern: re.Pattern, text: str, offset, backward: bool, wrapped=False
+    ) -> Tuple[int, int] | None:
+        """Forward: first match starting at or after offset (before it if wrapped).
+        Backward: last match starting before offset (at or after it if wrapped)."""
+        if not backward:
+            match = pattern.search(text, 0 if wrapped or offset is None else offset)
+            if match is None or (wrapped and match.start() >= offset):
+                return None
+            return match.start(), match.end()
+        last = None
+        for match in pattern.finditer(text, offset if wrapped else 0):
+            if not wrapped and offset is not None and match.start() >= offset:
+                break
+            last = match
+        return None if last is None else (last.start(), last.end())
+
+    def __to_match(self, block_start: int, text: str, start: int, end: int) -> Match:
+        line = block_start + text.count("\n", 0, start)
+        line_start = text.rfind("\n", 0, start) + 1
+        return line, start - line_start, end - start
+
+    def __offset_of(self, position: int, block_start: int, line: int, char: int):
+        text = self.__text(position, block_start)
+        offset = 0
+        for _ in range(line - block_start):
+            offset = text.index("\n", offset) + 1
+        return offset + char
+
+    def __text(self, position: int, block_start: int) -> str:
+        block = self.__blocks[position]
+        if block.text is None:
+            lines = self.__editor.buffer.lines(block_start, block_start + block.count)
+            block.text = "\n".join(lines)
+        return block.text
+
+    def __ensure_blocks(self) -> List[_Block]:
+        if self.__blocks is None:
+            line_count = len(self.__editor.buffer)
+            self.__blocks = [
+                _Block(min(BLOCK_LINES, line_count - start))
+                for start in range(0, line_count, BLOCK_LINES)
+            ] or [_Block(0)]
+            self.__last_block = (0, 0)
+        return self.__blocks
+
+    def __block_starts(self) -> List[int]:
+        starts = []
+        line = 0
+        for block in self.__blocks:
+            starts.append(line)
+            line += block.count
+        return starts
+
+    def __locate(self, line: int) -> Tuple[int, int]:
+        blocks = self.__blocks
+        position, block_start = self.__last_block
+        if position >= len(blocks) or block_start > line:
+            position, block_start = 0, 0
+        while (
+            position < len(blocks) - 1 and line >= block_start + blocks[position].count
+        ):
+            block_start += blocks[position].count
+            position += 1
+        self.__last_block = (position, block_start)
+        return position, block_start
+
+    def __rebalance(self, start: int, stop: int):
+        line_count = sum(block.count for block in self.__blocks[start:stop])
+        replacement = [
+            _Block(min(BLOCK_LINES, line_count - offset))
+            for offset in range(0, line_count, BLOCK_LINES)
+        ]
+        self.__blocks[start:stop] = replacement
+        if not self.__blocks:
+            self.__blocks.append(_Block(0))
+        self.__last_block = (0, 0)
+
+
+class Finder:
+    """Search-as-you-type state driven by the command mode.
+
+    While prompting, every change to the query jumps to the first match from
+    where the search started; confirming keeps the cursor there and cancelling
+    puts it back."""
+
+    def __init__(self, editor: Editor, index: SearchIndex | None = None):
+        self.__editor = editor
+        self.__owns_index = index is None
+        self.__index = SearchIndex(editor) if index is None else index
+        self.__query = ""
+        self.__backward = False
+        self.__regex = False
+        self.__origin: Tuple[int, int] | None = None
+        self.__match: Match | None = None
+
+    @property
+    def is_prompting(self) -> bool:
+        return self.__origin is not None
+
+    @property
+    def query(self) -> str:
+        return self.__query
+
+    @property
+    def regex(self) -> bool:
+        return self.__regex
+
+    @property
+    def match(self) -> Match | None:
+        return self.__match
+
+    @property
+    def prompt(self) -> str:
+        prefix = "?" if self.__backward else "/"
+        suffix = "" if self.__match is not None or not self.__query else "  [no match]"
+        return f"{prefix}{'(regex) ' if self.__regex else ''}{self.__query}{suffix}"
+
+    def close(self):
+        if self.__owns_index:
+            self.__index.close()
+
+    def start(self, backward=False):
+        self.__origin = (self.__editor.cursor["line"], self.__editor.cursor["char"])
+        self.__backward = backward
+        self.__query = ""
+        self.__match = None
+
+    def type(self, characters: str):
+        self.__query += characters
+        self.__search_from_origin()
+
+    def backspace(self):
+        self.__query = self.__query[:-1]
+        self.__search_from_origin()
+
+    def toggle_regex(self):
+        self.__regex = not self.__regex
+        self.__search_from_origin()
+
+    def confirm(self):
+        self.__origin = None
+
+    def cancel(self):
+        if self.__origin is not None:
+            self.__editor.move_to(*self.__origin)
+        self.__origin = None
+        self.__match = None
+
+    def next(self):
+        self.__jump(self.__backward)
+
+    def previous(self):
+        self.__jump(not self.__backward)
+
+    def __jump(self, backward: bool):
+        line, char = self.__editor.cursor["line"], self.__editor.cursor["char"]
+        start = char if backward else char + 1
+        match = self.__index.find(self.__query, line, start, backward, self.__regex)
+        self.__go_to(match)
+
+    def __search_from_origin(self):
+        line, char = self.__origin
+        match = self.__index.find(
+            self.__query, line, char, self.__backward, self.__regex
+        )
+        if match is None:
+            self.__editor.move_to(line, char)
+        self.__go_to(match)
+
+    def __go_to(self, match: Match | None):
+        self.__match = match
+        if match is not None:
+            self.__editor.move_to(match[0], match[1])
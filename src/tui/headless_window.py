@@ -0,0 +1,92 @@
+from collections import deque
+from typing import Iterable, List
+from src.interfaces.keys import NO_KEY
+
+
+class EndOfInput(Exception):
+    """Raised by a blocking getch once every fed key has been read"""
+
+
+class NullLogger:
+    """FileLogger stand-in that drops every message"""
+
+    def log_debug(self, message: str, *args, category: str | None = None):
+        pass
+
+
+class HeadlessWindow:
+    """Curses window stand-in that records the screen and counts the work sent to it"""
+
+    def __init__(self, height: int = 24, width: int = 80):
+        self.height = height
+        self.width = width
+        self.calls = 0
+        self.bytes = 0
+        self.rows: List[str] = [""] * height
+        self.cursor = (0, 0)
+        self.keys = deque()
+        self.no_delay = False
+        self.refreshes = 0
+        # Milliseconds of every getch timeout set
+        self.waits: List[int] = []
+
+    def feed(self, keys: Iterable[int]):
+        self.keys.extend(keys)
+
+    def getch(self) -> int:
+        if self.keys:
+            return self.keys.popleft()
+        if self.no_delay:
+            return NO_KEY
+        raise EndOfInput
+
+    def nodelay(self, flag: bool):
+        self.no_delay = flag
+
+    def timeout(self, delay: int):
+        # There is nothing to wait for: any timeout returns straight away
+        self.no_delay = delay >= 0
+        if delay > 0:
+            self.waits.append(delay)
+
+    def reset_counters(self):
+        self.calls = 0
+        self.bytes = 0
+        self.refreshes = 0
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def move(self, row: int, column: int):
+        self.calls += 1
+        self.cursor = (row, column)
+
+    def clear(self):
+        self.calls += 1
+        self.rows = [""] * self.height
+
+    def clrtoeol(self):
+        self.calls += 1
+        self.rows[self.cursor[0]] = self.rows[self.cursor[0]][: self.cursor[1]]
+
+    def addstr(self, *args):
+        self.calls += 1
+        text = args[2] if isinstance(args[0], int) else args[0]
+        self.bytes += len(text.encode())
+        for row, line in enumerate(text.split("\n")[: self.height]):
+            self.rows[row] = line[: self.width]
+
+    def addnstr(self, row: int, column: int, text: str, count: int, attribute=0):
+        self.calls += 1
+        text = text[:count]
+        self.bytes += len(text.encode())
+        # Written over what the row showed, as curses does
+        shown = self.rows[row][:column].ljust(column)
+        self.rows[row] = shown + text + self.rows[row][column + len(text) :]
+
+    def refresh(self):
+        self.calls += 1
+        self.refreshes += 1
+
+    def keypad(self, flag: bool):
+        pass
@@ -0,0 +1,177 @@
+from __future__ import annotations
+import configparser
+from typing import Callable, Dict
+from src.interfaces.keys import Key
+
+TYPING = "typing"
+COMMAND = "command"
+SEARCH = "search"
+REPLACE = "replace"
+CONFIRM = "confirm"
+PAGER = "pager"
+
+DEFAULT_BINDINGS: Dict[str, Dict[str, str]] = {
+    TYPING: {
+        "esc": "switch_mode",
+        "left": "cursor_left",
+        "right": "cursor_right",
+        "up": "cursor_up",
+        "down": "cursor_down",
+        "page_up": "page_up",
+        "page_down": "page_down",
+        "backspace": "delete",
+        "enter": "add_line",
+    },
+    COMMAND: {
+        "esc": "quit",
+        "left": "cursor_left",
+        "right": "cursor_right",
+        "up": "cursor_up",
+        "down": "cursor_down",
+        "page_up": "page_up",
+        "page_down": "page_down",
+        "ctrl-b": "page_up",
+        "ctrl-f": "page_down",
+        "g": "start_of_file",
+        "G": "go_to_line",
+        "%": "go_to_percent",
+        "w": "word_right",
+        "b": "word_left",
+        "a": "switch_mode",
+        "s": "save",
+        "x": "cut",
+        "p": "paste",
+        "y": "copy_lines",
+        "m": "set_mark",
+        "Y": "copy_range",
+        "D": "cut_range",
+        "c": "add_cursors",
+        "K": "clear_cursors",
+        '"': "select_register",
+        "]": "next_buffer",
+        "[": "previous_buffer",
+        "B": "list_buffers",
+        "C": "close_buffer",
+        "u": "undo",
+        "r": "redo",
+        "/": "search_forward",
+        "?": "search_backward",
+        "n": "search_next",
+        "N": "search_previous",
+        "R": "replace",
+    },
+    SEARCH: {
+        "esc": "cancel",
+        "enter": "confirm",
+        "backspace": "backspace",
+        "tab": "toggle_regex",
+    },
+    REPLACE: {
+        "esc": "cancel",
+        "enter": "confirm",
+        "backspace": "backspace",
+    },
+    CONFIRM: {
+        "y": "replace_match",
+        "n": "skip_match",
+        "a": "replace_rest",
+        "q": "cancel",
+        "esc": "cancel",
+    },
+    PAGER: {
+        "q": "quit",
+        "esc": "quit",
+        "up": "line_up",
+        "k": "line_up",
+        "down": "line_down",
+        "j": "line_down",
+        "enter": "line_down",
+        "page_up": "page_up",
+        "b": "page_up",
+        "ctrl-b": "page_up",
+        "page_down": "page_down",
+        " ": "page_down",
+        "ctrl-f": "page_down",
+        "g": "start_of_file",
+        "G": "go_to_line",
+        "%": "go_to_percent",
+        "o": "go_to_offset",
+        "F": "follow",
+    },
+}
+
+ACTIONS = {
+    mode: set(bindings.values()) for mode, bindings in DEFAULT_BINDINGS.items()
+}
+
+# Keys that insert their character when they are not bound to an action: the
+# bytes outside the C0 and C1 control ranges. getch returns codes of 256 and
+# up only for curses function keys, which are never text, so unlike the
+# printable-character regex this replaced, an unbound one such as F5 or a
+# resize is ignored instead of typed as chr(key).
+PRINTABLE = bytes(0 if key <= 0x1F or 0x7F <= key <= 0x9F else 1 for key in range(256))
+
+
+def is_printable(key: int) -> bool:
+    return 0 <= key < len(PRINTABLE) and PRINTABLE[key] == 1
+
+
+def parse_key(name: str) -> int:
+    """Key code for a binding name: a single character, a Key name such as
+    "enter", "ctrl-<character>" or a raw key code"""
+    if len(name) == 1:
+        return ord(name)
+    lowered = name.lower()
+    if lowered.upper() in Key.__members__:
+        return Key[lowered.upper()].value
+    if lowered.startswith("ctrl-") and len(name) == 6:
+        return ord(name[5].upper()) & 0x1F
+    if lowered.isdigit():
+        return int(lowered)
+    raise ValueError(f"Unknown key '{name}'")
+
+
+class Keymap:
+    """Key bindings of every mode, as key code to action name tables"""
+
+    def __init__(self, bindings: Dict[str, Dict[str, str]] = DEFAULT_BINDINGS):
+        self.__tables: Dict[str, Dict[int, str]] = {}
+        for mode, mode_bindings in bindings.items():
+            if mode not in ACTIONS:
+                raise ValueError(f"Unknown mode '{mode}'")
+            table = self.__tables.setdefault(mode, {})
+            for key_name, action in mode_bindings.items():
+                if action not in ACTIONS[mode]:
+                    raise ValueError(f"Unknown action '{action}' in {mode} mode")
+                table[parse_key(key_name)] = action
+
+    @classmethod
+    def from_file(cls, path: str) -> Keymap:
+        """Default bindings overridden by an INI file with one section per mode:
+
+        [command]
+        ctrl-z = undo
+        """
+        parser = configparser.ConfigParser(interpolation=None)
+        # Bindings are case sensitive: "n" and "N" are different keys
+        parser.optionxform = str
+        with open(path, "r") as file:
+            parser.read_file(file)
+        bindings = {mode: dict(table) for mode, table in DEFAULT_BINDINGS.items()}
+        for mode in parser.sections():
+            bindings.setdefault(mode, {}).update(parser[mode])
+        return cls(bindings)
+
+    def table(self, mode: str) -> Dict[int, str]:
+        return dict(self.__tables.get(mode, {}))
+
+    def compile(
+        self, mode: str, actions: Dict[str, Callable[[], None]]
+    ) -> Dict[int, Callable[[], None]]:
+        """Key code to callable dispatch table for the given mode, leaving out
+        actions the caller cannot perform"""
+        return {
+            key: actions[action]
+            for key, action in self.__tables.get(mode, {}).items()
+            if action in actions
+        }
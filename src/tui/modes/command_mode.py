@@ -1,30 +1,234 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable
+from src.buffer_manager import BufferManager
 from src.editor import Editor
-from src.interfaces.keys import Key
-from src.interfaces.mode import Mode
+from src.interfaces.mode import Mode, default_page_rows
+from src.registers import NAMES
+from src.replace import Replacer
+from src.search import Finder
+from src.tui.keymap import COMMAND, CONFIRM, REPLACE, SEARCH, Keymap
+
+
+def _quit():
+    raise StopIteration
 
 
 @dataclass(frozen=True)
 class TextUserInterfaceCommandMode(Mode):
     editor: Editor
     is_active: bool = True
+    finder: Finder | None = None
+    keymap: Keymap = field(default_factory=Keymap, repr=False, compare=False)
+    page_rows: Callable[[], int] = field(
+        default=default_page_rows, repr=False, compare=False
+    )
+    buffers: BufferManager | None = field(default=None, repr=False, compare=False)
+    # Moves the cursor by screen rows instead of lines, when lines are wrapped
+    move_rows: Callable[[int], None] | None = field(
+        default=None, repr=False, compare=False
+    )
+    replacer: Replacer | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Digits typed before a command, as in "120G", and the register named
+        # before it, as in '"ay'
+        object.__setattr__(self, "_count", None)
+        object.__setattr__(self, "_register", None)
+        object.__setattr__(self, "_naming_register", False)
+        object.__setattr__(self, "_mark", None)
+        object.__setattr__(self, "_message", None)
+        actions = {
+            "quit": _quit,
+            "cursor_left": self.editor.cursor_left,
+            "cursor_right": self.editor.cursor_right,
+            "cursor_up": self.editor.cursor_up,
+            "cursor_down": self.editor.cursor_down,
+            "page_up": lambda: self.editor.cursor_page_up(self.page_rows()),
+            "page_down": lambda: self.editor.cursor_page_down(self.page_rows()),
+            "start_of_file": self.editor.cursor_start_of_file,
+            "go_to_line": self.__go_to_line,
+            "go_to_percent": self.__go_to_percent,
+            "word_right": self.editor.cursor_word_right,
+            "word_left": self.editor.cursor_word_left,
+            "switch_mode": self.deactivate,
+            "save": self.editor.save,
+            "cut": self.__cut,
+            "paste": lambda: self.editor.paste(self._register),
+            "copy_lines": self.__copy_lines,
+            "set_mark": self.__set_mark,
+            "copy_range": lambda: self.__with_mark(self.editor.copy_range),
+            "cut_range": lambda: self.__with_mark(self.editor.cut_range),
+            "select_register": self.__select_register,
+            "add_cursors": lambda: self.editor.add_cursors_below(self._count or 1),
+            "clear_cursors": self.editor.clear_cursors,
+            "undo": self.editor.undo,
+            "redo": self.editor.redo,
+        }
+        if self.move_rows is not None:
+            actions.update(
+                {
+                    "cursor_up": lambda: self.move_rows(-1),
+                    "cursor_down": lambda: self.move_rows(1),
+                    "page_up": lambda: self.move_rows(-self.page_rows()),
+                    "page_down": lambda: self.move_rows(self.page_rows()),
+                }
+            )
+        if self.buffers is not None:
+            actions.update(
+                {
+                    "next_buffer": lambda: self.__switch_buffer(self.buffers.next),
+                    "previous_buffer": lambda: self.__switch_buffer(
+                        self.buffers.previous
+                    ),
+                    "list_buffers": self.__list_buffers,
+                    "close_buffer": self.__close_buffer,
+                }
+            )
+        search_actions = {}
+        if self.finder is not None:
+            actions.update(
+                {
+                    "search_forward": self.finder.start,
+                    "search_backward": lambda: self.finder.start(backward=True),
+                    "search_next": self.finder.next,
+                    "search_previous": self.finder.previous,
+                }
+            )
+            search_actions = {
+                "cancel": self.finder.cancel,
+                "confirm": self.finder.confirm,
+                "backspace": self.finder.backspace,
+                "toggle_regex": self.finder.toggle_regex,
+            }
+        replace_actions, confirm_actions = {}, {}
+        if self.finder is not None and self.replacer is not None:
+            actions["replace"] = self.__start_replace
+            replace_actions = {
+                "cancel": self.replacer.cancel,
+                "confirm": self.replacer.confirm,
+                "backspace": self.replacer.backspace,
+            }
+            confirm_actions = {
+                "replace_match": self.replacer.replace,
+                "skip_match": self.replacer.skip,
+                "replace_rest": self.replacer.replace_rest,
+                "cancel": self.replacer.cancel,
+            }
+        object.__setattr__(self, "_actions", self.keymap.compile(COMMAND, actions))
+        object.__setattr__(
+            self, "_search_actions", self.keymap.compile(SEARCH, search_actions)
+        )
+        object.__setattr__(
+            self, "_replace_actions", self.keymap.compile(REPLACE, replace_actions)
+        )
+        object.__setattr__(
+            self, "_confirm_actions", self.keymap.compile(CONFIRM, confirm_actions)
+        )
+
+    def message(self) -> str | None:
+        return self._message
 
     def key_action(self, key: int):
-        if key == Key.ESC.value:
+        object.__setattr__(self, "_message", None)
+        if self.finder is not None and self.finder.is_prompting:
+            self.__search_prompt_action(key)
+            return
+        if self.replacer is not None and self.replacer.is_active:
+            self.__replace_action(key)
+            return
+        if self._naming_register:
+            object.__setattr__(self, "_naming_register", False)
+            if 0 <= key < 0x110000 and chr(key) in NAMES:
+                object.__setattr__(self, "_register", chr(key))
+                return
+        action = self._actions.get(key)
+        if action is not None:
+            action()
+            if not self._naming_register:
+                self.__reset_prefix()
+        elif ord("0") <= key <= ord("9") and (self._count or key != ord("0")):
+            object.__setattr__(self, "_count", (self._count or 0) * 10 + key - ord("0"))
+        else:
+            self.__reset_prefix()
+
+    def __reset_prefix(self):
+        object.__setattr__(self, "_count", None)
+        object.__setattr__(self, "_register", None)
+
+    def __select_register(self):
+        object.__setattr__(self, "_naming_register", True)
+
+    def __cut(self):
+        if self._count is None:
+            self.editor.cut(self._register)
+        else:
+            line = self.editor.cursor["line"]
+            self.editor.cut_lines(line, line + self._count, self._register)
+
+    def __copy_lines(self):
+        line = self.editor.cursor["line"]
+        self.editor.copy_lines(line, line + (self._count or 1), self._register)
+
+    def __set_mark(self):
+        object.__setattr__(
+            self, "_mark", (self.editor.cursor["line"], self.editor.cursor["char"])
+        )
+
+    def __with_mark(self, action: Callable):
+        if self._mark is not None:
+            cursor = (self.editor.cursor["line"], self.editor.cursor["char"])
+            action(self._mark, cursor, self._register)
+
+    def __switch_buffer(self, switch: Callable):
+        # The interface rebinds to the new editor once this mode stops
+        if switch() is not self.editor:
+            self.deactivate()
+
+    def __list_buffers(self):
+        if self._count is None:
+            object.__setattr__(self, "_message", self.buffers.describe())
+        elif 1 <= self._count <= len(self.buffers):
+            self.__switch_buffer(lambda: self.buffers.switch(self._count - 1))
+
+    def __close_buffer(self):
+        if not self.buffers.close():
             raise StopIteration
-        if key == Key.LEFT.value:
-            self.editor.cursor_left()
-        elif key == Key.RIGHT.value:
-            self.editor.cursor_right()
-        elif key == Key.UP.value:
-            self.editor.cursor_up()
-        elif key == Key.DOWN.value:
-            self.editor.cursor_down()
-        if key == ord("a"):
-            object.__setattr__(self, "is_active", False)
-        if key == ord("s"):
-            self.editor.save()
-        if key == ord("x"):
-            self.editor.cut()
-        if key == ord("p"):
-            self.editor.paste()
+        self.deactivate()
+
+    def __go_to_line(self):
+        if self._count is None:
+            self.editor.cursor_end_of_file()
+        else:
+            self.editor.move_to(self._count - 1, 0)
+
+    def __go_to_percent(self):
+        if self._count is not None:
+            percent = min(self._count, 100)
+            self.editor.move_to_offset(self.editor.offsets.total() * percent // 100)
+
+    def __search_prompt_action(self, key: int):
+        action = self._search_actions.get(key)
+        if action is not None:
+            action()
+        elif 0 <= key < 0x110000 and chr(key).isprintable():
+            self.finder.type(chr(key))
+
+    def __start_replace(self):
+        self.replacer.start(self.finder.query, self.finder.regex)
+        if not self.replacer.is_active:
+            object.__setattr__(self, "_message", self.replacer.summary)
+
+    def __replace_action(self, key: int):
+        replacer = self.replacer
+        if replacer.is_prompting:
+            action = self._replace_actions.get(key)
+            if action is not None:
+                action()
+            elif 0 <= key < 0x110000 and chr(key).isprintable():
+                replacer.type(chr(key))
+        else:
+            action = self._confirm_actions.get(key)
+            if action is not None:
+                action()
+        if not replacer.is_active:
+            object.__setattr__(self, "_message", replacer.summary)
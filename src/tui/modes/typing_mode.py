@@ -1,33 +1,69 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable, List
 from src.editor import Editor
-from src.interfaces.keys import Key
-from src.interfaces.mode import Mode
-import re
+from src.interfaces.mode import Mode, default_page_rows
+from src.tui.keymap import TYPING, Keymap, is_printable
 
 
 @dataclass(frozen=True)
 class TextUserInterfaceTypingMode(Mode):
     editor: Editor
     is_active: bool = True
+    keymap: Keymap = field(default_factory=Keymap, repr=False, compare=False)
+    page_rows: Callable[[], int] = field(
+        default=default_page_rows, repr=False, compare=False
+    )
+    # Moves the cursor by screen rows instead of lines, when lines are wrapped
+    move_rows: Callable[[int], None] | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        actions = {
+            "switch_mode": self.deactivate,
+            "cursor_left": self.editor.cursor_left,
+            "cursor_right": self.editor.cursor_right,
+            "cursor_up": self.editor.cursor_up,
+            "cursor_down": self.editor.cursor_down,
+            "page_up": lambda: self.editor.cursor_page_up(self.page_rows()),
+            "page_down": lambda: self.editor.cursor_page_down(self.page_rows()),
+            "delete": self.editor.delete,
+            "add_line": self.editor.add_line,
+        }
+        if self.move_rows is not None:
+            actions.update(
+                {
+                    "cursor_up": lambda: self.move_rows(-1),
+                    "cursor_down": lambda: self.move_rows(1),
+                    "page_up": lambda: self.move_rows(-self.page_rows()),
+                    "page_down": lambda: self.move_rows(self.page_rows()),
+                }
+            )
+        object.__setattr__(self, "_actions", self.keymap.compile(TYPING, actions))
 
     def key_action(self, key: int):
-        if key == Key.ESC.value:
-            object.__setattr__(self, "is_active", False)
-        if key == Key.LEFT.value:
-            self.editor.cursor_left()
-        elif key == Key.RIGHT.value:
-            self.editor.cursor_right()
-        elif key == Key.UP.value:
-            self.editor.cursor_up()
-        elif key == Key.DOWN.value:
-            self.editor.cursor_down()
-        elif key == Key.BACKSPACE.value:
-            self.editor.delete()
-        elif key == Key.ENTER.value:
-            self.editor.add_line()
-        elif self.__is_printable(character := chr(key)):
-            self.editor.append(character)
+        action = self._actions.get(key)
+        if action is not None:
+            action()
+        elif is_printable(key):
+            self.editor.append(chr(key))
+
+    def key_actions(self, keys: List[int]) -> int:
+        count = 0
+        while count < len(keys):
+            run_end = count
+            while run_end < len(keys) and self.__is_text_key(keys[run_end]):
+                run_end += 1
+            if run_end > count:
+                # A run of typed or pasted characters is one editor insertion
+                self.editor.append("".join(map(chr, keys[count:run_end])))
+                count = run_end
+                continue
+            self.key_action(keys[count])
+            count += 1
+            if not self.is_active:
+                break
+        return count
 
-    def __is_printable(self, char):
-        printable_characters = r"[^\x00-\x1F\x7F-\x9F]+"
-        return re.match(printable_characters, char) is not None
+    def __is_text_key(self, key: int) -> bool:
+        return key not in self._actions and is_printable(key)
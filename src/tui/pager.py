@@ -0,0 +1,231 @@
+from __future__ import annotations
+import curses
+from typing import List
+from src.interfaces.keys import NO_KEY
+from src.interfaces.text_interface import TextInterface
+from src.pager import FileStream
+from src.tui.keymap import PAGER, Keymap
+from src.tui.tui import MAX_BATCH_KEYS, close_screen, open_screen
+
+# While following, an idle pager wakes up this often to look for new data
+FOLLOW_POLL_MS = 250
+# Control characters other than tabs would be drawn as ^X, pushing the rest
+# of the line out of place
+_CONTROL_CHARACTERS = str.maketrans(
+    {chr(code): "?" for code in [*range(32), 127] if code != ord("\t")}
+)
+
+
+def _quit():
+    raise StopIteration
+
+
+class Pager(TextInterface):
+    """Read-only interface for looking through a file without loading it,
+    like less.
+
+    The screen shows the lines from the top offset down, read from a
+    FileStream on every frame, and the status line where they are in the
+    file. Digits typed before a command give it a count, as in command mode:
+    "120G" goes to line 120, "50%" half way through and "4096o" to the line
+    at byte 4096. While following, as with tail -f, new data is shown as it
+    is appended. Nothing is ever written."""
+
+    def __init__(
+        self,
+        stream: FileStream,
+        window=None,
+        keymap: Keymap | None = None,
+        follow: bool = False,
+    ):
+        self.__stream = stream
+        self.__owns_screen = window is None
+        self.__window = open_screen() if window is None else window
+        self.__top = 0
+        # Index of the top line, when it is known without counting the lines
+        # above it
+        self.__top_line: int | None = 0
+        self.__count: int | None = None
+        self.__following = False
+        self.__generation = stream.generation
+        actions = {
+            "quit": _quit,
+            "line_up": lambda: self.__scroll_up(self.__count or 1),
+            "line_down": lambda: self.__scroll_down(self.__count or 1),
+            "page_up": lambda: self.__scroll_up(self.__page_rows()),
+            "page_down": lambda: self.__scroll_down(self.__page_rows()),
+            "start_of_file": lambda: self.__go_to(0, 0),
+            "go_to_line": self.__go_to_line,
+            "go_to_percent": self.__go_to_percent,
+            "go_to_offset": self.__go_to_offset,
+            "follow": self.__toggle_follow,
+        }
+        keymap = Keymap() if keymap is None else keymap
+        self.__actions = keymap.compile(PAGER, actions)
+        if follow:
+            self.__toggle_follow()
+        self.__render()
+
+    @property
+    def window(self):
+        return self.__window
+
+    @property
+    def top(self) -> int:
+        """Offset of the line at the top of the screen"""
+        return self.__top
+
+    @property
+    def is_following(self) -> bool:
+        return self.__following
+
+    def close(self):
+        self.__stream.close()
+        if self.__owns_screen:
+            close_screen()
+
+    def handle_input(self):
+        try:
+            keys = self.__read_keys()
+            for key in keys:
+                self.__key_action(key)
+            if self.__stream.refresh():
+                self.__catch_up()
+            self.__render()
+        except Exception as e:
+            self.close()
+            raise e
+
+    def __read_keys(self) -> List[int]:
+        window = self.__window
+        if self.__following:
+            window.timeout(FOLLOW_POLL_MS)
+            try:
+                key = window.getch()
+            finally:
+                window.timeout(-1)
+            if key == NO_KEY:
+                return []
+        else:
+            key = window.getch()
+        keys = [key]
+        window.nodelay(True)
+        try:
+            while len(keys) < MAX_BATCH_KEYS:
+                key = window.getch()
+                if key == NO_KEY:
+                    break
+                keys.append(key)
+        finally:
+            window.nodelay(False)
+        return keys
+
+    def __key_action(self, key: int):
+        action = self.__actions.get(key)
+        if action is not None:
+            action()
+            self.__count = None
+        elif ord("0") <= key <= ord("9") and (self.__count or key != ord("0")):
+            self.__count = (self.__count or 0) * 10 + key - ord("0")
+        else:
+            self.__count = None
+
+    def __text_rows(self) -> int:
+        # The bottom row is the status line
+        return max(self.__window.getmaxyx()[0] - 1, 1)
+
+    def __page_rows(self) -> int:
+        # One row of the previous page stays visible
+        return max(self.__text_rows() - 1, 1)
+
+    def __go_to(self, offset: int, line: int | None = None):
+        self.__top = offset
+        self.__top_line = self.__stream.line_number(offset) if line is None else line
+
+    def __go_to_end(self):
+        self.__go_to(self.__stream.tail_start(self.__text_rows()))
+
+    def __go_to_line(self):
+        if self.__count is None:
+            self.__go_to_end()
+            return
+        offset = self.__stream.line_offset(self.__count - 1)
+        if offset is None:
+            self.__go_to_end()
+        else:
+            self.__go_to(offset, self.__count - 1)
+
+    def __go_to_percent(self):
+        if self.__count is not None:
+            position = self.__stream.size * min(self.__count, 100) // 100
+            self.__go_to(self.__stream.line_start(position))
+
+    def __go_to_offset(self):
+        if self.__count is not None:
+            self.__go_to(self.__stream.line_start(self.__count))
+
+    def __toggle_follow(self):
+        self.__following = not self.__following
+        if self.__following:
+            self.__go_to_end()
+
+    def __scroll_down(self, count: int):
+        rows = self.__text_rows()
+        shown = self.__stream.lines(self.__top, count + rows)
+        # Stop once the last line is at the bottom of the screen
+        steps = min(count, len(shown) - rows)
+        if steps > 0:
+            self.__top = shown[steps][0]
+            if self.__top_line is not None:
+                self.__top_line += steps
+
+    def __scroll_up(self, count: int):
+        self.__following = False
+        for _ in range(count):
+            previous = self.__stream.previous_line_start(self.__top)
+            if previous is None:
+                break
+            self.__top = previous
+            if self.__top_line is not None:
+                self.__top_line -= 1
+
+    def __catch_up(self):
+        stream = self.__stream
+        if self.__following:
+            self.__go_to_end()
+        elif stream.generation != self.__generation:
+            # Truncated or replaced: stay about as far into the file
+            self.__go_to(stream.line_start(min(self.__top, stream.size)))
+        self.__generation = stream.generation
+
+    def __status(self) -> str:
+        stream = self.__stream
+        percent = 100 * self.__top // stream.size if stream.size else 100
+        # Where the screen is comes first, as a long path would cut it off
+        status = f"byte {self.__top}/{stream.size} ({percent}%)"
+        if self.__top_line is not None:
+            status = f"line {self.__top_line + 1}  {status}"
+        if self.__following:
+            status += "  following"
+        return f"{status}  {stream.path}"
+
+    def __render(self):
+        window = self.__window
+        height, width = window.getmaxyx()
+        lines = self.__stream.lines(self.__top, self.__text_rows())
+        for row in range(height - 1):
+            text = lines[row][1] if row < len(lines) else ""
+            self.__draw_row(row, text.translate(_CONTROL_CHARACTERS), width)
+        self.__draw_row(height - 1, self.__status(), width)
+        window.refresh()
+
+    def __draw_row(self, row: int, text: str, width: int):
+        window = self.__window
+        window.move(row, 0)
+        window.clrtoeol()
+        if text:
+            try:
+                window.addnstr(row, 0, text, width)
+            except curses.error:
+                # Writing the bottom-right cell moves the cursor off screen
+                pass
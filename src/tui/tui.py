@@ -1,21 +1,137 @@
 from src.editor import Editor
+from src.file_format import SNIFF_BYTES, sniff
 from src.interfaces.mode import Mode
 from src.logger import FileLogger
+from src.interfaces.keys import NO_KEY
 from src.interfaces.text_interface import TextInterface
 import curses
+import math
 import os
+import time
+from functools import partial
+from itertools import islice
+from typing import Dict, List
 from src.tui.modes.command_mode import TextUserInterfaceCommandMode
 from src.tui.modes.typing_mode import TextUserInterfaceTypingMode
+from src.tui.keymap import Keymap
+from src.tui.viewport import Viewport
+from src.tui.wrap import WrapLayout
+from src.profiling import DECODE, DISPATCH, MUTATION, RENDER, TOTAL, LatencyMonitor
+from src.replace import Replacer
+from src.search import Finder, SearchIndex
+from src.watcher import FileWatcher
+from src.buffer_manager import BufferManager
+from src.highlight.highlighter import MAX_HIGHLIGHT_LINES, Highlighter
+from src.highlight.lexers import lexer_for
+from src.interfaces import lexer
 
 COLOR_AQUAMARINE = 300
+DEFAULT_MAX_FPS = 60
+MAX_BATCH_KEYS = 4096
+# While the highlighter is still working, an idle input loop wakes up this
+# often to paint the lines it finished
+HIGHLIGHT_POLL_MS = 50
+# Likewise while watching the file, to show changes merged from disk
+WATCH_POLL_MS = 500
+TOKEN_COLORS = {
+    lexer.KEYWORD: curses.COLOR_MAGENTA,
+    lexer.STRING: curses.COLOR_GREEN,
+    lexer.COMMENT: curses.COLOR_BLUE,
+    lexer.NUMBER: curses.COLOR_CYAN,
+    lexer.CONSTANT: curses.COLOR_CYAN,
+    lexer.KEY: curses.COLOR_YELLOW,
+    lexer.DECORATOR: curses.COLOR_YELLOW,
+    lexer.TIMESTAMP: curses.COLOR_BLUE,
+    lexer.ERROR: curses.COLOR_RED,
+    lexer.WARNING: curses.COLOR_YELLOW,
+    lexer.INFO: curses.COLOR_GREEN,
+}
+
+# The terminal screen, once curses is started: show_preview can start it
+# before the interface exists, which then takes it over
+_screen = None
+
+
+def open_screen():
+    global _screen
+    if _screen is None:
+        os.environ.setdefault("ESCDELAY", "25")
+        _screen = curses.initscr()
+        _screen.keypad(True)
+        curses.start_color()
+        curses.use_default_colors()
+    return _screen
+
+
+def close_screen():
+    global _screen
+    if _screen is None:
+        return
+    curses.nocbreak()
+    _screen.keypad(False)
+    curses.echo()
+    curses.endwin()
+    _screen = None
+
+
+def show_preview(path: str, window=None):
+    """Paint the first screenful of path straight from the file, on window or
+    else the terminal screen, so there is something to read while the file
+    loads into an editor"""
+    window = open_screen() if window is None else window
+    height, width = window.getmaxyx()
+    try:
+        with open(path, "rb") as file:
+            prefix = file.read(SNIFF_BYTES)
+        file_format = sniff(prefix)
+        text = prefix.removeprefix(file_format.bom)
+        text = text.decode(file_format.encoding, "replace")
+        for row, line in enumerate(islice(text.split("\n"), height - 1)):
+            window.addnstr(row, 0, line.rstrip("\r"), width)
+    except (OSError, curses.error):
+        pass
+    window.refresh()
 
 
 class TextUserInterface(TextInterface):
-    def __init__(self, editor: Editor, logger: FileLogger):
-        self.__editor = editor
+    def __init__(
+        self,
+        editor: Editor,
+        logger: FileLogger,
+        max_fps: float = DEFAULT_MAX_FPS,
+        max_batch_keys: int = MAX_BATCH_KEYS,
+        window=None,
+        keymap: Keymap | None = None,
+        latency: LatencyMonitor | None = None,
+        buffers: BufferManager | None = None,
+        highlight: bool = False,
+        wrap: bool = False,
+        watch: bool = False,
+    ):
         self.__logger = logger
-        self.__active_mode: Mode = TextUserInterfaceTypingMode(editor=editor)
-        self.__init_window()
+        self.__frame_interval = 1 / max_fps
+        self.__rendered_at = 0.0
+        self.__max_batch_keys = max_batch_keys
+        self.__latency = latency
+        self.__decode_ns = 0
+        self.__keymap = Keymap() if keymap is None else keymap
+        self.__buffers = buffers
+        self.__highlight = highlight
+        self.__wrap = wrap
+        self.__watch = watch
+        self.__watcher: FileWatcher | None = None
+        self.__notice: str | None = None
+        self.__highlighter: Highlighter | None = None
+        self.__token_attributes: Dict[str, int] = {}
+        self.__color_pairs: Dict[int, int] = {}
+        self.__editor: Editor | None = None
+        self.__bind(editor if buffers is None else buffers.active)
+        self.__active_mode: Mode = self.__typing_mode
+        self.__curses_initialized = False
+        if window is None:
+            self.__init_window()
+        else:
+            self.__window = window
         self.__update()
 
     @property
@@ -26,46 +142,243 @@ class TextUserInterface(TextInterface):
     def editor(self):
         return self.__editor
 
+    @property
+    def highlighter(self) -> Highlighter | None:
+        return self.__highlighter
+
+    def close(self):
+        """Stop following the editor, which stays usable on its own"""
+        self.__editor.remove_listener(self.__viewport.invalidate)
+        self.__search_index.close()
+        self.__stop_watching()
+        if self.__highlighter is not None:
+            self.__highlighter.close()
+            self.__highlighter = None
+
     def handle_input(self):
         try:
-            key = self.window.getch()
-            self.__active_mode.key_action(key)
-            if not self.__active_mode.is_active:
-                self.switch_modes()
-
-            self.__update(
-                color=COLOR_AQUAMARINE
-                if isinstance(self.__active_mode, TextUserInterfaceCommandMode)
-                else 0
-            )
+            keys = self.__read_keys()
+            if not keys:
+                # Woken up to paint highlighting or merged changes, not by a key
+                self.__update(color=self.__mode_color())
+                return
+            self.__notice = None
+            dispatch_started = time.perf_counter_ns()
+            editor = self.__editor
+            mutation_ns = editor.mutation_ns
+            while keys:
+                consumed = self.__active_mode.key_actions(keys)
+                if not self.__active_mode.is_active:
+                    self.__after_deactivation()
+                keys = keys[consumed:]
+            render_started = time.perf_counter_ns()
+            mutation_ns = editor.mutation_ns - mutation_ns
+
+            self.__update(color=self.__mode_color())
+            if self.__latency is not None:
+                rendered = time.perf_counter_ns()
+                self.__record_latency(
+                    dispatch=render_started - dispatch_started - mutation_ns,
+                    mutation=mutation_ns,
+                    render=rendered - render_started,
+                )
         except Exception as e:
             self.__exit()
             raise e
 
+    def __read_keys(self) -> List[int]:
+        """Wait for a key, then take in the keys that come until a frame has
+        passed since the last render, and those already pending after that (a
+        paste, fast typing), so the batch renders once and at most max_fps
+        times a second"""
+        highlighter = self.__highlighter
+        timeout = -1
+        if highlighter is not None and (highlighter.is_busy or highlighter.has_updates):
+            timeout = HIGHLIGHT_POLL_MS
+        elif self.__watcher is not None:
+            timeout = WATCH_POLL_MS
+        if timeout >= 0:
+            self.window.timeout(timeout)
+            try:
+                key = self.window.getch()
+            finally:
+                self.window.timeout(-1)
+            if key == NO_KEY:
+                return []
+            keys = [key]
+        else:
+            keys = [self.window.getch()]
+        # Waiting for the first key is idle time, decoding starts once it is in;
+        # waiting out the frame is idle time too
+        decode_started = time.perf_counter_ns()
+        waited = 0
+        render_at = self.__rendered_at + self.__frame_interval
+        try:
+            while len(keys) < self.__max_batch_keys:
+                wait_ms = math.ceil((render_at - time.monotonic()) * 1000)
+                if wait_ms > 0:
+                    self.window.timeout(wait_ms)
+                    wait_started = time.perf_counter_ns()
+                    key = self.window.getch()
+                    waited += time.perf_counter_ns() - wait_started
+                else:
+                    self.window.nodelay(True)
+                    key = self.window.getch()
+                if key == NO_KEY:
+                    break
+                keys.append(key)
+        finally:
+            self.window.timeout(-1)
+        self.__decode_ns = time.perf_counter_ns() - decode_started - waited
+        return keys
+
+    def __record_latency(self, dispatch: int, mutation: int, render: int):
+        latency = self.__latency
+        latency.record(DECODE, self.__decode_ns)
+        latency.record(DISPATCH, dispatch)
+        latency.record(MUTATION, mutation)
+        latency.record(RENDER, render)
+        latency.record(TOTAL, self.__decode_ns + dispatch + mutation + render)
+
+    def __page_rows(self) -> int:
+        # One row of the previous page stays visible, the other is the status line
+        return max(self.window.getmaxyx()[0] - 2, 1)
+
+    def __mode_color(self) -> int:
+        if isinstance(self.__active_mode, TextUserInterfaceCommandMode):
+            return COLOR_AQUAMARINE
+        return 0
+
+    def __spans(self, line: int):
+        tokens = self.__highlighter.tokens(line)
+        if tokens is None:
+            return None
+        attributes = self.__token_attributes
+        if not attributes:
+            attributes.update(
+                (kind, self.__color_pair(color + 1))
+                for kind, color in TOKEN_COLORS.items()
+            )
+        return [(start, end, attributes[kind]) for start, end, kind in tokens]
+
     def __update(self, color=0):
-        self.window.clear()
-        self.window.addstr("\n".join(self.editor.text), curses.color_pair(color))
-        self.window.move(self.editor.cursor["line"], self.editor.cursor["char"])
-        self.window.refresh()
+        if self.__watcher is not None:
+            # Shown until the next key
+            self.__notice = self.__watcher.take_notice() or self.__notice
+        status = None
+        if self.__finder.is_prompting:
+            status = self.__finder.prompt
+        elif self.__replacer.is_active:
+            status = self.__replacer.prompt
+        elif self.__active_mode.message() is not None:
+            status = self.__active_mode.message()
+        elif self.__notice is not None:
+            status = self.__notice
+        elif self.__latency is not None and self.__latency.shows_hud:
+            status = self.__latency.hud()
+        attribute = self.__color_pair(color)
+        spans = None
+        if self.__highlighter is not None:
+            self.__repaint_highlighted()
+            spans = self.__spans
+        # The watcher can merge changes into the text from its own thread
+        with self.editor.lock:
+            self.__viewport.render(self.window, self.editor, attribute, status, spans)
+        self.__rendered_at = time.monotonic()
+
+    def __repaint_highlighted(self):
+        """Mark the visible lines the highlighter finished since the last frame"""
+        top = self.__viewport.top
+        bottom = top + self.window.getmaxyx()[0]
+        for start, stop in self.__highlighter.take_updates():
+            start, stop = max(start, top), min(stop, bottom)
+            if start < stop:
+                self.__viewport.invalidate(start, stop - start, stop - start)
 
     def __init_window(self):
-        os.environ.setdefault("ESCDELAY", "25")
-        self.__window = curses.initscr()
-        self.__window.keypad(True)
-        curses.start_color()
-        curses.use_default_colors()
-        for i in range(0, curses.COLORS):
-            curses.init_pair(i + 1, i, -1)
+        self.__window = open_screen()
+        self.__curses_initialized = True
+
+    def __color_pair(self, pair: int) -> int:
+        """Attribute of a color pair, which draws color pair - 1 on the default
+        background. Pairs are set up the first time they are drawn with, not
+        all of them before the first frame."""
+        if not self.__curses_initialized or pair == 0:
+            return 0
+        attribute = self.__color_pairs.get(pair)
+        if attribute is None:
+            if pair - 1 < curses.COLORS and pair < curses.COLOR_PAIRS:
+                curses.init_pair(pair, pair - 1, -1)
+            attribute = self.__color_pairs[pair] = curses.color_pair(pair)
+        return attribute
 
     def __exit(self):
-        curses.nocbreak()
-        self.window.keypad(False)
-        curses.echo()
-        curses.endwin()
+        self.__stop_watching()
+        if self.__highlighter is not None:
+            self.__highlighter.close()
+        if self.__curses_initialized:
+            close_screen()
+
+    def __bind(self, editor: Editor):
+        """Point the viewport, search and modes at another editor"""
+        if self.__editor is not None:
+            self.__editor.remove_listener(self.__viewport.invalidate)
+            self.__search_index.close()
+        self.__stop_watching()
+        if self.__highlighter is not None:
+            self.__highlighter.close()
+            self.__highlighter = None
+        self.__editor = editor
+        self.__viewport = Viewport(WrapLayout() if self.__wrap else None)
+        editor.add_listener(self.__viewport.invalidate)
+        language = lexer_for(editor.file_path) if self.__highlight else None
+        if language is not None and not editor.buffer.has_line(MAX_HIGHLIGHT_LINES):
+            self.__highlighter = Highlighter(editor, language).start()
+        if self.__watch and editor.disk_stamp is not None:
+            self.__watcher = FileWatcher(editor).start()
+        # Searching and replacing share the cached text of the document
+        self.__search_index = SearchIndex(editor)
+        self.__finder = Finder(editor, self.__search_index)
+        self.__replacer = Replacer(editor, self.__search_index)
+        move_rows = None
+        if self.__wrap:
+            move_rows = partial(self.__viewport.layout.move, editor)
+        self.__typing_mode = TextUserInterfaceTypingMode(
+            editor=editor,
+            keymap=self.__keymap,
+            page_rows=self.__page_rows,
+            move_rows=move_rows,
+        )
+        self.__command_mode = TextUserInterfaceCommandMode(
+            editor=editor,
+            finder=self.__finder,
+            keymap=self.__keymap,
+            page_rows=self.__page_rows,
+            buffers=self.__buffers,
+            move_rows=move_rows,
+            replacer=self.__replacer,
+        )
+
+    def __stop_watching(self):
+        if self.__watcher is not None:
+            self.__watcher.stop()
+            self.__watcher = None
+            self.__notice = None
+
+    def __after_deactivation(self):
+        if self.__buffers is not None and self.__buffers.active is not self.__editor:
+            # A buffer command switched files: stay in command mode on the new one
+            self.__editor.history.seal()
+            self.__bind(self.__buffers.active)
+            self.__active_mode = self.__command_mode
+        else:
+            self.switch_modes()
 
     def switch_modes(self):
+        self.__editor.history.seal()
         self.__active_mode = (
-            TextUserInterfaceTypingMode(editor=self.__editor)
-            if isinstance(self.__active_mode, TextUserInterfaceCommandMode)
-            else TextUserInterfaceCommandMode(editor=self.__editor)
+            self.__typing_mode
+            if self.__active_mode is self.__command_mode
+            else self.__command_mode
         )
+        self.__active_mode.activate()
@@ -0,0 +1,265 @@
+import curses
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, List, Set, Tuple
+from src.editor import Editor
+from src.multicursor import Position
+from src.tui.wrap import WrapLayout, row_of
+
+# (start, end, attribute) within one line
+Span = Tuple[int, int, int]
+# Bytes that did not decode are kept in the text as lone surrogates, which
+# cannot be drawn
+_UNDECODED = re.compile("[\udc80-\udcff]")
+
+
+def _draw(window, row: int, column: int, text: str, count: int, attribute: int):
+    try:
+        window.addnstr(row, column, text, count, attribute)
+    except UnicodeEncodeError:
+        # Replaced one for one, so columns stay where they are
+        window.addnstr(row, column, _UNDECODED.sub("\ufffd", text), count, attribute)
+
+
+class Viewport:
+    """Window onto the editor text that only repaints the rows that changed.
+
+    Edits reported through invalidate() mark document lines as dirty; render()
+    scrolls to keep the cursor visible and redraws the dirty rows that fall
+    inside the window, so the cost of a frame depends on the terminal size and
+    not on the document size. Rows can be painted in several colors through
+    spans, which are looked up for the rows being redrawn only.
+
+    Given a WrapLayout, lines wider than the window are wrapped over several
+    rows instead of being cut, and the window can start part way through a
+    line. Which piece of which line every row showed is remembered, so a line
+    that grows or shrinks by a row repaints the rows below it and no others.
+
+    The editor's extra cursors are drawn in reverse video, and the lines one
+    appeared on or left since the last frame are repainted too."""
+
+    def __init__(self, layout: WrapLayout | None = None):
+        self.__top = 0
+        self.__size = (0, 0)
+        self.__attribute = None
+        self.__dirty_lines: Set[int] = set()
+        self.__dirty_from: int | None = None
+        self.__full_redraw = True
+        self.__layout = layout
+        # Row of the top line shown first, and the (line, start) shown on
+        # every row, when wrapping
+        self.__top_row = 0
+        self.__shown: List[Tuple[int, int] | None] = []
+        # Extra cursors drawn on the last frame
+        self.__cursors: Set[Position] = set()
+
+    @property
+    def top(self) -> int:
+        return self.__top
+
+    @property
+    def layout(self) -> WrapLayout | None:
+        return self.__layout
+
+    def invalidate(self, start: int, removed: int, inserted: int):
+        if self.__layout is not None:
+            self.__layout.invalidate(start, removed, inserted)
+        if removed != inserted:
+            # Every line below shifts, so everything from here down is stale
+            if self.__dirty_from is None or start < self.__dirty_from:
+                self.__dirty_from = start
+        else:
+            self.__dirty_lines.update(range(start, start + inserted))
+
+    def invalidate_all(self):
+        self.__full_redraw = True
+
+    def render(
+        self,
+        window,
+        editor: Editor,
+        attribute: int = 0,
+        status: str | None = None,
+        spans: Callable[[int], List[Span] | None] | None = None,
+    ):
+        height, width = window.getmaxyx()
+        if status is not None:
+            # The status line takes the bottom row away from the text
+            height -= 1
+            self.__draw_row(window, height, status, width, attribute)
+        if (height, width) != self.__size or attribute != self.__attribute:
+            self.__size = (height, width)
+            self.__attribute = attribute
+            self.__full_redraw = True
+
+        if self.__layout is None:
+            cursor = self.__render_lines(window, editor, height, width, spans)
+        else:
+            cursor = self.__render_wrapped(window, editor, height, width, spans)
+        self.__dirty_lines.clear()
+        self.__dirty_from = None
+        self.__full_redraw = False
+        row, column = cursor
+        window.move(row, min(column, max(width - 1, 0)))
+        window.refresh()
+
+    def __render_lines(self, window, editor: Editor, height: int, width: int, spans):
+        self.__scroll_to(editor.cursor["line"], height)
+        top = self.__top
+        lines = editor.text[top : top + height]
+        cursors = self.__visible_cursors(editor, top, top + height - 1)
+        for row in range(height):
+            if self.__is_dirty(top + row):
+                text = lines[row] if row < len(lines) else ""
+                self.__draw_row(window, row, text, width, self.__attribute)
+                if spans is not None and text:
+                    end = min(len(text), width)
+                    self.__draw_spans(window, row, text, 0, end, spans(top + row))
+                if top + row in cursors:
+                    chars = cursors[top + row]
+                    self.__draw_cursors(window, row, text, 0, len(text), chars)
+        return editor.cursor["line"] - top, editor.cursor["char"]
+
+    def __render_wrapped(self, window, editor: Editor, height: int, width: int, spans):
+        layout = self.__layout
+        layout.resize(width)
+        cursor_row = self.__scroll_wrapped(editor, height)
+        line, first_row = self.__top, self.__top_row
+        rows = []
+        for text in editor.text[line : line + height]:
+            starts = layout.starts(line, text)
+            for row in range(first_row, len(starts)):
+                end = starts[row + 1] if row + 1 < len(starts) else len(text)
+                rows.append((line, starts[row], end, text))
+            if len(rows) >= height:
+                break
+            line += 1
+            first_row = 0
+
+        last = rows[-1][0] if rows else self.__top
+        cursors = self.__visible_cursors(editor, self.__top, last)
+        shown = []
+        for row in range(height):
+            if row < len(rows):
+                line, start, end, text = rows[row]
+                shown.append((line, start))
+            else:
+                line, start, end, text = -1, 0, 0, ""
+                shown.append(None)
+            moved = row >= len(self.__shown) or self.__shown[row] != shown[row]
+            if moved or self.__is_dirty(line):
+                piece = text[start:end]
+                self.__draw_row(window, row, piece, width, self.__attribute)
+                if spans is not None and piece:
+                    self.__draw_spans(window, row, text, start, end, spans(line))
+                if line in cursors:
+                    self.__draw_cursors(window, row, text, start, end, cursors[line])
+        self.__shown = shown
+
+        line, char = editor.cursor["line"], editor.cursor["char"]
+        starts = layout.starts(line, editor.text[line])
+        return cursor_row, char - starts[row_of(starts, char)]
+
+    def __scroll_to(self, line: int, height: int):
+        if line < self.__top:
+            self.__top = line
+        elif line >= self.__top + height:
+            self.__top = line - height + 1
+        else:
+            return
+        self.__full_redraw = True
+
+    def __scroll_wrapped(self, editor: Editor, height: int) -> int:
+        """Scroll until the cursor row is in the window, by as few rows as
+        possible. Returns the window row the cursor is on."""
+        layout, text = self.__layout, editor.text
+        line, char = editor.cursor["line"], editor.cursor["char"]
+        cursor_row = row_of(layout.starts(line, text[line]), char)
+        if (line, cursor_row) < (self.__top, self.__top_row):
+            self.__top, self.__top_row = line, cursor_row
+            return 0
+        if line - self.__top < height:
+            # An edit may have left the top line with fewer rows
+            top_rows = len(layout.starts(self.__top, text[self.__top]))
+            self.__top_row = min(self.__top_row, top_rows - 1)
+            rows = cursor_row - self.__top_row
+            for previous in range(self.__top, line):
+                rows += len(layout.starts(previous, text[previous]))
+            if rows < height:
+                return rows
+        # Below the window: it ends on the cursor row, with the rows above it
+        # taken from as many lines up as it takes to fill it
+        above = height - 1
+        top, top_row = line, cursor_row
+        while above > top_row and top > 0:
+            above -= top_row + 1
+            top -= 1
+            top_row = len(layout.starts(top, text[top])) - 1
+        top_row = max(top_row - above, 0)
+        self.__top, self.__top_row = top, top_row
+        rows = cursor_row - top_row
+        for previous in range(top, line):
+            rows += len(layout.starts(previous, text[previous]))
+        return rows
+
+    def __visible_cursors(
+        self, editor: Editor, first: int, last: int
+    ) -> Dict[int, List[int]]:
+        """Characters the extra cursors on lines first to last are at, by line.
+        The lines where they differ from the last frame are marked dirty."""
+        extra = editor.extra_cursors
+        visible = set(
+            extra[bisect_left(extra, (first, 0)) : bisect_left(extra, (last + 1, 0))]
+        )
+        for line, _ in visible.symmetric_difference(self.__cursors):
+            self.__dirty_lines.add(line)
+        self.__cursors = visible
+        cursors: Dict[int, List[int]] = {}
+        for line, char in visible:
+            cursors.setdefault(line, []).append(char)
+        return cursors
+
+    def __is_dirty(self, line: int) -> bool:
+        return (
+            self.__full_redraw
+            or line in self.__dirty_lines
+            or (self.__dirty_from is not None and line >= self.__dirty_from)
+        )
+
+    def __draw_row(self, window, row: int, text: str, width: int, attribute: int):
+        window.move(row, 0)
+        window.clrtoeol()
+        if text:
+            try:
+                _draw(window, row, 0, text, width, attribute)
+            except curses.error:
+                # Writing the bottom-right cell moves the cursor off screen
+                pass
+
+    def __draw_cursors(self, window, row: int, text: str, start: int, end: int, chars):
+        """Draw the cursors at chars that fall in the piece of text from start
+        to end shown on row"""
+        width = self.__size[1]
+        for char in chars:
+            inside = start <= char < end or char == end == len(text)
+            if not inside or char - start >= width:
+                continue
+            cell = text[char] if char < len(text) else " "
+            try:
+                _draw(window, row, char - start, cell, 1, curses.A_REVERSE)
+            except curses.error:
+                pass
+
+    def __draw_spans(self, window, row: int, text: str, start: int, end: int, spans):
+        """Paint the spans over the piece of text from start to end shown on row"""
+        for first, last, attribute in spans or ():
+            if first >= end:
+                break
+            first, last = max(first, start), min(last, end)
+            if first >= last:
+                continue
+            piece = text[first:last]
+            try:
+                _draw(window, row, first - start, piece, last - first, attribute)
+            except curses.error:
+                pass
@@ -0,0 +1,120 @@
+from bisect import bisect_right
+from typing import Dict, Tuple
+from src.editor import Editor
+
+# Wrap points of more lines than this are dropped and computed again on use,
+# so the cache stays about the size of what was shown recently
+MAX_CACHED_LINES = 4096
+
+# Offsets in a line where each of its screen rows starts, the first being 0
+RowStarts = Tuple[int, ...]
+SINGLE_ROW: RowStarts = (0,)
+
+
+def wrap_points(text: str, width: int) -> RowStarts:
+    """Split a line into rows of at most width characters, after the last
+    space of a row when it has one and at width otherwise"""
+    if len(text) <= width:
+        return SINGLE_ROW
+    starts = [0]
+    start = 0
+    while len(text) - start > width:
+        end = start + width
+        space = text.rfind(" ", start, end)
+        if space > start:
+            end = space + 1
+        starts.append(end)
+        start = end
+    return tuple(starts)
+
+
+def row_of(starts: RowStarts, char: int) -> int:
+    """Row of a line showing the character at char"""
+    return bisect_right(starts, char) - 1
+
+
+class WrapLayout:
+    """Soft wrapping of long lines into several screen rows, for display only:
+    the text keeps its lines as they are.
+
+    Wrap points are worked out when a line is first shown and cached until an
+    edit reported through invalidate() touches it. Only the lines around the
+    window are ever looked at, so laying out and moving through wrapped text
+    costs in proportion to the rows crossed, not to the document.
+
+    Moving the cursor by rows remembers the column it started from, so going
+    across a short row and on to a longer one lands back in that column."""
+
+    def __init__(self, width: int = 80):
+        self.__width = max(width, 1)
+        self.__starts: Dict[int, RowStarts] = {}
+        # (line, char) the last move left the cursor at, and its column then
+        self.__goal: Tuple[int, int, int] | None = None
+
+    @property
+    def width(self) -> int:
+        return self.__width
+
+    def resize(self, width: int):
+        width = max(width, 1)
+        if width != self.__width:
+            self.__width = width
+            self.__starts.clear()
+
+    def starts(self, line: int, text: str) -> RowStarts:
+        starts = self.__starts.get(line)
+        if starts is None:
+            if len(self.__starts) >= MAX_CACHED_LINES:
+                self.__starts.clear()
+            starts = self.__starts[line] = wrap_points(text, self.__width)
+        return starts
+
+    def invalidate(self, start: int, removed: int, inserted: int):
+        if removed == inserted:
+            for line in range(start, start + removed):
+                self.__starts.pop(line, None)
+            return
+        shift = inserted - removed
+        self.__starts = {
+            line if line < start else line + shift: starts
+            for line, starts in self.__starts.items()
+            if not start <= line < start + removed
+        }
+
+    def move(self, editor: Editor, rows: int):
+        """Move the cursor rows screen rows down, or up if rows is negative"""
+        line, char = editor.cursor["line"], editor.cursor["char"]
+        starts = self.starts(line, editor.text[line])
+        row = row_of(starts, char)
+        if self.__goal is not None and self.__goal[:2] == (line, char):
+            column = self.__goal[2]
+        else:
+            column = char - starts[row]
+        if rows < 0:
+            line, row = self.__up(editor, line, row, -rows)
+        else:
+            line, row = self.__down(editor, line, row, rows)
+        text = editor.text[line]
+        starts = self.starts(line, text)
+        # A row ends where the next one starts, and the last one with the line
+        end = starts[row + 1] - 1 if row + 1 < len(starts) else len(text)
+        char = min(starts[row] + column, end)
+        editor.move_to(line, char)
+        self.__goal = (line, char, column)
+
+    def __up(self, editor: Editor, line: int, row: int, rows: int):
+        while rows > row and line > 0:
+            rows -= row + 1
+            line -= 1
+            row = len(self.starts(line, editor.text[line])) - 1
+        return line, max(row - rows, 0)
+
+    def __down(self, editor: Editor, line: int, row: int, rows: int):
+        text = editor.text
+        last_row = len(self.starts(line, text[line])) - 1
+        while rows > last_row - row and editor.buffer.has_line(line + 1):
+            rows -= last_row - row + 1
+            line += 1
+            row = 0
+            last_row = len(self.starts(line, text[line])) - 1
+        return line, min(row + rows, last_row)
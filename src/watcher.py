@@ -0,0 +1,309 @@
+from __future__ import annotations
+import ctypes
+import os
+import select
+import threading
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import List, Tuple
+from src.editor import Editor
+from src.journal import FileStamp, file_stamp
+
+# Seconds between checks of the file when there is no inotify to wake up on
+DEFAULT_POLL_INTERVAL = 1.0
+# Seconds to let a burst of writes to the file settle before reading it
+SETTLE_DELAY = 0.05
+# Lines copied out of the editor at a time, so edits can interleave
+SNAPSHOT_CHUNK_LINES = 16384
+# Past this many differing lines on each side, once the common start and end
+# are left out, the whole middle is replaced instead of diffed line by line
+MAX_DIFF_LINES = 20000
+# Files larger than this are not read and merged when they change, only
+# reported: reading and diffing them would load the whole file into memory
+MAX_MERGE_BYTES = 16 << 20
+
+# Linux inotify events that can mean the file has new contents
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_WATCHED_EVENTS = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+# (old start, old stop, new start, new stop): lines old[old start:old stop]
+# became new[new start:new stop]
+Hunk = Tuple[int, int, int, int]
+
+
+def diff_lines(old: List[str], new: List[str]) -> List[Hunk]:
+    """Line ranges that differ between old and new, top to bottom"""
+    prefix = 0
+    shortest = min(len(old), len(new))
+    while prefix < shortest and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and old[-suffix - 1] == new[-suffix - 1]:
+        suffix += 1
+    old_stop, new_stop = len(old) - suffix, len(new) - suffix
+    if prefix == old_stop and prefix == new_stop:
+        return []
+    if old_stop - prefix > MAX_DIFF_LINES or new_stop - prefix > MAX_DIFF_LINES:
+        return [(prefix, old_stop, prefix, new_stop)]
+    matcher = SequenceMatcher(
+        None, old[prefix:old_stop], new[prefix:new_stop], autojunk=False
+    )
+    return [
+        (prefix + i1, prefix + i2, prefix + j1, prefix + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+class _EditedLines:
+    """Lines edited in the editor since it was last saved, as sorted runs of
+    [start, stop, version] kept in step with later edits, the version being
+    that of the last edit. Runs that meet are merged into one."""
+
+    def __init__(self):
+        self.__runs: List[List[int]] = []
+        self.__saved = 0
+
+    def record(
+        self, start: int, removed: int, inserted: int, version: int | None, saved: int
+    ):
+        """Shift the runs for a change, and mark the changed lines with version
+        unless it is None. Edits at or below the saved version are dropped."""
+        runs = self.__runs
+        if saved != self.__saved:
+            self.__saved = saved
+            runs[:] = [run for run in runs if run[2] > saved]
+        stop = start + removed
+        shift = inserted - removed
+        # A run starting before start can still reach into the change
+        first = bisect_left(runs, [start])
+        if first and runs[first - 1][1] > start:
+            first -= 1
+        last = first
+        while last < len(runs) and runs[last][0] < stop:
+            last += 1
+        pieces = []
+        for run_start, run_stop, run_version in runs[first:last]:
+            if run_start < start:
+                pieces.append([run_start, start, run_version])
+            if run_stop > stop:
+                pieces.append([start + inserted, run_stop + shift, run_version])
+        if version is not None:
+            # Deleted lines leave their mark on the line that took their place
+            pieces.append([start, start + max(inserted, 1), version])
+            pieces.sort()
+        if shift:
+            for run in runs[last:]:
+                run[0] += shift
+                run[1] += shift
+        runs[first:last] = pieces
+        # Only the runs around the change can have come to meet
+        low, high = max(first - 1, 0), min(first + len(pieces) + 1, len(runs))
+        merged: List[List[int]] = []
+        for run in runs[low:high]:
+            if merged and run[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], run[1])
+                merged[-1][2] = max(merged[-1][2], run[2])
+            else:
+                merged.append(run)
+        runs[low:high] = merged
+
+    def touches(self, start: int, stop: int, since: int) -> bool:
+        """Whether lines start to stop - 1 were edited after version since. An
+        empty range is where lines would go, and touches the lines around it."""
+        if start == stop:
+            start, stop = start - 1, stop + 1
+        position = bisect_left(self.__runs, [start])
+        # A run starting before start can still reach into the range
+        for run_start, run_stop, version in self.__runs[max(position - 1, 0) :]:
+            if run_start >= stop:
+                break
+            if run_stop > start and version > since:
+                return True
+        return False
+
+
+def _inotify(directory: str) -> int | None:
+    """Non-blocking inotify descriptor watching directory, or None where there
+    is no inotify"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        descriptor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if descriptor < 0:
+        return None
+    if libc.inotify_add_watch(descriptor, directory.encode(), _WATCHED_EVENTS) < 0:
+        os.close(descriptor)
+        return None
+    return descriptor
+
+
+class FileWatcher:
+    """Background worker that notices when another program changes the file
+    being edited and merges the change into the editor.
+
+    It wakes up on inotify events for the file's directory, where there is
+    inotify, and polls the file's size and modification time otherwise. A
+    change to a file over MAX_MERGE_BYTES is only reported; others are merged
+    by diffing the lines of the new file against a copy of the text taken in
+    chunks, then splicing in only the runs of lines that differ. Runs that
+    overlap lines with unsaved edits are left as they are, so those edits
+    survive, and the cursor follows the text it was on.
+
+    Nothing waits on the disk or the diff while holding the editor lock: if
+    the text was edited meanwhile, the merge is thrown away and tried again."""
+
+    def __init__(self, editor: Editor, interval: float = DEFAULT_POLL_INTERVAL):
+        self.__editor = editor
+        self.__interval = interval
+        self.__edited = _EditedLines()
+        self.__merging = False
+        self.__notice: str | None = None
+        self.__merges = 0
+        # Stamp of the last change reported rather than merged
+        self.__too_large: FileStamp | None = None
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="watch", daemon=True)
+        editor.add_listener(self.__record)
+
+    @property
+    def merges(self) -> int:
+        """How many changes made by other programs were merged"""
+        return self.__merges
+
+    def start(self) -> FileWatcher:
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        self.__editor.remove_listener(self.__record)
+
+    def take_notice(self) -> str | None:
+        """Message about the last merge, once"""
+        notice, self.__notice = self.__notice, None
+        return notice
+
+    def check(self) -> bool:
+        """Merge the file into the editor if another program changed it since
+        it was loaded or saved. Returns whether a change was merged."""
+        editor = self.__editor
+        path = editor.file_path
+        try:
+            stamp = file_stamp(path)
+            if stamp == editor.disk_stamp or stamp == self.__too_large:
+                return False
+            if stamp[0] > MAX_MERGE_BYTES:
+                self.__too_large = stamp
+                self.__notice = "File changed on disk: too large to merge"
+                return False
+            file_format = editor.file_format
+            with open(path, "rb") as file:
+                data = file.read().removeprefix(file_format.bom)
+            disk_lines = file_format.decode_lines(data)
+            if file_stamp(path) != stamp:
+                # Still being written: the next check reads it again
+                return False
+        except OSError:
+            return False
+        snapshot = self.__snapshot()
+        if snapshot is None:
+            return False
+        lines, version = snapshot
+        hunks = diff_lines(lines, disk_lines)
+
+        with editor.lock:
+            if editor.version != version:
+                return False
+            runs, kept = [], 0
+            for old_start, old_stop, new_start, new_stop in hunks:
+                if self.__edited.touches(old_start, old_stop, editor.saved_version):
+                    kept += 1
+                else:
+                    runs.append((old_start, old_stop, disk_lines[new_start:new_stop]))
+            cursor = editor.cursor
+            line, char = self.__follow(cursor["line"], cursor["char"], runs)
+            self.__merging = True
+            try:
+                editor.merge_external(runs, stamp, disk_lines)
+            finally:
+                self.__merging = False
+            editor.move_to(line, char)
+        self.__merges += 1
+        self.__notice = "File changed on disk: merged"
+        if kept:
+            self.__notice += f", {kept} block(s) with unsaved edits kept"
+        return True
+
+    def __record(self, start: int, removed: int, inserted: int):
+        # Lines merged from the file are not edits, but move the ones below
+        editor = self.__editor
+        version = None if self.__merging else editor.version
+        self.__edited.record(start, removed, inserted, version, editor.saved_version)
+
+    def __snapshot(self) -> Tuple[List[str], int] | None:
+        """Copy of the text and its version, or None if it was edited while
+        copying"""
+        editor = self.__editor
+        with editor.lock:
+            version = editor.version
+        lines = []
+        while True:
+            with editor.lock:
+                if editor.version != version:
+                    return None
+                chunk = list(
+                    editor.buffer.lines(len(lines), len(lines) + SNAPSHOT_CHUNK_LINES)
+                )
+            if not chunk:
+                return lines, version
+            lines += chunk
+
+    @staticmethod
+    def __follow(line: int, char: int, runs) -> Tuple[int, int]:
+        """Where the cursor at line:char goes once runs are spliced in: down or
+        up with the lines added or removed above it, or to the start of a run
+        that replaced its line"""
+        shift = 0
+        for start, stop, lines in runs:
+            if line < start or (line == start and start == stop):
+                break
+            if line < stop:
+                return start + shift, 0
+            shift += len(lines) - (stop - start)
+        return line + shift, char
+
+    def __run(self):
+        directory = os.path.dirname(os.path.abspath(self.__editor.file_path))
+        descriptor = _inotify(directory)
+        # Catches a change made before the watch was set up
+        self.check()
+        try:
+            while not self.__stopped.is_set():
+                if descriptor is None:
+                    self.__stopped.wait(self.__interval)
+                else:
+                    readable, _, _ = select.select([descriptor], [], [], 0.2)
+                    if not readable:
+                        continue
+                    self.__stopped.wait(SETTLE_DELAY)
+                    self.__drain(descriptor)
+                if not self.__stopped.is_set():
+                    self.check()
+        finally:
+            if descriptor is not None:
+                os.close(descriptor)
+
+    @staticmethod
+    def __drain(descriptor: int):
+        try:
+            while os.read(descriptor, 65536):
+                pass
+        except BlockingIOError:
+            pass
@@ -0,0 +1,40 @@
+import os
+import threading
+from src.autosave import MAX_ABANDONED_SAVES, AutoSaver
+from src.editor import Cursor, Editor
+
+
+def test_steady_typing_does_not_starve_saves(tmp_path, monkeypatch):
+    """When every save races with an edit, the saver should stop abandoning
+    them after a few and make the edit wait for the next one"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc")
+    editor = Editor(cursor=Cursor(line=0, char=0), journaled=False)
+    editor.from_file(str(path))
+    saver = AutoSaver(editor)
+    typists = []
+    fsync = os.fsync
+
+    def type_while_saving(descriptor: int):
+        fsync(descriptor)
+        # Typed on another thread as the input loop would, after the text was
+        # copied out and before the save is done
+        typist = threading.Thread(target=editor.append, args=("x",))
+        typist.start()
+        typist.join(0.1)
+        typists.append(typist)
+
+    monkeypatch.setattr(os, "fsync", type_while_saving)
+    for abandoned in range(1, MAX_ABANDONED_SAVES + 1):
+        assert not saver.save()
+        assert saver.abandoned_saves == abandoned
+    assert path.read_text() == "abc"
+
+    assert saver.save()
+    saved = "x" * MAX_ABANDONED_SAVES + "abc"
+    assert path.read_text() == saved
+    assert saver.abandoned_saves == 0
+    for typist in typists:
+        typist.join()
+    assert editor.text[0] == "x" * len(typists) + "abc"
+    assert editor.is_dirty
@@ -0,0 +1,87 @@
+import pytest
+from src.batch import parse_script, replay, run_batch
+from src.editor import Cursor, Editor
+from src.interfaces.keys import Key
+from src.tui.headless_window import EndOfInput, HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+SCRIPT = """# prefix the first line, drop the second one
+type // 
+key esc down x
+key a enter
+type done
+"""
+
+
+def test_parse_script():
+    """When parsing a script, it should turn typed text and key names into key codes"""
+    keys = parse_script("type ab\nkey esc ctrl-z\n\n# comment\ntype  c")
+    assert keys == [ord("a"), ord("b"), Key.ESC.value, 26, ord(" "), ord("c")]
+    with pytest.raises(ValueError):
+        parse_script("press x")
+    with pytest.raises(ValueError):
+        parse_script("key hyper-x")
+
+
+def test_replay_matches_interactive_editor():
+    """When replaying keys, it should leave the text exactly as the interactive
+    editor would"""
+    lines = ["first", "second", "third"]
+    keys = parse_script(SCRIPT)
+
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    window = HeadlessWindow()
+    interface = TextUserInterface(editor=editor, logger=NullLogger(), window=window)
+    window.feed(keys)
+    with pytest.raises(EndOfInput):
+        while True:
+            interface.handle_input()
+
+    headless = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    assert replay(headless, keys) == len(keys)
+    assert headless.text == editor.text == ["// first", "done", "third"]
+
+
+def test_replay_stops_at_quit():
+    """When the script quits the editor, it should ignore the keys after it"""
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0))
+    assert replay(editor, parse_script("type a\nkey esc esc\ntype b")) == 3
+    assert editor.text == ["a"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(tmp_path, workers):
+    """When running a batch, it should save every file and report failures"""
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"file{index}.txt"
+        path.write_text(f"first\n{index}\nthird")
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.txt")
+
+    report = run_batch(paths + [missing], parse_script(SCRIPT), workers=workers)
+
+    assert report.files == 5
+    assert report.edits == 5 * len(parse_script(SCRIPT))
+    assert report.failures == [(missing, f"File '{missing}' not found")]
+    for path in paths:
+        with open(path) as file:
+            assert file.read() == "// first\ndone\nthird"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f"file{index}.txt" for index in range(5)
+    ]
+
+
+def test_run_batch_unreadable_file(tmp_path, monkeypatch):
+    """A file that cannot be read should be reported as such"""
+    path = tmp_path / "file.txt"
+    path.write_text("text")
+
+    def deny(path: str):
+        raise PermissionError(path)
+
+    monkeypatch.setattr("src.editor.detect", deny)
+    report = run_batch([str(path)], parse_script(SCRIPT), workers=1)
+    assert report.failures == [
+        (str(path), f"Permission denied to access file '{path}'")
+    ]
@@ -0,0 +1,143 @@
+import os
+import tracemalloc
+from src.buffer_manager import BufferManager
+from src.editor import Editor
+from src.interfaces.keys import Key
+from src.tui.headless_window import HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+
+def make_files(directory, count, lines=3):
+    paths = []
+    for index in range(count):
+        path = directory / f"file{index:03}.txt"
+        path.write_text("\n".join(f"{index} line {i}" for i in range(lines)))
+        paths.append(str(path))
+    return paths
+
+
+def test_switch_list_and_close(tmp_path):
+    """When switching between buffers, each should keep its own text and cursor"""
+    paths = make_files(tmp_path, 3)
+    buffers = BufferManager()
+    for path in paths:
+        buffers.open(path)
+    assert buffers.open(paths[1]) == 1
+    buffers.active.append("a")
+    buffers.next().append("b")
+    buffers.switch(0)
+    assert buffers.active.text[0] == "a0 line 0"
+    assert buffers.active.cursor["char"] == 1
+    assert buffers.describe() == "[1:file000.txt*] 2:file001.txt* 3:file002.txt"
+
+    assert buffers.close()
+    assert (tmp_path / "file000.txt").read_text().startswith("a0 line 0")
+    assert buffers.active.text[0] == "b1 line 0"
+    buffers.close_all()
+    assert (tmp_path / "file001.txt").read_text().startswith("b1 line 0")
+    assert sorted(os.listdir(tmp_path)) == [f"file00{i}.txt" for i in range(3)]
+
+
+def test_evicted_buffers_come_back(tmp_path):
+    """When buffers are evicted, clean ones should reload from disk and dirty
+    ones should keep their unsaved text"""
+    paths = make_files(tmp_path, 3)
+    buffers = BufferManager(memory_budget=0)
+    for path in paths:
+        buffers.open(path)
+    buffers.active.append("unsaved ")
+    buffers.active.cursor_down()
+    buffers.switch(1)
+    buffers.switch(2)
+    assert [info.is_loaded for info in buffers.buffers()] == [False, False, True]
+    assert [info.is_dirty for info in buffers.buffers()] == [True, False, False]
+    assert (tmp_path / "file000.txt").read_text().startswith("0 line 0")
+
+    editor = buffers.switch(0)
+    assert editor.text[0] == "unsaved 0 line 0"
+    assert editor.is_dirty
+    assert editor.cursor["line"] == 1
+    buffers.close_all()
+    assert (tmp_path / "file000.txt").read_text().startswith("unsaved 0 line 0")
+
+
+def test_evicted_buffers_stay_journaled(tmp_path):
+    """Unsaved edits to an evicted buffer, and the ones made once it is loaded
+    again, should be recovered after a crash"""
+    paths = make_files(tmp_path, 2)
+    journal = tmp_path / ".file000.txt.swp"
+
+    def recovered() -> str:
+        editor = Editor().from_file(paths[0])
+        text = editor.text[0]
+        editor.exit()
+        return text
+
+    buffers = BufferManager(memory_budget=0)
+    buffers.open(paths[0])
+    buffers.active.append("a")
+    buffers.switch(buffers.open(paths[1]))
+    assert not buffers.buffers()[0].is_loaded
+    assert recovered() == "a0 line 0"
+    buffers.switch(0).append("b")
+    buffers.active.journal.flush()
+    assert recovered() == "ab0 line 0"
+
+    # Without the journal of earlier edits, the whole text is journaled
+    buffers.switch(1)
+    os.remove(journal)
+    buffers.switch(0).append("c")
+    buffers.active.journal.flush()
+    assert recovered() == "abc0 line 0"
+    buffers.close_all()
+    assert (tmp_path / "file000.txt").read_text().startswith("abc0 line 0")
+
+
+def test_memory_stays_within_budget(tmp_path):
+    """When cycling through 200 files, the memory held should stay bounded by
+    the budget instead of growing with the number of files"""
+    paths = make_files(tmp_path, 200, lines=2000)
+    budget = 1 << 18
+    buffers = BufferManager(memory_budget=budget)
+    for path in paths:
+        buffers.open(path)
+    tracemalloc.start()
+    try:
+        for index in range(len(paths)):
+            editor = buffers.switch(index)
+            if index % 3 == 0:
+                editor.append("edit")
+            assert buffers.memory() <= budget
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        buffers.close_all()
+    total = sum(os.path.getsize(path) for path in paths)
+    assert total > 5 * budget
+    assert held < 3 * budget
+
+
+def test_buffer_commands(tmp_path):
+    """When using the buffer commands, the interface should follow the active
+    buffer"""
+    paths = make_files(tmp_path, 3)
+    buffers = BufferManager()
+    for path in paths:
+        buffers.open(path)
+    window = HeadlessWindow(height=5, width=80)
+    interface = TextUserInterface(
+        editor=buffers.active, logger=NullLogger(), window=window, buffers=buffers
+    )
+    window.feed([Key.ESC.value, ord("]"), ord("]"), ord("x")])
+    interface.handle_input()
+    assert interface.editor is buffers.active
+    assert buffers.active_index == 2
+    assert window.rows[0] == "2 line 1"
+
+    window.feed([ord("B")])
+    interface.handle_input()
+    assert window.rows[4] == "1:file000.txt 2:file001.txt [3:file002.txt*]"
+    window.feed([ord("1"), ord("B"), ord("a"), ord("z")])
+    interface.handle_input()
+    assert buffers.active_index == 0
+    assert window.rows[0] == "z0 line 0"
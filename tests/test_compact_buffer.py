@@ -0,0 +1,74 @@
+import random
+from src.buffers import compact_buffer
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.list_buffer import ListBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import Cursor, Editor
+
+
+def test_compact_from_lines():
+    """When built from lines, it should expose the same lines, non-ASCII included"""
+    lines = [f"línea {i} ✓" for i in range(10000)]
+    buffer = CompactBuffer(lines)
+    assert len(buffer) == len(lines)
+    assert list(buffer.lines()) == lines
+    assert list(buffer.lines(4321, 5678)) == lines[4321:5678]
+    assert buffer.line(9999) == lines[9999]
+    assert not buffer.has_line(10000)
+
+
+def test_compact_matches_list_buffer(monkeypatch):
+    """Any sequence of edits should leave it with the same contents as a plain list"""
+    monkeypatch.setattr(compact_buffer, "SLICE_LINES", 100)
+    monkeypatch.setattr(compact_buffer, "STRINGS_LINES", 16)
+    monkeypatch.setattr(compact_buffer, "READ_CHUNK_LINES", 7)
+    rng = random.Random(5)
+    compact = CompactBuffer([str(i) for i in range(2000)])
+    reference = ListBuffer([str(i) for i in range(2000)])
+    for step in range(2000):
+        operation = rng.random()
+        if operation < 0.3:
+            index = rng.randint(0, len(reference))
+            lines = [f"new {step} {k}" for k in range(rng.randint(1, 20))]
+            compact.insert_lines(index, lines)
+            reference.insert_lines(index, lines)
+        elif operation < 0.6 and len(reference) > 0:
+            start = rng.randint(0, len(reference) - 1)
+            stop = min(len(reference), start + rng.randint(1, 40))
+            compact.delete_lines(start, stop)
+            reference.delete_lines(start, stop)
+        elif len(reference) > 0:
+            index = rng.randint(0, len(reference) - 1)
+            compact.set_line(index, f"set {step}")
+            reference.set_line(index, f"set {step}")
+        assert len(compact) == len(reference)
+        start = rng.randint(0, len(reference))
+        assert list(compact.lines(start, start + 50)) == list(
+            reference.lines(start, start + 50)
+        )
+    assert list(compact.lines()) == list(reference.lines())
+
+
+def test_compact_only_keeps_edited_lines_as_str():
+    """When a line is edited, the memory estimate should grow by that line alone,
+    and stay far below one str per line"""
+    lines = [f"{i:>10} lorem ipsum dolor sit amet" for i in range(100_000)]
+    compact = CompactBuffer(lines)
+    before = compact.memory_size()
+    compact.set_line(50_000, "edited")
+    assert compact.memory_size() - before < 400
+    assert compact.memory_size() * 2 < RopeBuffer(lines).memory_size()
+
+
+def test_editor_with_compact_buffer(tmp_path):
+    """The editor should edit and save a file kept in compact storage"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc\ndéf\n")
+    editor = Editor(cursor=Cursor(line=0, char=0), buffer_type=CompactBuffer)
+    editor.from_file(str(path))
+    editor.cursor_down()
+    editor.append("x")
+    editor.add_line()
+    editor.save()
+    assert path.read_text() == "abc\nx\ndéf\n"
+    editor.exit()
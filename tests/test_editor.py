@@ -1,12 +1,21 @@
+import os
+import random
 from unittest.mock import mock_open
+from src.buffers.list_buffer import ListBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src import multicursor
 from src.editor import Cursor, Editor
+from src.history import History
+from src.interfaces.keys import Key
+from src.tui.modes.command_mode import TextUserInterfaceCommandMode
 
 
 def test_from_file(monkeypatch):
     """Given a file, the editor should be initialized with its contents"""
     mocked_file_content = """Line 1
                              Line 2"""
-    monkeypatch.setattr("builtins.open", mock_open(read_data=mocked_file_content))
+    mocked_open = mock_open(read_data=mocked_file_content.encode())
+    monkeypatch.setattr("builtins.open", mocked_open)
     editor_text = Editor().from_file("").text
     assert "\n".join(editor_text) == mocked_file_content
 
@@ -203,6 +212,336 @@ def test_paste_text():
     assert editor.text[0] == "abcdef"
 
 
+def test_delete_joins_lines():
+    """When deleting at the beginning of a line, it should join it to the end of the previous line"""
+    editor = Editor(text=["abc", "def"], cursor=Cursor(line=1, char=0))
+    editor.delete()
+    assert editor.text == ["abcdef"]
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 3
+
+
+def test_buffer_engines_are_interchangeable():
+    """The editor should behave the same whatever buffer engine stores its text"""
+    for buffer_type in (ListBuffer, RopeBuffer):
+        editor = Editor(
+            text=["abc", "def"], cursor=Cursor(line=0, char=1), buffer_type=buffer_type
+        )
+        editor.add_line()
+        editor.append("x")
+        assert editor.text == ["a", "xbc", "def"]
+
+
+def test_undo_coalesces_typing():
+    """When undoing after typing a word, the whole word should be removed at once"""
+    editor = Editor(text=["abc"], cursor=Cursor(line=0, char=3))
+    for character in "def":
+        editor.append(character)
+    editor.undo()
+    assert editor.text == ["abc"]
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 3
+
+
+def test_undo_cut():
+    """When undoing a cut, the line should come back where it was"""
+    editor = Editor(text=["abc", "def", "ghi"], cursor=Cursor(line=1, char=1))
+    editor.cut()
+    editor.undo()
+    assert editor.text == ["abc", "def", "ghi"]
+    assert editor.cursor["line"] == 1 and editor.cursor["char"] == 1
+
+
+def test_undo_line_break_and_join():
+    """Line breaks and joins should be undone one at a time, newest first"""
+    editor = Editor(text=["abcdef"], cursor=Cursor(line=0, char=3))
+    editor.add_line()
+    editor.append("x")
+    editor.undo()
+    assert editor.text == ["abc", "def"]
+    editor.undo()
+    assert editor.text == ["abcdef"]
+
+
+def test_redo():
+    """When redoing an undone edit, it should be applied again"""
+    editor = Editor(text=["abc", "def"], cursor=Cursor(line=1, char=0))
+    editor.delete()
+    editor.undo()
+    editor.redo()
+    assert editor.text == ["abcdef"]
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 3
+
+
+def test_new_edit_clears_redo():
+    """After editing, undone changes can no longer be redone"""
+    editor = Editor(text=["abc"], cursor=Cursor(line=0, char=3))
+    editor.append("d")
+    editor.undo()
+    editor.append("e")
+    editor.redo()
+    assert editor.text == ["abce"]
+
+
+def test_history_memory_cap():
+    """When the history grows over its memory cap, the oldest entries should be dropped"""
+    history = History(max_bytes=10_000)
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0), history=history)
+    for _ in range(1000):
+        editor.append("a")
+        editor.add_line()
+    assert history.size <= 10_000
+    while len(history):
+        editor.undo()
+    assert len(editor.text) > 1
+
+
+def test_save(tmp_path):
+    """When saving, the file should be replaced with the editor text and the editor marked clean"""
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    editor = Editor(text=["abc", "def"], cursor=Cursor(line=0, char=0))
+    editor.from_file(str(path))
+    editor.append("x")
+    assert editor.is_dirty
+    assert editor.save()
+    assert path.read_text() == "xold"
+    assert not editor.is_dirty
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".file.txt.swp", "file.txt"]
+
+
+def test_save_in_chunks(tmp_path, monkeypatch):
+    """Texts longer than one save chunk should be written whole"""
+    monkeypatch.setattr("src.editor.SAVE_CHUNK_LINES", 3)
+    path = tmp_path / "file.txt"
+    lines = [str(i) for i in range(10)]
+    editor = Editor(text=lines, file_path=str(path))
+    editor.save()
+    assert path.read_text() == "\n".join(lines)
+
+
+def test_save_aborts_on_concurrent_edit(tmp_path, monkeypatch):
+    """When the text changes while saving, the save should be abandoned without touching the file"""
+    monkeypatch.setattr("src.editor.SAVE_CHUNK_LINES", 1)
+    path = tmp_path / "file.txt"
+    path.write_text("original")
+    editor = Editor(
+        text=["a", "b"], cursor=Cursor(line=0, char=0), file_path=str(path)
+    )
+    real_fsync = os.fsync
+
+    def fsync_and_edit(descriptor):
+        editor.append("x")
+        real_fsync(descriptor)
+
+    monkeypatch.setattr("os.fsync", fsync_and_edit)
+    assert not editor.save()
+    assert path.read_text() == "original"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["file.txt"]
+
+
+def test_page_up_and_down():
+    """When paging, the cursor should move by whole pages, keep its column and
+    stop at the ends of the document"""
+    lines = [f"line {i}" for i in range(50)]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=3))
+    editor.cursor_page_down(20)
+    assert editor.cursor["line"] == 20 and editor.cursor["char"] == 3
+    editor.cursor_page_down(40)
+    assert editor.cursor["line"] == 49
+    editor.cursor_page_up(10)
+    assert editor.cursor["line"] == 39 and editor.cursor["char"] == 3
+    editor.cursor_page_up(100)
+    assert editor.cursor["line"] == 0
+
+
+def test_start_and_end_of_file():
+    """When jumping to either end of the document, the cursor should land on its
+    first or last character"""
+    editor = Editor(text=["abc", "de", "fghi"], cursor=Cursor(line=1, char=1))
+    editor.cursor_end_of_file()
+    assert editor.cursor["line"] == 2 and editor.cursor["char"] == 4
+    editor.cursor_start_of_file()
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 0
+
+
+def test_word_motion():
+    """When moving by words, the cursor should stop at word starts across lines"""
+    editor = Editor(text=["foo bar", "", "  baz.qux"], cursor=Cursor(line=0, char=1))
+    stops = []
+    for _ in range(5):
+        editor.cursor_word_right()
+        stops.append((editor.cursor["line"], editor.cursor["char"]))
+    assert stops == [(0, 4), (2, 2), (2, 6), (2, 9), (2, 9)]
+    stops = []
+    for _ in range(5):
+        editor.cursor_word_left()
+        stops.append((editor.cursor["line"], editor.cursor["char"]))
+    assert stops == [(2, 6), (2, 2), (0, 4), (0, 0), (0, 0)]
+
+
+def test_offsets_follow_edits(monkeypatch):
+    """When the text changes, line offsets should match the text without
+    rescanning it"""
+    monkeypatch.setattr("src.buffers.line_offsets.BLOCK_LINES", 4)
+    random.seed(3)
+    editor = Editor(
+        text=[f"{i}" * (i % 7) for i in range(40)], cursor=Cursor(line=0, char=0)
+    )
+    editor.cursor_offset()
+    for _ in range(300):
+        editor.move_to(random.randrange(len(editor.text)), random.randrange(8))
+        action = random.choice(["append", "add_line", "delete", "cut", "paste"])
+        if action == "append":
+            editor.append(random.choice(["x", "yz\nw", "\n\n"]))
+        elif action == "paste" and editor.copied is not None:
+            editor.paste()
+        elif action != "paste":
+            getattr(editor, action)()
+        text = "\n".join(editor.text)
+        line = random.randrange(len(editor.text))
+        starts = [0] + [i + 1 for i, c in enumerate(text) if c == "\n"]
+        assert editor.offsets.offset_of(line) == starts[line]
+        assert editor.offsets.total() == len(text)
+        offset = random.randrange(len(text) + 1)
+        assert editor.offsets.line_at(offset) == text.count("\n", 0, offset)
+
+
+def test_move_to_offset():
+    """When moving to a character offset, the cursor should land on the line and
+    column holding it"""
+    editor = Editor(text=["abc", "de", "fghi"], cursor=Cursor(line=0, char=0))
+    editor.move_to_offset(5)
+    assert editor.cursor["line"] == 1 and editor.cursor["char"] == 1
+    assert editor.cursor_offset() == 5
+    editor.move_to_offset(100)
+    assert editor.cursor["line"] == 2 and editor.cursor["char"] == 4
+
+
+def test_jump_commands():
+    """When typing a count before a jump command, it should go to that line or
+    percentage of the document"""
+    lines = [f"{i:03}" for i in range(200)]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    mode = TextUserInterfaceCommandMode(editor=editor, page_rows=lambda: 10)
+    mode.key_actions([ord(key) for key in "120G"])
+    assert editor.cursor["line"] == 119
+    mode.key_actions([ord("G")])
+    assert editor.cursor["line"] == 199
+    mode.key_actions([ord("g")])
+    assert editor.cursor["line"] == 0
+    mode.key_actions([ord(key) for key in "50%"])
+    assert editor.cursor_offset() == (len(lines) * 4 - 1) // 2
+    mode.key_actions([Key.PAGE_DOWN.value, Key.PAGE_DOWN.value])
+    assert editor.cursor["line"] == 119
+
+
+def test_copy_and_paste_lines():
+    """When copying lines and pasting them at the start of a line, they should
+    be inserted above it in one edit"""
+    editor = Editor(text=["a", "b", "c"], cursor=Cursor(line=0, char=0))
+    editor.copy_lines(0, 2)
+    assert editor.copied == "a\nb\n"
+    editor.move_to(2, 0)
+    editor.paste()
+    assert editor.text == ["a", "b", "a", "b", "c"]
+    assert editor.cursor["line"] == 4 and editor.cursor["char"] == 0
+    editor.undo()
+    assert editor.text == ["a", "b", "c"]
+
+
+def test_cut_lines():
+    """When cutting lines, they should be removed wherever they are"""
+    editor = Editor(text=["a", "b", "c", "d"], cursor=Cursor(line=0, char=0))
+    editor.cut_lines(1, 3)
+    assert editor.text == ["a", "d"] and editor.copied == "b\nc\n"
+    editor.cut_lines(1, 5)
+    assert editor.text == ["a"] and editor.copied == "d\n"
+    editor.cut_lines(0, 1)
+    assert editor.text == [""]
+    editor.undo()
+    editor.undo()
+    assert editor.text == ["a", "d"]
+
+
+def test_cut_empty_line_range():
+    """When cutting a range that ends before it starts, the first line should
+    be cut, as it would be copied"""
+    editor = Editor(text=["a"], cursor=Cursor(line=0, char=0))
+    editor.cut_lines(0, 0)
+    assert editor.text == [""] and editor.copied == "a\n"
+    editor = Editor(text=["a", "b"], cursor=Cursor(line=0, char=0))
+    editor.cut_lines(1, 0)
+    assert editor.text == ["a"] and editor.copied == "b\n"
+
+
+def test_cut_and_copy_range():
+    """When cutting a range, its text should go to the register and its ends
+    should be joined"""
+    editor = Editor(text=["abcd", "efgh", "ijkl"], cursor=Cursor(line=0, char=0))
+    editor.copy_range((2, 2), (0, 1))
+    assert editor.copied == "bcd\nefgh\nij"
+    editor.cut_range((0, 1), (1, 2), "a")
+    assert editor.text == ["agh", "ijkl"]
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 1
+    editor.move_to(1, 4)
+    editor.paste("a")
+    assert editor.text == ["agh", "ijklbcd", "ef"]
+    assert editor.cursor["line"] == 2 and editor.cursor["char"] == 2
+
+
+def test_named_registers_from_command_mode():
+    """When naming a register before a yank or paste, it should use that register"""
+    editor = Editor(text=["one", "two", "three"], cursor=Cursor(line=0, char=0))
+    mode = TextUserInterfaceCommandMode(editor=editor)
+    mode.key_actions([ord(key) for key in '"ay'])
+    mode.key_action(Key.DOWN.value)
+    mode.key_actions([ord(key) for key in "2y"])
+    mode.key_action(Key.DOWN.value)
+    mode.key_actions([ord(key) for key in '"ap'])
+    assert editor.text == ["one", "two", "one", "three"]
+    assert editor.registers.get().text() == "two\nthree\n"
+
+
+
+def test_type_at_several_cursors():
+    """When typing with extra cursors, every cursor should get the text in one
+    undo step, and cursors that meet when deleting should become one"""
+    editor = Editor(text=["abc", "de", "", "fgh"], cursor=Cursor(line=0, char=1))
+    editor.add_cursors_below(3)
+    assert editor.extra_cursors == [(1, 1), (2, 0), (3, 1)]
+    editor.append("xy")
+    assert editor.text == ["axybc", "dxye", "xy", "fxygh"]
+    editor.add_line()
+    assert editor.text == ["axy", "bc", "dxy", "e", "xy", "", "fxy", "gh"]
+    assert editor.extra_cursors == [(3, 0), (5, 0), (7, 0)]
+    editor.delete()
+    editor.delete()
+    assert editor.text == ["axbc", "dxe", "x", "fxgh"]
+    assert editor.cursor["line"] == 0 and editor.cursor["char"] == 2
+    assert editor.extra_cursors == [(1, 2), (2, 1), (3, 2)]
+    editor.undo()
+    assert editor.text == ["axybc", "dxye", "xy", "fxygh"]
+    assert editor.extra_cursors == []
+
+
+def test_cursors_far_apart(monkeypatch):
+    """Cursors too far apart to share a run should each be edited, with the
+    lines added above moving the ones below"""
+    monkeypatch.setattr(multicursor, "MERGE_GAP", 0)
+    text = [str(i) for i in range(10)]
+    editor = Editor(text=text, cursor=Cursor(line=2, char=1))
+    editor.add_cursor(5, 0)
+    editor.add_cursor(9, 1)
+    editor.add_line()
+    assert editor.text[2:9] == ["2", "", "3", "4", "", "5", "6"]
+    assert editor.text[11:] == ["9", ""]
+    assert editor.extra_cursors == [(7, 0), (12, 0)]
+    editor.delete()
+    assert editor.text == text
+    editor.clear_cursors()
+    editor.append("a")
+    assert editor.text[2] == "2a" and editor.text[5] == "5"
+
+
 # test cut first line
 # test break word on appending
 # test break word on deleting
@@ -0,0 +1,96 @@
+import pytest
+from src import file_format
+from src.buffer_manager import BufferManager
+from src.buffers.compact_buffer import CompactBuffer
+from src.buffers.mapped_buffer import MappedBuffer
+from src.buffers.rope_buffer import RopeBuffer
+from src.editor import Editor
+from src.file_format import FileFormat, sniff
+from src.tui.headless_window import HeadlessWindow
+from src.tui.viewport import Viewport
+
+ENGINES = [RopeBuffer, MappedBuffer, CompactBuffer]
+
+
+def test_sniff():
+    """The format should be told from the start of the file: byte order mark,
+    UTF-8 or not, and whether every line break is CRLF"""
+    assert sniff(b"a\r\nb\r\n") == FileFormat("utf-8", "\r\n")
+    assert sniff(b"a\r\nb\n") == FileFormat("utf-8", "\n")
+    assert sniff("café\n€".encode()[:-1]) == FileFormat("utf-8")
+    assert sniff(b"caf\xe9\n") == FileFormat("cp1252")
+    assert sniff("é \xff".encode() + b"\xff") == FileFormat("utf-8")
+    assert sniff(b"\xff\xfea\x00\r\x00\n\x00") == FileFormat(
+        "utf-16-le", "\r\n", b"\xff\xfe"
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "data, first",
+    [
+        (b"one\r\ntwo\r\nthree", "one"),
+        (b"caf\xe9 \x81\nna\xefve\n", "café \udc81"),
+        (b"ok \xff\xfe \xc3\xa9\nbad\n", "ok \udcff\udcfe é"),
+        (b"\xef\xbb\xbfbom\nline\n", "bom"),
+        ("bom\r\nutf-16\r\n".encode("utf-16"), "bom"),
+    ],
+)
+def test_round_trip(tmp_path, engine, data, first):
+    """Files should be read in their own format, bytes that do not decode
+    included, and written back in it with only the edited line changed"""
+    path = tmp_path / "file.txt"
+    path.write_bytes(data)
+    editor = Editor(buffer_type=engine, journaled=False).from_file(str(path))
+    assert editor.text[0] == first
+    editor.save()
+    assert path.read_bytes() == data
+    editor.move_to(1, 0)
+    editor.append("+")
+    editor.save()
+    expected = editor.file_format.encode("\n".join(editor.text))
+    assert path.read_bytes() == editor.file_format.bom + expected
+    editor.exit()
+
+
+@pytest.mark.parametrize("engine", [MappedBuffer, CompactBuffer])
+def test_untouched_lines_are_copied(tmp_path, monkeypatch, engine):
+    """Lines never edited should be written back as the bytes they were read
+    from, even where they do not follow the format of the file's start"""
+    monkeypatch.setattr(file_format, "SNIFF_BYTES", 8)
+    path = tmp_path / "file.txt"
+    data = b"a\r\nb\r\nbare\n" + b"\r\n".join(b"%d" % i for i in range(1000))
+    path.write_bytes(data)
+    editor = Editor(buffer_type=engine, journaled=False).from_file(str(path))
+    assert editor.file_format.newline == "\r\n"
+    assert editor.text[:4] == ["a", "b", "bare", "0"]
+    editor.cursor_end_of_file()
+    editor.append("!")
+    editor.save()
+    assert path.read_bytes() == data + b"!"
+    editor.exit()
+
+
+def test_spilled_buffer_keeps_its_format(tmp_path):
+    """A dirty buffer evicted and loaded again should still be saved in the
+    format it was read in"""
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_bytes(b"caf\xe9\r\n\x81\r\n")
+    second.write_text("other")
+    buffers = BufferManager(memory_budget=0)
+    buffers.open(str(first))
+    buffers.active.append("+")
+    buffers.switch(buffers.open(str(second)))
+    assert not buffers.buffers()[0].is_loaded
+    buffers.save_all()
+    assert first.read_bytes() == b"+caf\xe9\r\n\x81\r\n"
+    buffers.close_all()
+
+
+def test_undecoded_bytes_are_drawn():
+    """Bytes kept undecoded should be drawn as replacement characters, in
+    the columns they take"""
+    editor = Editor(text=["a\udcffb"])
+    window = HeadlessWindow(height=2, width=10)
+    Viewport().render(window, editor)
+    assert window.rows[0] == "a�b"
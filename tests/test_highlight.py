@@ -0,0 +1,153 @@
+import random
+from src.editor import Cursor, Editor
+from src.highlight.highlighter import Highlighter
+from src.highlight.lexers import PythonLexer, YamlLexer, lexer_for
+from src.interfaces.keys import Key
+from src.interfaces.lexer import COMMENT, KEY, KEYWORD, STRING
+from src.tui.headless_window import HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+
+def kinds(line: str, tokens):
+    return [(line[start:end], kind) for start, end, kind in tokens]
+
+
+def lex_all(lexer, lines):
+    state = lexer.initial_state
+    result = []
+    for line in lines:
+        tokens, state = lexer.lex(line, state)
+        result.append(tokens)
+    return result
+
+
+def test_python_lexer_carries_triple_quoted_strings():
+    """When a triple-quoted string is left open, the following lines should be
+    string until it is closed"""
+    lexer = PythonLexer()
+    tokens, state = lexer.lex('def f():  """Doc', None)
+    assert kinds('def f():  """Doc', tokens) == [
+        ("def", KEYWORD),
+        ('"""Doc', STRING),
+    ]
+    tokens, state = lexer.lex("still # not a comment", state)
+    assert kinds("still # not a comment", tokens) == [
+        ("still # not a comment", STRING)
+    ]
+    tokens, state = lexer.lex('end"""  # done', state)
+    assert kinds('end"""  # done', tokens) == [('end"""', STRING), ("# done", COMMENT)]
+    assert state is None
+
+
+def test_yaml_lexer_block_scalars():
+    """When a key opens a block scalar, the more indented lines below it should be
+    string and the next key should not"""
+    lines = ["run: |", "  echo key: 1", "", "  echo 2", "next: 1"]
+    tokens = lex_all(YamlLexer(), lines)
+    assert kinds(lines[1], tokens[1]) == [(lines[1], STRING)]
+    assert kinds(lines[3], tokens[3]) == [(lines[3], STRING)]
+    assert kinds(lines[4], tokens[4])[0] == ("next", KEY)
+
+
+def test_lexer_for_extension():
+    """It should pick the lexer from the file extension and skip plain text"""
+    assert isinstance(lexer_for("config.YML"), YamlLexer)
+    assert lexer_for("notes.txt") is None
+
+
+def test_single_character_edit_relexes_one_line():
+    """When a character is typed, only its line should be lexed again"""
+    lines = [f"value_{i} = {i}  # note" for i in range(5000)]
+    editor = Editor(text=lines, cursor=Cursor(line=2500, char=0))
+    highlighter = Highlighter(editor, PythonLexer())
+    highlighter.run_pending()
+    lexed = highlighter.lexed_lines
+    editor.append("x")
+    highlighter.run_pending()
+    assert highlighter.lexed_lines - lexed == 1
+    assert kinds(editor.text[2500], highlighter.tokens(2500))[-1] == (
+        "# note",
+        COMMENT,
+    )
+
+
+def test_opening_a_string_relexes_until_the_state_converges():
+    """When an edit opens a triple-quoted string, the lines below should turn into
+    string up to where it closes, and no further"""
+    lines = ["a = 1", "b = 2", "c = 3", '"""', "d = 4", "e = 5"]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    highlighter = Highlighter(editor, PythonLexer())
+    highlighter.run_pending()
+    lexed = highlighter.lexed_lines
+    editor.append('"""')
+    highlighter.run_pending()
+    assert highlighter.lexed_lines - lexed == 6
+    assert [kind for _, _, kind in highlighter.tokens(1)] == [STRING]
+    assert highlighter.tokens(5) == lex_all(PythonLexer(), editor.text)[5]
+
+
+def test_cache_matches_a_full_relex_after_random_edits():
+    """After any sequence of edits, the cached tokens should equal lexing the whole
+    document again"""
+    rng = random.Random(3)
+    pieces = ['"""', "x = 1", "# c", "'''", "def f(): pass", ""]
+    lines = [rng.choice(pieces) for _ in range(300)]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    highlighter = Highlighter(editor, PythonLexer(), chunk_lines=16)
+    highlighter.run_pending()
+    for _ in range(200):
+        line = rng.randrange(len(editor.text))
+        editor.move_to(line, rng.randrange(len(editor.text[line]) + 1))
+        action = rng.randrange(5)
+        if action == 0:
+            editor.append(rng.choice(pieces))
+        elif action == 1:
+            editor.add_line()
+        elif action == 2:
+            editor.cut()
+        elif action == 3:
+            editor.delete()
+        else:
+            editor.undo()
+        if rng.random() < 0.3:
+            highlighter.run_pending()
+    highlighter.run_pending()
+    expected = lex_all(PythonLexer(), editor.text)
+    assert [highlighter.tokens(i) for i in range(len(editor.text))] == expected
+
+
+def test_worker_thread_highlights_in_the_background():
+    """Once started, it should lex the document and follow edits without being
+    driven by the caller"""
+    editor = Editor(text=["x = 1"] * 1000, cursor=Cursor(line=999, char=0))
+    highlighter = Highlighter(editor, PythonLexer()).start()
+    try:
+        editor.append("if ")
+        assert highlighter.wait_until_idle(timeout=10)
+        assert kinds(editor.text[999], highlighter.tokens(999))[0] == ("if", KEYWORD)
+    finally:
+        highlighter.close()
+
+
+def test_interface_paints_tokens_once_lexed():
+    """When highlighting is on, the interface should repaint rows as the worker
+    finishes them, even while no key is pressed"""
+    editor = Editor(
+        text=["import os", "x = 1"], cursor=Cursor(line=0, char=0), file_path="a.py"
+    )
+    window = HeadlessWindow(height=5, width=20)
+    interface = TextUserInterface(
+        editor=editor, logger=NullLogger(), window=window, highlight=True
+    )
+    try:
+        editor.append("#")
+        assert interface.highlighter.wait_until_idle(timeout=10)
+        window.reset_counters()
+        interface.handle_input()
+        assert window.refreshes == 1
+        assert window.rows[:2] == ["#import os", "x = 1"]
+        window.feed([Key.ENTER.value])
+        interface.handle_input()
+        assert window.rows[:3] == ["#", "import os", "x = 1"]
+    finally:
+        interface.highlighter.close()
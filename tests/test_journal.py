@@ -0,0 +1,150 @@
+import os
+import shutil
+import time
+from src.editor import Cursor, Editor
+from src.history import DELETE, INSERT
+from src.journal import Journal, decode, encode, file_stamp, journal_path
+
+
+def crash(editor: Editor) -> bytes:
+    """Commit the journal and leave it behind as a crash would, returning it"""
+    editor.journal.flush()
+    path = editor.journal.path
+    shutil.copy(path, path + ".crashed")
+    editor.exit()
+    shutil.move(path + ".crashed", path)
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_records_round_trip():
+    """Records should decode to the operations they encode, stopping at a torn
+    last record"""
+    operations = [
+        (INSERT, 3, 1, "héllo\nworld"),
+        (DELETE, 0, 0, "\udcff"),
+        (INSERT, 7, 9, ""),
+    ]
+    data = b"".join(encode(operation) for operation in operations)
+    assert decode(data) == operations
+    assert decode(data[:-3]) == operations[:2]
+    damaged = bytearray(data)
+    damaged[len(encode(operations[0])) + 2] ^= 1
+    assert decode(bytes(damaged)) == operations[:1]
+
+
+def test_recovers_unsaved_edits_after_a_crash(tmp_path):
+    """When a file is reopened after a crash, the journaled edits should be
+    replayed onto it and left unsaved"""
+    path = tmp_path / "file.txt"
+    path.write_text("one\ntwo\nthree")
+    editor = Editor(cursor=Cursor(line=0, char=0)).from_file(str(path))
+    editor.append("x")
+    editor.cursor_down()
+    editor.add_line()
+    editor.append("new")
+    editor.cursor_down()
+    editor.cut()
+    editor.undo()
+    editor.redo()
+    expected = list(editor.text)
+    crash(editor)
+
+    recovered = Editor().from_file(str(path))
+    assert list(recovered.text) == expected
+    assert recovered.is_dirty
+    assert path.read_text() == "one\ntwo\nthree"
+    recovered.append("y")
+    expected[0] = "y" + expected[0]
+    crash(recovered)
+
+    # Recovered edits stay journaled along with the later ones
+    assert list(Editor().from_file(str(path)).text) == expected
+
+
+def test_save_resets_the_journal(tmp_path):
+    """After a save, only later edits should be journaled, and a journal that
+    no longer matches its file should be ignored"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc")
+    editor = Editor(cursor=Cursor(line=0, char=0)).from_file(str(path))
+    editor.append("x")
+    assert editor.save()
+    editor.append("y")
+    data = crash(editor)
+    assert Journal.recover(journal_path(str(path)), file_stamp(str(path))) == [
+        (INSERT, 0, 1, "y")
+    ]
+    assert list(Editor().from_file(str(path)).text) == ["xyabc"]
+
+    with open(journal_path(str(path)), "wb") as file:
+        file.write(data)
+    path.write_text("changed elsewhere")
+    assert list(Editor().from_file(str(path)).text) == ["changed elsewhere"]
+
+
+def test_clean_exit_removes_the_journal(tmp_path):
+    """When the editor exits with its edits saved, no journal should be left
+    behind"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc")
+    editor = Editor().from_file(str(path))
+    assert (tmp_path / ".file.txt.swp").exists()
+    editor.append("x")
+    assert editor.save()
+    editor.exit()
+    assert [p.name for p in tmp_path.iterdir()] == ["file.txt"]
+
+
+def test_unsaved_exit_keeps_the_journal(tmp_path, monkeypatch):
+    """When the editor exits with edits a failed save left unsaved, they
+    should stay journaled and be replayed when the file is opened again"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc")
+    editor = Editor(cursor=Cursor(line=0, char=0)).from_file(str(path))
+    editor.append("x")
+
+    def deny(source: str, destination: str):
+        raise PermissionError(destination)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", deny)
+        assert not editor.save()
+    editor.exit()
+    assert (tmp_path / ".file.txt.swp").exists()
+    assert list(Editor().from_file(str(path)).text) == ["xabc"]
+
+
+def test_other_files_are_not_overwritten(tmp_path):
+    """A file that is not a journal but has its name should be left as it is,
+    and the file edited without a journal"""
+    path = tmp_path / "file.txt"
+    path.write_text("abc")
+    other = tmp_path / ".file.txt.swp"
+    other.write_text("not a journal")
+    editor = Editor().from_file(str(path))
+    assert editor.journal is None
+    editor.append("x")
+    assert editor.save()
+    editor.exit()
+    assert other.read_text() == "not a journal"
+
+
+def test_recovery_time(tmp_path):
+    """Replaying a long session of typing should take well under a second"""
+    path = tmp_path / "file.txt"
+    path.write_text("\n".join(f"line {i}" for i in range(10_000)))
+    editor = Editor(cursor=Cursor(line=5_000, char=0)).from_file(str(path))
+    for i in range(20_000):
+        editor.append("a")
+        if i % 60 == 59:
+            editor.add_line()
+    expected = list(editor.text)
+    crash(editor)
+
+    start = time.perf_counter()
+    recovered = Editor().from_file(str(path))
+    elapsed = time.perf_counter() - start
+    assert list(recovered.text) == expected
+    assert elapsed < 1.0
+    recovered.exit()
@@ -0,0 +1,84 @@
+import curses
+import pytest
+from src.editor import Cursor, Editor
+from src.interfaces.keys import Key
+from src.tui.keymap import COMMAND, TYPING, Keymap, is_printable, parse_key
+from src.tui.modes.command_mode import TextUserInterfaceCommandMode
+from src.tui.modes.typing_mode import TextUserInterfaceTypingMode
+
+
+def test_key_codes_match_curses():
+    """The special key codes spelled out in Key should be the ones curses
+    reports"""
+    assert Key.LEFT.value == curses.KEY_LEFT
+    assert Key.RIGHT.value == curses.KEY_RIGHT
+    assert Key.UP.value == curses.KEY_UP
+    assert Key.DOWN.value == curses.KEY_DOWN
+    assert Key.BACKSPACE.value == curses.KEY_BACKSPACE
+    assert Key.PAGE_UP.value == curses.KEY_PPAGE
+    assert Key.PAGE_DOWN.value == curses.KEY_NPAGE
+
+
+def test_parse_key():
+    """When parsing binding names, it should accept characters, key names,
+    control keys and raw codes"""
+    assert parse_key("x") == ord("x")
+    assert parse_key("enter") == Key.ENTER.value
+    assert parse_key("LEFT") == Key.LEFT.value
+    assert parse_key("ctrl-z") == 26
+    assert parse_key("410") == 410
+    with pytest.raises(ValueError):
+        parse_key("hyper-x")
+
+
+def test_printable_table():
+    """When checking a key, it should only treat non-control bytes as text"""
+    assert is_printable(ord("a"))
+    assert is_printable(0xE9)
+    assert not is_printable(Key.ENTER.value)
+    assert not is_printable(0x7F)
+    assert not is_printable(Key.LEFT.value)
+    assert not is_printable(0x9F)
+    assert is_printable(0xA0)
+    assert is_printable(0xFF)
+    # Codes past a byte are curses function keys, bound or not
+    assert not is_printable(0x100)
+    assert not is_printable(0x19A)
+    assert not is_printable(-1)
+
+
+def test_keymap_from_file(tmp_path):
+    """When loading a keymap file, it should override the default bindings and
+    keep the rest"""
+    path = tmp_path / "keys.ini"
+    path.write_text("[command]\nctrl-z = undo\nU = redo\n")
+    keymap = Keymap.from_file(str(path))
+    table = keymap.table(COMMAND)
+    assert table[26] == "undo"
+    assert table[ord("U")] == "redo"
+    assert table[ord("u")] == "undo"
+    assert keymap.table(TYPING) == Keymap().table(TYPING)
+
+
+def test_keymap_rejects_unknown_actions(tmp_path):
+    """When a binding names an action the mode does not have, it should fail"""
+    path = tmp_path / "keys.ini"
+    path.write_text("[typing]\nctrl-s = save\n")
+    with pytest.raises(ValueError):
+        Keymap.from_file(str(path))
+
+
+def test_modes_use_keymap():
+    """When modes are given a keymap, they should dispatch through its bindings"""
+    keymap = Keymap({COMMAND: {"ctrl-z": "undo"}, TYPING: {"ctrl-e": "switch_mode"}})
+    editor = Editor(text=["abc"], cursor=Cursor(line=0, char=3))
+    typing_mode = TextUserInterfaceTypingMode(editor=editor, keymap=keymap)
+    typing_mode.key_actions([ord("d"), Key.ESC.value, 5, ord("e")])
+    assert editor.text == ["abcd"]
+    assert not typing_mode.is_active
+
+    command_mode = TextUserInterfaceCommandMode(editor=editor, keymap=keymap)
+    command_mode.key_action(ord("u"))
+    assert editor.text == ["abcd"]
+    command_mode.key_action(26)
+    assert editor.text == ["abc"]
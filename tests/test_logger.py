@@ -0,0 +1,81 @@
+import logging
+import threading
+from src import logger as logger_module
+from src.logger import FileLogger, Limit
+
+
+class ThreadRecorder:
+    """Argument that notes the thread it is formatted on"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "recorded"
+
+
+def test_logs_in_the_background(tmp_path):
+    """Messages, including those logged through the standard logger, should
+    be formatted off the logging thread and all be in the file once the
+    logger is closed"""
+    path = tmp_path / "editor.log"
+    logger = FileLogger(str(path))
+    argument = ThreadRecorder()
+    logger.log_debug("key %d took %s", 7, argument)
+    for i in range(1000):
+        logger.log_debug("line %d", i)
+    logger.logger.warning("through %s", "logging")
+    logger.close()
+    lines = path.read_text().splitlines()
+    assert lines[0].endswith("DEBUG key 7 took recorded")
+    assert lines[-2].endswith("line 999")
+    assert lines[-1].endswith("WARNING through logging")
+    assert len(lines) == 1002
+    assert threading.current_thread() not in argument.threads
+
+
+def test_level_and_limits(tmp_path):
+    """Messages below the level, past a category's sample or over its rate
+    should be dropped, and the drops counted"""
+    quiet = FileLogger(str(tmp_path / "quiet.log"), level=logging.INFO)
+    quiet.log_debug("never")
+    quiet.close()
+    assert (tmp_path / "quiet.log").read_text() == ""
+
+    path = tmp_path / "editor.log"
+    logger = FileLogger(
+        str(path),
+        limits={"keys": Limit(sample_every=10), "render": Limit(per_second=0.001)},
+    )
+    for i in range(100):
+        logger.log_debug("key %d", i, category="keys")
+        logger.log_debug("frame %d", i, category="render")
+        logger.log_debug("other %d", i, category="unlimited")
+    logger.close()
+    text = path.read_text()
+    assert text.count(" key ") == 10
+    # The burst goes through, then nothing refills in time
+    assert text.count(" frame ") == Limit().burst
+    assert text.count(" other ") == 100
+    assert logger.dropped == {"keys": 90, "render": 90}
+
+
+def test_rotates_by_size(tmp_path, monkeypatch):
+    """The log should be moved aside once it grows past the size limit,
+    keeping only the configured number of older logs"""
+    monkeypatch.setattr(logger_module, "MAX_BATCH_RECORDS", 10)
+    monkeypatch.setattr(logger_module, "FLUSH_INTERVAL", 0)
+    path = tmp_path / "editor.log"
+    logger = FileLogger(str(path), max_bytes=2000, backup_count=2)
+    for i in range(500):
+        logger.log_debug("message %d", i)
+    logger.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "editor.log",
+        "editor.log.1",
+        "editor.log.2",
+    ]
+    newest = (tmp_path / "editor.log.1").read_text() + path.read_text()
+    assert newest.splitlines()[-1].endswith("message 499")
+    assert all(p.stat().st_size < 3000 for p in tmp_path.iterdir())
@@ -0,0 +1,90 @@
+from src.buffers import line_index
+from src.buffers.line_index import LineIndex
+from src.buffers.mapped_buffer import MappedBuffer
+from src.editor import Cursor, Editor
+
+
+def write_lines(tmp_path, content: str):
+    path = tmp_path / "file.txt"
+    path.write_text(content)
+    return str(path)
+
+
+def test_line_index_matches_split(monkeypatch):
+    """The index should find the same lines as splitting the text, even across scan chunks"""
+    monkeypatch.setattr(line_index, "SCAN_CHUNK_SIZE", 7)
+    content = "first\n\nthird line is longer\nfourth\n"
+    index = LineIndex(content.encode())
+    assert index.line_count() == len(content.split("\n"))
+    assert [index.line(i) for i in range(index.line_count())] == content.split("\n")
+
+
+def test_line_index_scans_on_demand(monkeypatch):
+    """When asking for an early line, only the beginning of the data should be scanned"""
+    monkeypatch.setattr(line_index, "SCAN_CHUNK_SIZE", 16)
+    index = LineIndex(b"".join(b"line %d\n" % i for i in range(1000)))
+    assert index.line(1) == "line 1"
+    assert not index.is_complete
+
+
+def test_mapped_buffer_reads_file(tmp_path):
+    """A mapped buffer should expose the file lines without being touched"""
+    buffer = MappedBuffer.from_file(write_lines(tmp_path, "a\nb\nc"))
+    assert list(buffer.lines()) == ["a", "b", "c"]
+    assert buffer.line(2) == "c" and not buffer.has_line(3)
+    assert not buffer.is_touched
+    buffer.close()
+
+
+def test_mapped_buffer_empty_file(tmp_path):
+    """An empty file should load as a single empty line"""
+    buffer = MappedBuffer.from_file(write_lines(tmp_path, ""))
+    assert list(buffer.lines()) == [""]
+    buffer.close()
+
+
+def test_mapped_buffer_edits(tmp_path):
+    """When edited, the buffer should keep the untouched lines from the file"""
+    content = "\n".join(f"line {i}" for i in range(5000))
+    buffer = MappedBuffer.from_file(write_lines(tmp_path, content))
+    buffer.set_line(2500, "edited")
+    buffer.insert_lines(0, ["new"])
+    buffer.delete_lines(4000, 4001)
+    expected = content.split("\n")
+    expected[2500] = "edited"
+    expected.insert(0, "new")
+    del expected[4000]
+    assert buffer.is_touched
+    assert list(buffer.lines()) == expected
+    buffer.close()
+
+
+def test_mapped_buffer_edits_before_indexing(monkeypatch):
+    """The first edit should not wait for the whole file to be indexed, and
+    lines past the ones indexed should follow the edited ones"""
+    monkeypatch.setattr(line_index, "SCAN_CHUNK_SIZE", 64)
+    lines = [f"line {i}" for i in range(1000)]
+    index = LineIndex("\n".join(lines).encode())
+    buffer = MappedBuffer(index=index)
+    buffer.set_line(1, "edited")
+    buffer.insert_lines(3, ["new"])
+    assert buffer.is_touched and not index.is_complete
+    assert buffer.line(500) == "line 499"
+    buffer.delete_lines(998, 1001)
+    lines[1:2] = ["edited"]
+    lines[3:3] = ["new"]
+    del lines[998:]
+    assert len(buffer) == len(lines)
+    assert list(buffer.lines()) == lines
+
+
+def test_editor_with_mapped_buffer(tmp_path):
+    """The editor should edit and save a mapped file like any other"""
+    path = write_lines(tmp_path, "abc\ndef")
+    editor = Editor(cursor=Cursor(line=0, char=0), buffer_type=MappedBuffer)
+    editor.from_file(path)
+    editor.cursor_down()
+    editor.append("x")
+    editor.save()
+    with open(path) as file:
+        assert file.read() == "abc\nxdef"
@@ -0,0 +1,107 @@
+import pytest
+from src import pager
+from src.interfaces.keys import Key
+from src.pager import FileStream
+from src.tui.headless_window import HeadlessWindow
+from src.tui.pager import Pager
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Read and index in chunks a few lines long, so every test crosses them"""
+    monkeypatch.setattr(pager, "READ_CHUNK_SIZE", 16)
+    monkeypatch.setattr(pager, "SCAN_CHUNK_SIZE", 32)
+    monkeypatch.setattr(pager, "CHECKPOINT_SPACING", 32)
+    monkeypatch.setattr(pager, "MAX_CHECKPOINTS", 4)
+    monkeypatch.setattr(pager, "MAX_LINE_BYTES", 40)
+
+
+def write_lines(path, count: int):
+    path.write_text("".join(f"line {i}\n" for i in range(count)))
+
+
+def test_stream_navigation(tmp_path, small_chunks):
+    """Lines should be found by offset and by index across chunks, with the
+    line index staying within its bounds"""
+    path = tmp_path / "file.log"
+    write_lines(path, 1000)
+    stream = FileStream(str(path))
+    offset = stream.line_offset(500)
+    assert stream.lines(offset, 2) == [(offset, "line 500"), (offset + 9, "line 501")]
+    assert stream.line_number(offset) == 500
+    assert stream.line_offset(1000) is None
+    assert stream.line_start(offset + 3) == offset
+    assert stream.previous_line_start(offset) == stream.line_offset(499)
+    assert stream.next_line_start(offset) == stream.line_offset(501)
+    assert stream.lines(stream.tail_start(2), 5)[0][1] == "line 998"
+    assert stream.memory_size() <= 2 * 8 * (pager.MAX_CHECKPOINTS + 1)
+    stream.close()
+
+
+def test_stream_long_lines(tmp_path, small_chunks):
+    """Lines longer than a chunk should be cut at the maximum shown, and the
+    lines after them still be found"""
+    path = tmp_path / "file.log"
+    path.write_text("short\n" + "x" * 100 + "\nafter")
+    stream = FileStream(str(path))
+    assert stream.lines(0, 5) == [(0, "short"), (6, "x" * 40), (107, "after")]
+    assert stream.previous_line_start(107) == 6
+    stream.close()
+
+
+def test_stream_format(tmp_path):
+    """Lines should be decoded in the file's encoding, without the "\\r" of
+    CRLF line breaks"""
+    path = tmp_path / "file.log"
+    path.write_bytes(b"caf\xe9\r\nna\xefve\r\nlast\r")
+    stream = FileStream(str(path))
+    assert [text for _, text in stream.lines(0, 5)] == ["café", "naïve", "last\r"]
+    stream.close()
+
+
+def test_pager_moves(tmp_path, small_chunks):
+    """Paging, counts and jumps should show the right lines and say where
+    they are in the status line"""
+    path = tmp_path / "file.log"
+    write_lines(path, 100)
+    window = HeadlessWindow(height=5, width=40)
+    viewer = Pager(FileStream(str(path)), window=window)
+    assert window.rows[:4] == ["line 0", "line 1", "line 2", "line 3"]
+    assert window.rows[4].startswith("line 1  byte 0/")
+    window.feed([Key.PAGE_DOWN.value, ord("j")])
+    viewer.handle_input()
+    assert window.rows[0] == "line 4"
+    window.feed([ord(key) for key in "50G"])
+    viewer.handle_input()
+    assert window.rows[0] == "line 49"
+    assert window.rows[4].startswith("line 50  ")
+    window.feed([ord("G")])
+    viewer.handle_input()
+    assert window.rows[:4] == ["line 96", "line 97", "line 98", "line 99"]
+    window.feed([ord(key) for key in "18o"])
+    viewer.handle_input()
+    assert window.rows[0] == "line 2"
+    window.feed([ord("q")])
+    with pytest.raises(StopIteration):
+        viewer.handle_input()
+
+
+def test_pager_follows(tmp_path):
+    """While following, data appended to the file should be shown, and the
+    file left as it is"""
+    path = tmp_path / "file.log"
+    write_lines(path, 10)
+    window = HeadlessWindow(height=3, width=40)
+    viewer = Pager(FileStream(str(path)), window=window, follow=True)
+    assert window.rows[:2] == ["line 8", "line 9"]
+    with open(path, "a") as file:
+        file.write("line 10\nline 11\n")
+    viewer.handle_input()
+    assert window.rows[:2] == ["line 10", "line 11"]
+    assert "following" in window.rows[2]
+    # Rotated: the new file is followed from its end
+    path.write_text("fresh\n")
+    viewer.handle_input()
+    assert window.rows[0] == "fresh"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["file.log"]
+    viewer.close()
@@ -0,0 +1,120 @@
+import json
+import random
+import time
+from src.editor import Cursor, Editor
+from src.profiling import (
+    DECODE,
+    DISPATCH,
+    MUTATION,
+    RENDER,
+    STAGES,
+    TOTAL,
+    LatencyHistogram,
+    LatencyMonitor,
+)
+from src.tui.headless_window import HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface
+
+
+def test_histogram_percentiles():
+    """When recording durations, percentiles should be within a bucket of the
+    exact ones"""
+    random.seed(1)
+    samples = [int(random.lognormvariate(10, 1.5)) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for sample in samples:
+        histogram.record(sample)
+    samples.sort()
+    for fraction in (0.5, 0.95, 0.99):
+        exact = samples[int(fraction * len(samples)) - 1]
+        assert exact <= histogram.percentile(fraction) <= exact * 1.25
+    assert histogram.count == len(samples)
+    assert histogram.max == samples[-1]
+
+
+def test_histogram_rolling_percentiles_follow_recent_samples():
+    """When the workload gets slower, rolling percentiles should follow it"""
+    histogram = LatencyHistogram()
+    for _ in range(10000):
+        histogram.record(1000)
+    for _ in range(5000):
+        histogram.record(1_000_000)
+    assert histogram.percentile(0.5) < 2000
+    assert histogram.percentile(0.5, rolling=True) >= 1_000_000
+
+
+def test_editor_counts_mutation_time():
+    """When running nested edit commands, their time should be counted once"""
+    editor = Editor(text=["abc"], cursor=Cursor(line=0, char=3))
+    editor.cut()
+    first = editor.mutation_ns
+    assert first > 0
+    editor.paste()
+    editor.undo()
+    assert editor.mutation_ns > first
+
+
+def test_interface_records_latency_and_shows_hud(tmp_path):
+    """When a monitor is attached, every batch should be timed per stage and
+    the HUD drawn in the status line"""
+    editor = Editor(text=["abc"], cursor=Cursor(line=0, char=3))
+    window = HeadlessWindow(height=5, width=200)
+    latency = LatencyMonitor(hud=True)
+    interface = TextUserInterface(
+        editor=editor, logger=NullLogger(), window=window, latency=latency
+    )
+    for key in "def":
+        window.feed([ord(key)])
+        interface.handle_input()
+
+    assert editor.text == ["abcdef"]
+    for stage in STAGES:
+        assert latency.histogram(stage).count == 3
+    assert latency.histogram(MUTATION).max > 0
+    assert latency.histogram(DISPATCH).max > 0
+    assert latency.histogram(RENDER).max > 0
+    assert window.rows[4].startswith("us p50/95/99  dec ")
+
+    path = tmp_path / "latency.json"
+    latency.dump(str(path))
+    summary = json.loads(path.read_text())
+    assert set(summary) == set(STAGES)
+    assert summary["total"]["count"] == 3
+
+
+class WaitingWindow(HeadlessWindow):
+    """Sleeps out a getch timeout when no key is waiting, as curses does"""
+
+    def __init__(self):
+        super().__init__()
+        self.delay = -1
+
+    def timeout(self, delay: int):
+        super().timeout(delay)
+        self.delay = delay
+
+    def nodelay(self, flag: bool):
+        super().nodelay(flag)
+        self.delay = 0 if flag else -1
+
+    def getch(self) -> int:
+        if not self.keys and self.delay > 0:
+            time.sleep(self.delay / 1000)
+        return super().getch()
+
+
+def test_frame_wait_is_not_latency():
+    """Time spent waiting out the frame cap for more keys should not count as
+    decoding the keys"""
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0))
+    window = WaitingWindow()
+    latency = LatencyMonitor()
+    interface = TextUserInterface(
+        editor=editor, logger=NullLogger(), window=window, latency=latency, max_fps=5
+    )
+    window.feed([ord("a")])
+    started = time.perf_counter_ns()
+    interface.handle_input()
+    assert time.perf_counter_ns() - started > 100_000_000
+    assert latency.histogram(DECODE).max < 50_000_000
+    assert latency.histogram(TOTAL).max < 100_000_000
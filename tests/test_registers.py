@@ -0,0 +1,34 @@
+from src.registers import UNNAMED, Register, Registers
+
+
+def test_register_spills_to_file():
+    """When a register grows past its spill size, it should move to a temporary
+    file and still give back the same text"""
+    chunks = [f"line {i}\n" for i in range(1000)] + ["\udcff\r\n"]
+    register = Register(chunks, spill_size=100)
+    assert register.is_spilled
+    assert register.text() == "".join(chunks)
+    assert register.size == len("".join(chunks))
+    register.close()
+    assert register.text() == ""
+
+
+def test_small_register_stays_in_memory():
+    """When a register is small, it should not touch the disk"""
+    register = Register(["abc", "def"], spill_size=100)
+    assert not register.is_spilled
+    assert register.text() == "abcdef"
+
+
+def test_unnamed_register_follows_last_write():
+    """When writing to any register, the unnamed register should refer to it"""
+    registers = Registers()
+    registers.store(["one"])
+    registers.store(["two"], "a")
+    assert registers.get().text() == "two"
+    assert registers.get(UNNAMED).text() == "two"
+    registers.store(["three"])
+    assert registers.get().text() == "three"
+    assert registers.get("a").text() == "two"
+    assert registers.get("b") is None
+    assert registers.names() == [UNNAMED, "a"]
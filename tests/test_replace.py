@@ -0,0 +1,92 @@
+import pytest
+from src import replace
+from src.editor import Cursor, Editor
+from src.replace import Replacer, replace_all, replace_in_files
+from src.search import Finder
+from src.tui.modes.command_mode import TextUserInterfaceCommandMode
+
+
+def test_replace_all_literal():
+    """Every occurrence should be replaced, with backslashes in the replacement
+    kept as they are, and the whole replace undone in one step"""
+    lines = ["a.b a.b", "none", "xa.b"]
+    editor = Editor(text=lines, cursor=Cursor(line=2, char=3))
+    assert replace_all(editor, "a.b", r"c\d") == 3
+    assert editor.text == [r"c\d c\d", "none", r"xc\d"]
+    assert (editor.cursor["line"], editor.cursor["char"]) == (2, 3)
+    editor.undo()
+    assert editor.text == lines
+
+
+def test_replace_all_regex():
+    """Regex patterns should be able to refer to their groups, and
+    replacements with line breaks should split lines"""
+    editor = Editor(text=["id=12 id=3", "x"], cursor=Cursor(line=0, char=0))
+    assert replace_all(editor, r"id=(\d+)", r"<\1>", regex=True) == 2
+    assert editor.text == ["<12> <3>", "x"]
+    assert replace_all(editor, " ", "\n") == 1
+    assert editor.text == ["<12>", "<3>", "x"]
+
+
+def test_replace_all_in_runs(monkeypatch):
+    """Matches scattered over many chunks should all be replaced, and nothing
+    else changed"""
+    monkeypatch.setattr(replace, "SCAN_LINES", 7)
+    monkeypatch.setattr(replace, "MERGE_GAP", 3)
+    lines = [f"{i} foo" if i % 5 == 0 else str(i) for i in range(200)]
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    assert replace_all(editor, "foo", "bar", start=(10, 2)) == 38
+    expected = [
+        line.replace("foo", "bar") if i >= 10 else line for i, line in enumerate(lines)
+    ]
+    assert editor.text == expected
+
+
+def test_replace_with_confirmation():
+    """Answering yes, no and all should replace the chosen matches from the
+    cursor down"""
+    editor = Editor(text=["foo foo", "foo", "foo foo"], cursor=Cursor(line=0, char=1))
+    finder = Finder(editor)
+    mode = TextUserInterfaceCommandMode(
+        editor=editor, finder=finder, replacer=Replacer(editor)
+    )
+    mode.key_actions([ord(key) for key in "/foo"] + [10])
+    assert (editor.cursor["line"], editor.cursor["char"]) == (0, 4)
+    mode.key_actions([ord(key) for key in "Rbar"] + [10])
+    assert mode.replacer.is_confirming
+    mode.key_actions([ord("y"), ord("n"), ord("a")])
+    assert editor.text == ["foo bar", "foo", "bar bar"]
+    assert mode.message() == "3 replaced"
+    assert not mode.replacer.is_active
+
+
+def test_replace_within_lines():
+    """Matches found across a line break should be passed over, and others
+    replaced only as far as the end of their line"""
+    editor = Editor(text=["ax", "xb ", "cb"])
+    replacer = Replacer(editor)
+    replacer.start("x\\nx|b\\s*", regex=True)
+    replacer.type("B")
+    replacer.confirm()
+    while replacer.is_confirming:
+        replacer.replace()
+    assert editor.text == ["ax", "xB", "cB"]
+    assert replacer.summary == "2 replaced"
+    replacer.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_replace_in_files(tmp_path, workers):
+    """Every file should be saved with its matches replaced, and files that
+    cannot be edited reported"""
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"file{index}.txt"
+        path.write_text(f"old {index}\nold\nkeep")
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.txt")
+    results = dict(replace_in_files(paths + [missing], "old", "new", workers=workers))
+    assert [results[path] for path in paths] == [2] * 5
+    assert "not found" in results[missing]
+    assert (tmp_path / "file3.txt").read_text() == "new 3\nnew\nkeep"
+    assert not (tmp_path / "missing.txt").exists()
@@ -0,0 +1,57 @@
+import random
+from src.buffers.list_buffer import ListBuffer
+from src.buffers.rope_buffer import LEAF_CAPACITY, RopeBuffer
+
+
+def test_rope_from_lines():
+    """When built from a list of lines, the rope should expose the same lines in order"""
+    lines = [f"line {i}" for i in range(LEAF_CAPACITY * 40)]
+    buffer = RopeBuffer(lines)
+    assert len(buffer) == len(lines)
+    assert list(buffer.lines()) == lines
+    assert buffer.line(LEAF_CAPACITY * 20 + 3) == lines[LEAF_CAPACITY * 20 + 3]
+
+
+def test_rope_partial_iteration():
+    """When iterating a range of lines, it should only yield the lines in that range"""
+    lines = [str(i) for i in range(5000)]
+    buffer = RopeBuffer(lines)
+    assert list(buffer.lines(1234, 2345)) == lines[1234:2345]
+    assert list(buffer.lines(4990, 9999)) == lines[4990:]
+
+
+def test_rope_bulk_insert_and_delete():
+    """When inserting or deleting large blocks, the rope should split and merge its chunks transparently"""
+    buffer = RopeBuffer(["a", "b"])
+    block = [str(i) for i in range(100_000)]
+    buffer.insert_lines(1, block)
+    assert len(buffer) == 100_002
+    assert buffer.line(0) == "a" and buffer.line(1) == "0"
+    assert buffer.line(100_001) == "b"
+    buffer.delete_lines(1, 100_001)
+    assert list(buffer.lines()) == ["a", "b"]
+
+
+def test_rope_matches_list_buffer():
+    """Any sequence of edits should leave the rope with the same contents as a plain list"""
+    rng = random.Random(7)
+    rope = RopeBuffer([str(i) for i in range(3000)])
+    reference = ListBuffer([str(i) for i in range(3000)])
+    for step in range(3000):
+        operation = rng.random()
+        if operation < 0.4:
+            index = rng.randint(0, len(reference))
+            lines = [f"new {step} {k}" for k in range(rng.randint(1, 700))]
+            rope.insert_lines(index, lines)
+            reference.insert_lines(index, lines)
+        elif operation < 0.8 and len(reference) > 0:
+            start = rng.randint(0, len(reference) - 1)
+            stop = min(len(reference), start + rng.randint(1, 700))
+            rope.delete_lines(start, stop)
+            reference.delete_lines(start, stop)
+        elif len(reference) > 0:
+            index = rng.randint(0, len(reference) - 1)
+            rope.set_line(index, f"set {step}")
+            reference.set_line(index, f"set {step}")
+        assert len(rope) == len(reference)
+    assert list(rope.lines()) == list(reference.lines())
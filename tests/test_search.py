@@ -0,0 +1,91 @@
+from src import search
+from src.editor import Cursor, Editor
+from src.search import Finder, SearchIndex
+
+
+def make_index(lines, block_lines=None, monkeypatch=None):
+    if block_lines is not None:
+        monkeypatch.setattr(search, "BLOCK_LINES", block_lines)
+    editor = Editor(text=lines, cursor=Cursor(line=0, char=0))
+    return editor, SearchIndex(editor)
+
+
+def test_find_forward():
+    """It should find the first match at or after the given position"""
+    editor, index = make_index(["foo bar", "baz bar"])
+    assert index.find("bar", 0, 0) == (0, 4, 3)
+    assert index.find("bar", 0, 5) == (1, 4, 3)
+
+
+def test_find_wraps_around():
+    """When there are no more matches below, it should continue from the top"""
+    editor, index = make_index(["bar", "foo", "foo"])
+    assert index.find("bar", 1, 0) == (0, 0, 3)
+
+
+def test_find_backward():
+    """When searching backward, it should find the last match before the position"""
+    editor, index = make_index(["bar", "bar bar", "foo"])
+    assert index.find("bar", 1, 4, backward=True) == (1, 0, 3)
+    assert index.find("bar", 0, 0, backward=True) == (1, 4, 3)
+
+
+def test_find_regex():
+    """Regex queries should match within lines"""
+    editor, index = make_index(["id=12", "id=345"])
+    assert index.find(r"id=\d{3}", 0, 0, regex=True) == (1, 0, 6)
+    assert index.find(r"^\d", 0, 0, regex=True) is None
+    assert index.find("(", 0, 0, regex=True) is None
+
+
+def test_find_across_blocks(monkeypatch):
+    """Matches should be found in any block of the document"""
+    lines = [f"line {i}" for i in range(50)]
+    editor, index = make_index(lines, block_lines=4, monkeypatch=monkeypatch)
+    assert index.find("line 37", 10, 0) == (37, 0, 7)
+    assert index.find("line 3", 10, 0, backward=True) == (3, 0, 6)
+
+
+def test_index_follows_edits(monkeypatch):
+    """After editing, searches should see the new text and line numbers"""
+    lines = [f"line {i}" for i in range(50)]
+    editor, index = make_index(lines, block_lines=4, monkeypatch=monkeypatch)
+    assert index.find("line 30", 0, 0) == (30, 0, 7)
+    editor.move_to(5, 0)
+    for _ in range(20):
+        editor.add_line()
+    editor.append("needle")
+    editor.move_to(55, 0)
+    editor.cut()
+    assert index.find("needle", 0, 0) == (25, 0, 6)
+    assert index.find("line 30", 0, 0) == (50, 0, 7)
+    assert index.find("line 35", 0, 0) is None
+
+
+def test_finder_search_as_you_type():
+    """While typing a query, the cursor should jump to the first match and go back on cancel"""
+    editor = Editor(text=["alpha", "beta", "gamma"], cursor=Cursor(line=0, char=1))
+    finder = Finder(editor)
+    finder.start()
+    finder.type("g")
+    assert (editor.cursor["line"], editor.cursor["char"]) == (2, 0)
+    finder.backspace()
+    finder.type("et")
+    assert (editor.cursor["line"], editor.cursor["char"]) == (1, 1)
+    finder.cancel()
+    assert (editor.cursor["line"], editor.cursor["char"]) == (0, 1)
+
+
+def test_finder_next():
+    """After confirming a query, next and previous should move between matches"""
+    editor = Editor(text=["ab", "ab", "ab"], cursor=Cursor(line=0, char=0))
+    finder = Finder(editor)
+    finder.start()
+    finder.type("ab")
+    finder.confirm()
+    finder.next()
+    assert editor.cursor["line"] == 1
+    finder.next()
+    assert editor.cursor["line"] == 2
+    finder.previous()
+    assert editor.cursor["line"] == 1
@@ -0,0 +1,119 @@
+import subprocess
+import sys
+from src.editor import Cursor, Editor
+from src.interfaces.keys import Key
+from src.search import SearchIndex
+from src.tui import tui
+from src.tui.headless_window import HeadlessWindow, NullLogger
+from src.tui.tui import TextUserInterface, show_preview
+
+
+def make_interface(lines, cursor):
+    editor = Editor(text=lines, cursor=cursor)
+    window = HeadlessWindow(height=5, width=20)
+    interface = TextUserInterface(editor=editor, logger=NullLogger(), window=window)
+    return editor, window, interface
+
+
+def test_pending_keys_are_handled_in_one_batch():
+    """All the keys already waiting should be applied before drawing a single frame"""
+    editor, window, interface = make_interface([""], Cursor(line=0, char=0))
+    window.reset_counters()
+    window.feed([ord(c) for c in "ab"] + [Key.ENTER.value] + [ord("c")])
+    interface.handle_input()
+    assert editor.text == ["ab", "c"]
+    assert window.refreshes == 1
+    assert window.rows[:2] == ["ab", "c"]
+
+
+def test_renders_at_most_max_fps():
+    """A key coming within a frame of the last render should wait out the rest
+    of the frame, taking in the keys typed meanwhile, before it is drawn"""
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0))
+    window = HeadlessWindow()
+    interface = TextUserInterface(
+        editor=editor, logger=NullLogger(), window=window, max_fps=10
+    )
+    window.feed([ord("a")])
+    interface.handle_input()
+    assert editor.text == ["a"]
+    assert 50 < max(window.waits) <= 100
+
+
+def test_batch_switches_modes():
+    """Keys after a mode switch in the same batch should be handled by the new mode"""
+    editor, window, interface = make_interface(["abc"], Cursor(line=0, char=3))
+    window.feed([ord("d"), Key.ESC.value, ord("u"), ord("a"), ord("e")])
+    interface.handle_input()
+    assert editor.text == ["abce"]
+
+
+def test_max_batch_keys():
+    """A batch should never take more keys than the configured maximum"""
+    editor = Editor(text=[""], cursor=Cursor(line=0, char=0))
+    window = HeadlessWindow()
+    interface = TextUserInterface(
+        editor=editor, logger=NullLogger(), window=window, max_batch_keys=2
+    )
+    window.feed([ord(c) for c in "abc"])
+    interface.handle_input()
+    assert editor.text == ["ab"]
+
+
+def test_type_at_several_cursors():
+    """Keys typed with extra cursors should edit every line in one frame,
+    with the extra cursors drawn, until they are cleared"""
+    editor, window, interface = make_interface(
+        ["ab", "cd", "ef"], Cursor(line=0, char=2)
+    )
+    window.feed([Key.ESC.value] + [ord(c) for c in "2ca"])
+    interface.handle_input()
+    assert editor.extra_cursors == [(1, 2), (2, 2)]
+    assert window.rows[:3] == ["ab", "cd ", "ef "]
+    window.reset_counters()
+    window.feed([ord(c) for c in "xy"])
+    interface.handle_input()
+    assert editor.text == ["abxy", "cdxy", "efxy"]
+    assert window.rows[:3] == ["abxy", "cdxy ", "efxy "]
+    assert window.refreshes == 1
+    window.feed([Key.ESC.value, ord("K")])
+    interface.handle_input()
+    assert window.rows[:3] == ["abxy", "cdxy", "efxy"]
+
+
+def test_preview(tmp_path):
+    """The preview should paint the first screenful of the file, leaving the
+    status row free"""
+    path = tmp_path / "file.txt"
+    path.write_text("\n".join(f"line {i}" for i in range(100)))
+    window = HeadlessWindow(height=5, width=20)
+    show_preview(str(path), window)
+    assert window.rows == ["line 0", "line 1", "line 2", "line 3", ""]
+    assert window.refreshes == 1
+
+
+def test_startup_imports():
+    """Starting should not import the process pool, which only batch runs
+    need, nor curses until a window is opened"""
+    deferred = ["concurrent.futures.process", "curses", "logging.handlers"]
+    code = f"import main, sys; print([m for m in {deferred!r} if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_search_and_replace_share_an_index(monkeypatch):
+    """Searching and replacing should cache the document's text once"""
+    created = []
+
+    class CountedIndex(SearchIndex):
+        def __init__(self, editor: Editor):
+            super().__init__(editor)
+            created.append(self)
+
+    monkeypatch.setattr(tui, "SearchIndex", CountedIndex)
+    editor, window, interface = make_interface(["foo"], Cursor(line=0, char=0))
+    window.feed([Key.ESC.value] + [ord(key) for key in "/foo"] + [10])
+    interface.handle_input()
+    assert len(created) == 1
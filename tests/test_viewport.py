@@ -0,0 +1,135 @@
+from src.editor import Cursor, Editor
+from src.tui.viewport import Viewport
+from src.tui.wrap import WrapLayout, wrap_points
+
+
+class RecordingWindow:
+    def __init__(self, height: int, width: int):
+        self.size = (height, width)
+        self.rows = [""] * height
+        self.drawn_rows = []
+        self.cursor = (0, 0)
+
+    def getmaxyx(self):
+        return self.size
+
+    def move(self, row, column):
+        self.cursor = (row, column)
+
+    def clrtoeol(self):
+        self.rows[self.cursor[0]] = ""
+
+    def addnstr(self, row, column, text, count, attribute):
+        self.rows[row] = text[:count]
+        self.drawn_rows.append(row)
+
+    def refresh(self):
+        pass
+
+
+def make_viewport(lines, cursor, height=3, width=10, wrap=False):
+    editor = Editor(text=lines, cursor=cursor)
+    viewport = Viewport(WrapLayout() if wrap else None)
+    editor.add_listener(viewport.invalidate)
+    window = RecordingWindow(height, width)
+    viewport.render(window, editor)
+    window.drawn_rows.clear()
+    return editor, viewport, window
+
+
+def test_render_only_visible_lines():
+    """The first render should only draw the lines that fit in the window"""
+    editor, viewport, window = make_viewport(
+        [str(i) for i in range(100)], Cursor(line=0, char=0)
+    )
+    assert window.rows == ["0", "1", "2"]
+
+
+def test_render_only_dirty_rows():
+    """When typing in a line, only that row should be redrawn"""
+    editor, viewport, window = make_viewport(
+        ["aaa", "bbb", "ccc"], Cursor(line=1, char=0)
+    )
+    editor.append("x")
+    viewport.render(window, editor)
+    assert window.drawn_rows == [1]
+    assert window.rows == ["aaa", "xbbb", "ccc"]
+
+
+def test_render_shifted_rows():
+    """When a line is inserted, the rows below it should be redrawn"""
+    editor, viewport, window = make_viewport(
+        ["aaa", "bbb", "ccc"], Cursor(line=0, char=3)
+    )
+    editor.add_line()
+    viewport.render(window, editor)
+    assert window.drawn_rows == [0, 2]
+    assert window.rows == ["aaa", "", "bbb"]
+
+
+def test_render_scrolls_to_cursor():
+    """When the cursor goes below the window, the viewport should scroll to keep it visible"""
+    editor, viewport, window = make_viewport(
+        [str(i) for i in range(100)], Cursor(line=2, char=0)
+    )
+    editor.cursor_down()
+    viewport.render(window, editor)
+    assert viewport.top == 1
+    assert window.rows == ["1", "2", "3"]
+    assert window.cursor == (2, 0)
+
+
+def test_wrap_points():
+    """Long lines should wrap after the last space that fits, or at the width"""
+    assert wrap_points("short", 10) == (0,)
+    assert wrap_points("aaaa bbbb cccc", 10) == (0, 10)
+    assert wrap_points("abcdefghijklmnopqrstuvwxyz", 10) == (0, 10, 20)
+
+
+def test_render_wrapped_lines():
+    """With wrapping, a long line should take several rows and keep its text
+    in one line of the editor"""
+    editor, viewport, window = make_viewport(
+        ["0123456789abcdefghij", "x"], Cursor(line=0, char=15), wrap=True
+    )
+    assert window.rows == ["0123456789", "abcdefghij", "x"]
+    assert window.cursor == (1, 5)
+    assert len(editor.text) == 2
+
+
+def test_render_wrapped_line_growing_a_row():
+    """When a line wraps onto one more row, only it and the rows below it
+    should be redrawn"""
+    editor, viewport, window = make_viewport(
+        ["top", "0123456789", "x", "y"], Cursor(line=1, char=10), height=4, wrap=True
+    )
+    editor.append("a")
+    viewport.render(window, editor)
+    assert window.rows == ["top", "0123456789", "a", "x"]
+    assert window.drawn_rows == [1, 2, 3]
+
+
+def test_move_by_screen_rows():
+    """Moving up and down should go through the rows of wrapped lines, keeping
+    the column, and scroll by rows"""
+    editor, viewport, window = make_viewport(
+        ["0123456789" * 3, "ab", "0123456789" * 2],
+        Cursor(line=0, char=4),
+        height=2,
+        wrap=True,
+    )
+    layout = viewport.layout
+    layout.move(editor, 1)
+    assert (editor.cursor["line"], editor.cursor["char"]) == (0, 14)
+    layout.move(editor, 2)
+    assert (editor.cursor["line"], editor.cursor["char"]) == (1, 2)
+    layout.move(editor, 1)
+    assert (editor.cursor["line"], editor.cursor["char"]) == (2, 4)
+    viewport.render(window, editor)
+    assert window.rows == ["ab", "0123456789"]
+    assert window.cursor == (1, 4)
+    layout.move(editor, -2)
+    assert (editor.cursor["line"], editor.cursor["char"]) == (0, 24)
+    viewport.render(window, editor)
+    assert window.rows == ["0123456789", "ab"]
+    assert window.cursor == (0, 4)
@@ -0,0 +1,97 @@
+import os
+import time
+from src import watcher as watcher_module
+from src.editor import Cursor, Editor
+from src.watcher import FileWatcher, diff_lines
+
+
+def rewrite(path, text: str):
+    """Write the file as another program would, making sure its stamp moves"""
+    stat = os.stat(path)
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_diff_lines():
+    """Only the runs of lines that differ should be reported, in order"""
+    old = ["a", "b", "c", "d", "e"]
+    assert diff_lines(old, old) == []
+    assert diff_lines(old, ["a", "B", "c", "d", "e", "f"]) == [
+        (1, 2, 1, 2),
+        (5, 5, 5, 6),
+    ]
+    assert diff_lines(old, ["c", "d"]) == [(0, 2, 0, 0), (4, 5, 2, 2)]
+
+
+def test_merges_into_clean_text(tmp_path):
+    """When the file changes and the text has no unsaved edits, it should
+    become the new file, stay clean, and keep the cursor on its line"""
+    path = tmp_path / "file.txt"
+    path.write_text("one\ntwo\nthree")
+    editor = Editor(cursor=Cursor(line=2, char=3)).from_file(str(path))
+    watcher = FileWatcher(editor)
+    assert not watcher.check()
+    rewrite(path, "zero\none\ntwo\nthree")
+    assert watcher.check()
+    assert list(editor.text) == ["zero", "one", "two", "three"]
+    assert not editor.is_dirty
+    assert (editor.cursor["line"], editor.cursor["char"]) == (3, 3)
+    assert watcher.take_notice().startswith("File changed on disk")
+    assert watcher.take_notice() is None
+    assert not watcher.check()
+    watcher.stop()
+    editor.exit()
+
+
+def test_keeps_unsaved_edits(tmp_path):
+    """Changes to lines with unsaved edits should be left out of the merge,
+    and the rest merged around them"""
+    path = tmp_path / "file.txt"
+    path.write_text("a\nb\nc\nd\ne")
+    editor = Editor(cursor=Cursor(line=3, char=0)).from_file(str(path))
+    watcher = FileWatcher(editor)
+    editor.append("mine ")
+    rewrite(path, "A\nb\nc\nD\ne\nf")
+    assert watcher.check()
+    assert list(editor.text) == ["A", "b", "c", "mine d", "e", "f"]
+    assert editor.is_dirty
+    assert (editor.cursor["line"], editor.cursor["char"]) == (3, 5)
+    assert "1 block(s) with unsaved edits kept" in watcher.take_notice()
+    # The merge is an undo step of its own
+    editor.undo()
+    assert list(editor.text) == ["a", "b", "c", "mine d", "e"]
+    watcher.stop()
+    editor.exit()
+
+
+def test_reports_changes_to_large_files(tmp_path, monkeypatch):
+    """A file over the merge limit should not be read when it changes, only
+    reported once"""
+    monkeypatch.setattr(watcher_module, "MAX_MERGE_BYTES", 8)
+    path = tmp_path / "file.txt"
+    path.write_text("small")
+    editor = Editor().from_file(str(path))
+    watcher = FileWatcher(editor)
+    rewrite(path, "now too large")
+    assert not watcher.check()
+    assert list(editor.text) == ["small"]
+    assert watcher.take_notice() == "File changed on disk: too large to merge"
+    assert not watcher.check()
+    assert watcher.take_notice() is None
+    watcher.stop()
+    editor.exit()
+
+
+def test_notices_changes_in_the_background(tmp_path):
+    """A started watcher should merge a change without being asked"""
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    editor = Editor(cursor=Cursor(line=0, char=0)).from_file(str(path))
+    watcher = FileWatcher(editor, interval=0.01).start()
+    rewrite(path, "new\nlines")
+    deadline = time.monotonic() + 5
+    while watcher.merges == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    watcher.stop()
+    assert list(editor.text) == ["new", "lines"]
+    editor.exit()